@@ -0,0 +1,12 @@
+"""
+Benchmarks do KuchlerApp, executados sem iniciar o Kivy.
+
+Módulos disponíveis:
+- synthetic: Geração de projetos e parcelas sintéticas
+- run_benchmarks: Medição de tempo das rotinas de dados, fórmulas e exportação
+- model_memory: Memória por parcela dos dicionários e dos modelos compactos
+- ui_harness: Tempos de frame da interface com dados sintéticos grandes
+
+Uso:
+    python -m benchmarks.run_benchmarks --sizes 100 10000 100000 --output resultados.json
+"""
@@ -0,0 +1,79 @@
+"""
+Mede com tracemalloc a memória por parcela dos dicionários de data.json
+e dos modelos compactos de modules.models, gravando o resultado em JSON.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from modules import data_manager
+from modules import models
+from benchmarks import synthetic
+
+
+def _measure(build):
+    """
+    Mede a memória alocada e mantida por uma função construtora.
+    
+    Args:
+        build (callable): Função que cria e retorna a estrutura medida
+    
+    Returns:
+        tuple: (estrutura criada, bytes alocados)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return result, allocated
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description='Memória por parcela: dicionários x modelos')
+    parser.add_argument('--plots', type=int, default=10000, help='Número de parcelas')
+    parser.add_argument('--output', default='-', help="Arquivo JSON de saída ('-' para stdout)")
+    args = parser.parse_args(argv)
+    
+    # As duas estruturas são medidas a partir de load_data, como no app;
+    # os dicionários intermediários dos modelos são descartados antes da medição
+    dataset = synthetic.generate_projects(1, args.plots)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'data.json')
+        data_manager.save_data(dataset, path)
+        del dataset
+        
+        loaded, dict_bytes = _measure(lambda: data_manager.load_data(path))
+        projects, model_bytes = _measure(
+            lambda: models.projects_from_data(data_manager.load_data(path)))
+    
+    assert models.projects_to_data(projects, loaded) == loaded
+    
+    report = {
+        'plots': args.plots,
+        'dict_bytes_per_plot': dict_bytes / args.plots,
+        'model_bytes_per_plot': model_bytes / args.plots,
+        'reduction': 1 - model_bytes / dict_bytes
+    }
+    
+    text = json.dumps(report, indent=4)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Executa os benchmarks sem Kivy e grava os resultados em JSON.
+
+Mede load_data/save_data, geração de fórmulas e descrições e a exportação
+CSV para diferentes números de parcelas.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from modules import data_manager
+from modules import exporter
+from modules import kuchler_calculator
+from benchmarks import synthetic
+
+DEFAULT_SIZES = [100, 10000, 100000]
+PLOTS_PER_PROJECT = 1000
+
+
+def _time_call(func, repeat):
+    """
+    Mede o tempo de execução de uma função.
+    
+    Args:
+        func (callable): Função sem argumentos
+        repeat (int): Número de repetições
+    
+    Returns:
+        list: Tempos de cada repetição em segundos
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _result(name, num_plots, timings):
+    """Monta o registro de resultado de um benchmark."""
+    return {
+        'name': name,
+        'plots': num_plots,
+        'repeat': len(timings),
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'max_s': max(timings),
+        'per_plot_us': min(timings) / num_plots * 1e6
+    }
+
+
+def run_size(num_plots, repeat, workdir):
+    """
+    Executa todos os benchmarks para um número de parcelas.
+    
+    Args:
+        num_plots (int): Número total de parcelas
+        repeat (int): Número de repetições por benchmark
+        workdir (str): Diretório temporário para os arquivos
+    
+    Returns:
+        list: Resultados de cada benchmark
+    """
+    plots_per_project = min(num_plots, PLOTS_PER_PROJECT)
+    # O restante da divisão vai para um último projeto menor: são sempre num_plots parcelas
+    num_projects = max(1, -(-num_plots // plots_per_project))
+    dataset = synthetic.generate_projects(num_projects, plots_per_project, total_plots=num_plots)
+    
+    plots = [plot for project in dataset['projects'] for plot in project['plots']]
+    matrices = [plot['matriz_fisionomica'] for plot in plots]
+    json_path = os.path.join(workdir, f"data_{num_plots}.json")
+    csv_path = os.path.join(workdir, f"export_{num_plots}.csv")
+    
+    results = []
+    results.append(_result('save_data', num_plots, _time_call(
+        lambda: data_manager.save_data(dataset, json_path), repeat)))
+    results.append(_result('load_data', num_plots, _time_call(
+        lambda: data_manager.load_data(json_path), repeat)))
+    results.append(_result('generate_kuchler_formula', num_plots, _time_call(
+        lambda: [kuchler_calculator.generate_kuchler_formula(m) for m in matrices], repeat)))
+    results.append(_result('generate_formula_description', num_plots, _time_call(
+        lambda: [kuchler_calculator.generate_formula_description(m) for m in matrices], repeat)))
+    results.append(_result('export_plots_to_csv', num_plots, _time_call(
+        lambda: exporter.export_plots_to_csv(plots, csv_path), repeat)))
+    results.append(_result('stream_plots_to_csv', num_plots, _time_call(
+        lambda: exporter.stream_plots_to_csv(plots, csv_path), repeat)))
+    
+    return results
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description='Benchmarks do KuchlerApp (sem Kivy)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Números de parcelas a medir')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetições por benchmark')
+    parser.add_argument('--label', default='',
+                        help='Rótulo da execução (ex: versão ou commit)')
+    parser.add_argument('--output', default='-',
+                        help="Arquivo JSON de saída ('-' para stdout)")
+    args = parser.parse_args(argv)
+    
+    report = {
+        'label': args.label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': []
+    }
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        for num_plots in args.sizes:
+            report['results'].extend(run_size(num_plots, args.repeat, workdir))
+    
+    text = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Gerador de dados sintéticos no mesmo formato de data.json.
+Produz projetos e parcelas com densidade realista de matriz fisionômica.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from modules import kuchler_calculator
+
+# Formas de vida e alturas da matriz fisionômica (mesma ordem de main.py)
+LIFE_FORMS = ['B', 'D', 'E', 'N', 'O', 'S', 'M', 'G', 'H', 'L', 'C', 'K', 'T', 'V', 'X', 'F']
+HEIGHT_CLASSES = ['1', '2', '3', '4', '5', '6', '7', '8']
+COVERAGE_CLASSES = ['c', 'i', 'p', 'r', 'b', 'a']
+LEAF_CLASSES = ['h', 'w', 'k', 'l', 's']
+
+# Pesos aproximados de ocorrência em campo: lenhosas e herbáceas dominam,
+# formas especiais aparecem com menos frequência
+FORM_WEIGHTS = {
+    'B': 6, 'D': 6, 'E': 1, 'N': 1, 'O': 1, 'S': 4, 'M': 2,
+    'G': 6, 'H': 5, 'L': 2,
+    'C': 3, 'K': 2, 'T': 2, 'V': 1, 'X': 2, 'F': 2
+}
+
+# Alturas plausíveis por grupo de forma de vida
+HERBACEOUS_HEIGHTS = ['1', '2', '3']
+
+
+def generate_matrix(rng, mean_forms=4):
+    """
+    Gera uma matriz fisionômica sintética.
+    
+    Args:
+        rng (random.Random): Gerador de números aleatórios
+        mean_forms (int): Número médio de formas de vida presentes
+    
+    Returns:
+        dict: Matriz no formato {'D4': 'p', ...}
+    """
+    forms = list(FORM_WEIGHTS)
+    weights = list(FORM_WEIGHTS.values())
+    num_forms = max(1, min(len(forms), int(rng.gauss(mean_forms, 1.5))))
+    
+    matrix = {}
+    for form in set(rng.choices(forms, weights=weights, k=num_forms)):
+        if form in ('G', 'H', 'L'):
+            candidates = HERBACEOUS_HEIGHTS
+        else:
+            candidates = HEIGHT_CLASSES
+        
+        # Forma ocupa uma faixa contínua de alturas
+        top = rng.randrange(len(candidates))
+        span = rng.randint(1, min(4, top + 1))
+        for height in candidates[top - span + 1:top + 1]:
+            if form == 'F':
+                matrix[f"{form}{height}"] = rng.choice(LEAF_CLASSES)
+            else:
+                matrix[f"{form}{height}"] = rng.choice(COVERAGE_CLASSES)
+    
+    return matrix
+
+
+def generate_plot(rng, registered_at):
+    """
+    Gera uma parcela sintética completa, com fórmula e descrição.
+    
+    Args:
+        rng (random.Random): Gerador de números aleatórios
+        registered_at (datetime): Data e hora de registro
+    
+    Returns:
+        dict: Parcela no formato de data.json
+    """
+    matrix = generate_matrix(rng)
+    return {
+        'latitude': round(rng.uniform(-33.0, 5.0), 6),
+        'longitude': round(rng.uniform(-73.0, -35.0), 6),
+        'altitude': round(rng.uniform(0.0, 2500.0), 1),
+        'matriz_fisionomica': matrix,
+        'data_registro': registered_at.strftime('%d/%m/%Y'),
+        'horario_registro': registered_at.strftime('%H:%M:%S'),
+        'formula_kuchler': kuchler_calculator.generate_kuchler_formula(matrix),
+        'descricao_fisionomia': kuchler_calculator.generate_formula_description(matrix)
+    }
+
+
+def generate_projects(num_projects, plots_per_project, seed=0, total_plots=None):
+    """
+    Gera um conjunto de dados completo no formato de data.json.
+    
+    Args:
+        num_projects (int): Número de projetos
+        plots_per_project (int): Número de parcelas por projeto
+        seed (int): Semente para reprodutibilidade
+        total_plots (int): Total de parcelas; o último projeto fica só com o
+                           restante (padrão: num_projects * plots_per_project)
+    
+    Returns:
+        dict: Dados com as chaves 'projects' e 'settings'
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    
+    projects = []
+    for project_index in range(num_projects):
+        count = plots_per_project
+        if total_plots is not None:
+            count = max(0, min(plots_per_project, total_plots - project_index * plots_per_project))
+        plots = []
+        for plot_index in range(count):
+            registered_at = start + timedelta(minutes=17 * (project_index * plots_per_project + plot_index))
+            plots.append(generate_plot(rng, registered_at))
+        projects.append({
+            'name': f"Projeto {project_index + 1}",
+            'plots': plots
+        })
+    
+    return {
+        'projects': projects,
+        'settings': {'theme_style': 'Light', 'primary_color': 'Blue'}
+    }
@@ -0,0 +1,246 @@
+"""
+Harness de desempenho da interface do KuchlerApp.
+
+Inicia KuchlerInventoryApp com um data.json sintético grande, executa
+roteiros de navegação (abrir projeto, rolar parcelas, tocar na matriz) e
+registra percentis de tempo de frame e contagem de widgets por roteiro.
+
+Em Linux sem display, o harness se reexecuta sob xvfb-run automaticamente.
+
+Uso:
+    python -m benchmarks.ui_harness --projects 3 --plots 2000 --output ui.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from modules import data_manager
+from benchmarks import synthetic
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _ensure_display(argv):
+    """
+    Reexecuta o harness sob xvfb-run quando não há display disponível.
+    
+    Args:
+        argv (list): Argumentos da linha de comando
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    if os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'):
+        return
+    
+    xvfb_run = shutil.which('xvfb-run')
+    if xvfb_run is None:
+        raise SystemExit('Sem display disponível: instale o Xvfb (xvfb-run) para rodar o harness.')
+    
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    os.execve(xvfb_run,
+              [xvfb_run, '-a', '-s', '-screen 0 1280x1024x24',
+               sys.executable, '-m', 'benchmarks.ui_harness'] + list(argv),
+              env)
+
+
+def _percentile(sorted_values, fraction):
+    """Percentil por posição mais próxima de uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _count_widgets(window):
+    """Conta todos os widgets da janela, incluindo diálogos abertos."""
+    return sum(1 for child in window.children for _ in child.walk())
+
+
+def _summary(name, frame_times_ms, widget_count):
+    """Monta o registro de resultado de um roteiro."""
+    ordered = sorted(frame_times_ms)
+    return {
+        'name': name,
+        'frames': len(ordered),
+        'p50_ms': _percentile(ordered, 0.50),
+        'p90_ms': _percentile(ordered, 0.90),
+        'p99_ms': _percentile(ordered, 0.99),
+        'max_ms': ordered[-1] if ordered else 0.0,
+        'widgets': widget_count
+    }
+
+
+# ==================== ROTEIROS ====================
+# Cada roteiro é um gerador que executa ações na interface e retorna
+# (yield) quantos frames aguardar antes da próxima ação.
+
+def scenario_open_project(app):
+    """Abre a lista de projetos e o primeiro projeto (lista de parcelas completa)."""
+    app.go_to_screen('my_projects_screen')
+    yield 30
+    import main as kuchler_main
+    app.open_project(kuchler_main.projects_data['projects'][0]['id'])
+    # Os cards são criados em fatias por frame: aguarda a lista completa
+    while app.plots_list_job is not None and not app.plots_list_job.finished:
+        yield 1
+    yield 60
+
+
+def scenario_scroll_plots(app, steps=120):
+    """Rola a lista de parcelas do projeto aberto até o fim e de volta ao topo."""
+    plots_list = app.root.get_screen('view_project_screen').ids.plots_list_container
+    # MDScrollView > MDBoxLayout > MDList
+    scroll_view = plots_list.parent.parent
+    for step in range(steps + 1):
+        scroll_view.scroll_y = 1 - step / steps
+        yield 1
+    for step in range(steps + 1):
+        scroll_view.scroll_y = step / steps
+        yield 1
+
+
+def scenario_matrix_taps(app, life_forms, height_classes):
+    """Preenche a matriz célula a célula, abrindo o diálogo de cobertura a cada toque."""
+    app.temp_plot_data = {'matriz_fisionomica': {}}
+    app.formula_preview.reset(app.temp_plot_data['matriz_fisionomica'])
+    app.clear_matriz_interface()
+    app.go_to_screen('new_plot_screen2')
+    yield 30
+    
+    for form in life_forms:
+        if form == 'F':
+            continue
+        for height in height_classes:
+            app.select_matriz_cell(form, height)
+            yield 1
+            app.set_cobertura_cell(form, height, 'p')
+            yield 1
+    
+    # Descarta a parcela em edição sem salvar
+    app.temp_plot_data = {'matriz_fisionomica': {}}
+    app.formula_preview.reset()
+    app.go_to_screen('view_project_screen')
+    yield 30
+
+
+def run_scenarios(app, scenarios, results):
+    """
+    Agenda a execução dos roteiros no Clock do Kivy, um frame por vez.
+    
+    Args:
+        app (KuchlerInventoryApp): Aplicativo em execução
+        scenarios (list): Pares (nome, função que cria o gerador do roteiro)
+        results (list): Lista que recebe os resultados de cada roteiro
+    """
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    
+    pending = list(scenarios)
+    state = {'name': None, 'steps': None, 'wait': 0, 'frames': [], 'last': None}
+    
+    def tick(dt):
+        # O intervalo entre ticks inclui o custo das ações do frame anterior
+        now = time.perf_counter()
+        if state['steps'] is not None and state['last'] is not None:
+            state['frames'].append((now - state['last']) * 1000)
+        state['last'] = now
+        
+        if state['wait'] > 1:
+            state['wait'] -= 1
+            return True
+        
+        while True:
+            if state['steps'] is None:
+                if not pending:
+                    app.stop()
+                    return False
+                name, factory = pending.pop(0)
+                state.update(name=name, steps=factory(app), frames=[])
+            
+            try:
+                state['wait'] = next(state['steps'])
+                return True
+            except StopIteration:
+                results.append(_summary(state['name'], state['frames'], _count_widgets(Window)))
+                state['steps'] = None
+    
+    # Aguarda a primeira renderização antes de começar a medir
+    Clock.schedule_once(lambda dt: Clock.schedule_interval(tick, 0), 1)
+
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando."""
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(description='Tempos de frame da interface do KuchlerApp')
+    parser.add_argument('--projects', type=int, default=3, help='Número de projetos sintéticos')
+    parser.add_argument('--plots', type=int, default=2000, help='Parcelas por projeto')
+    parser.add_argument('--maxfps', type=int, default=0,
+                        help='Limite de FPS do Kivy (0 mede o custo real de cada frame)')
+    parser.add_argument('--label', default='', help='Rótulo da execução (ex: versão ou commit)')
+    parser.add_argument('--output', default='-', help="Arquivo JSON de saída ('-' para stdout)")
+    args = parser.parse_args(argv)
+    
+    _ensure_display(argv)
+    
+    original_dir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='kuchler_ui_')
+    try:
+        # main.py lê data.json do diretório atual ao ser importado
+        data_manager.save_data(synthetic.generate_projects(args.projects, args.plots),
+                               os.path.join(workdir, 'data.json'))
+        os.chdir(workdir)
+        
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+        os.environ['KIVY_HOME'] = os.path.join(workdir, '.kivy')
+        
+        from kivy.config import Config
+        Config.set('graphics', 'maxfps', str(args.maxfps))
+        from kivy.resources import resource_add_path
+        resource_add_path(REPO_DIR)
+        
+        if REPO_DIR not in sys.path:
+            sys.path.insert(0, REPO_DIR)
+        import main as kuchler_main
+        
+        app = kuchler_main.KuchlerInventoryApp()
+        results = []
+        scenarios = [
+            ('open_view_project', scenario_open_project),
+            ('scroll_plots', scenario_scroll_plots),
+            ('matrix_taps', lambda a: scenario_matrix_taps(a, kuchler_main.LIFE_FORMS,
+                                                           kuchler_main.HEIGHT_CLASSES)),
+        ]
+        app.bind(on_start=lambda instance: run_scenarios(instance, scenarios, results))
+        app.run()
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        'label': args.label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'projects': args.projects,
+        'plots_per_project': args.plots,
+        'maxfps': args.maxfps,
+        'results': results
+    }
+    
+    text = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,12 +14,19 @@ from kivymd.app import MDApp
 from kivy.uix.screenmanager import Screen
 from kivy.lang import Builder
 from kivy.core.window import Window
-from kivy.metrics import dp
+from kivy.clock import Clock
+from kivy.metrics import dp, sp
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.uix.widget import Widget
+from kivy.uix.image import Image
+from kivy.properties import BooleanProperty, ListProperty, StringProperty
+from kivy.core.text import Label as CoreLabel
+from kivy.core.text.markup import MarkupLabel
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton, MDRaisedButton
-import csv
 import os
 import webbrowser
 from datetime import datetime
@@ -27,11 +34,33 @@ from datetime import datetime
 # Importações dos módulos personalizados
 from modules import data_manager as data
 from modules import kuchler_calculator
+from modules import exporter
+from modules import backup
+from modules import drafts
+from modules import jobs
+from modules import timeindex
+from modules import monitoring
+from modules import heatmap
+from modules import report
+from modules import rarefaction
+from modules import profiles
+from modules import search
+from modules import textcache
 
 # Constantes
 JSON_FILE = 'data.json'
 WINDOW_SIZE = (540, 900)
 EXPORTS_DIR = 'exports'
+REPORTS_DIR = os.path.join(EXPORTS_DIR, 'relatorios')
+BACKUPS_DIR = 'backups'
+DRAFT_FILE = 'draft.journal'
+THUMBNAILS_DIR = 'thumbnails'
+
+# Tarefas de cálculo do app usam threads, nunca processos: processos criados aqui
+# (spawn no macOS e Windows) reimportariam este arquivo, com o Kivy e a gravação
+# do data.json, e o fork no Linux copiaria um processo com OpenGL e várias threads.
+# O processamento em lote com processos fica na linha de comando (python -m modules)
+USE_PROCESSES = False
 
 # Formas de vida e alturas da matriz fisionômica
 LIFE_FORMS = ['B', 'D', 'E', 'N', 'O', 'S', 'M', 'G', 'H', 'L', 'C', 'K', 'T', 'V', 'X', 'F']
@@ -48,8 +77,140 @@ COVERAGE_DESCRIPTIONS = {
     'a': 'ausente (<1%)'
 }
 
-# Carrega dados
-projects_data = data.load_data(JSON_FILE)
+# Carrega dados e atribui identificadores estáveis a dados de versões anteriores
+# O DataStore permite que exportadores e a linha de comando usem o arquivo junto com o app
+store = data.DataStore(JSON_FILE)
+projects_data = store.load()
+if data.ensure_ids(projects_data):
+    store.mark_changed(*(project['id'] for project in projects_data['projects']))
+    store.save(projects_data)
+
+
+class MatrixHeatmap(Widget):
+    """
+    Matriz fisionômica desenhada em uma única textura.
+    
+    Um widget e um retângulo texturizado substituem um widget por célula; o
+    toque é convertido na célula correspondente (evento on_cell).
+    """
+    
+    __events__ = ('on_cell',)
+    
+    def __init__(self, pixels=None, interactive=True, cell_pixels=heatmap.CELL_PIXELS, **kwargs):
+        """
+        Args:
+            pixels (bytes): Buffer RGBA de heatmap.matrix_pixels ou heatmap.frequency_pixels
+            interactive (bool): False para miniaturas (os toques passam para o widget de baixo)
+            cell_pixels (int): Texels por célula usados no buffer
+        """
+        super().__init__(**kwargs)
+        self.interactive = interactive
+        self.texture = Texture.create(size=heatmap.texture_size(cell_pixels), colorfmt='rgba')
+        # Sem interpolação: as células continuam nítidas em qualquer tamanho
+        self.texture.mag_filter = 'nearest'
+        self.texture.min_filter = 'nearest'
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(texture=self.texture, pos=self.pos, size=self.size)
+        self.bind(pos=self.update_rect, size=self.update_rect)
+        if pixels is not None:
+            self.set_pixels(pixels)
+    
+    def update_rect(self, *args):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
+    
+    def set_pixels(self, pixels):
+        """Atualiza a textura com um novo buffer RGBA."""
+        self.texture.blit_buffer(pixels, colorfmt='rgba', bufferfmt='ubyte')
+        self.canvas.ask_update()
+    
+    def on_touch_down(self, touch):
+        if not self.interactive or not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        cell = heatmap.cell_at(touch.x - self.x, touch.y - self.y, self.width, self.height)
+        if cell is None:
+            return super().on_touch_down(touch)
+        self.dispatch('on_cell', *cell)
+        return True
+    
+    def on_cell(self, form, height):
+        pass
+
+
+class CachedLabel(Widget):
+    """
+    Rótulo com quebra de linhas cuja textura vem do cache de layouts de texto.
+    
+    O texto é renderizado em branco e colorido pela instrução Color, então a
+    mesma textura serve para qualquer cor e tema. A altura acompanha a do
+    texto diagramado na largura atual; mudanças de largura no mesmo frame
+    geram uma única consulta ao cache.
+    """
+    
+    text = StringProperty('')
+    font_style = StringProperty('Body1')
+    bold = BooleanProperty(False)
+    markup = BooleanProperty(False)
+    color = ListProperty([0, 0, 0, 1])
+    
+    def __init__(self, cache, **kwargs):
+        """
+        Args:
+            cache (textcache.TextLayoutCache): Cache compartilhado pelos rótulos
+        """
+        self.cache = cache
+        kwargs.setdefault('size_hint_y', None)
+        super().__init__(**kwargs)
+        with self.canvas:
+            self.color_instruction = Color(*self.color)
+            self.rect = Rectangle(pos=self.pos, size=(0, 0))
+        self.layout_trigger = Clock.create_trigger(self.update_layout)
+        self.bind(pos=self.update_rect, color=self.update_color)
+        self.bind(width=self.layout_trigger, text=self.layout_trigger, font_style=self.layout_trigger,
+                  bold=self.layout_trigger, markup=self.layout_trigger)
+        self.layout_trigger()
+    
+    def update_color(self, instance, value):
+        self.color_instruction.rgba = value
+    
+    def update_rect(self, *args):
+        self.rect.pos = (self.x, self.y + dp(2))
+    
+    def update_layout(self, *args):
+        """Aplica o layout do texto na largura atual (do cache ou renderizado agora)."""
+        if self.width <= 1:
+            return
+        font_name, font_size = MDApp.get_running_app().theme_cls.font_styles[self.font_style][:2]
+        font_size = sp(font_size)
+        key = textcache.layout_key(self.text, self.width, font_name, font_size, self.bold, self.markup)
+        label = self.cache.get_or_create(
+            key, lambda: self.render_text(self.text, self.width, font_name, font_size, self.bold, self.markup)
+        )
+        texture = label.texture
+        self.rect.texture = texture
+        self.rect.size = texture.size if texture is not None else (0, 0)
+        self.height = self.rect.size[1] + dp(4)
+        self.update_rect()
+    
+    @staticmethod
+    def render_text(text, width, font_name, font_size, bold, markup):
+        """
+        Diagrama e renderiza um texto em branco.
+        
+        Returns:
+            tuple: (rótulo do núcleo do Kivy, bytes da textura) para o cache
+        """
+        label_class = MarkupLabel if markup else CoreLabel
+        label = label_class(text=text, font_name=font_name, font_size=font_size, bold=bold,
+                            text_size=(width, None), halign='left', color=(1, 1, 1, 1))
+        label.refresh()
+        # O cache guarda o rótulo, não só a textura: é ele que a redesenha se o
+        # contexto OpenGL for recriado (ex: Android ao voltar do segundo plano)
+        texture = label.texture
+        size = texture.size if texture is not None else (0, 0)
+        return label, textcache.texture_bytes(*size)
+
 
 class KuchlerInventoryApp(MDApp):
     """Aplicativo de inventário fitofisionômico usando metodologia Küchler."""
@@ -75,10 +236,51 @@ class KuchlerInventoryApp(MDApp):
         
         # Variáveis do projeto atual
         self.current_project = None
-        self.current_project_index = None
+        self.current_plot_index = None
+        
+        # Itens aguardando confirmação de exclusão
+        self.pending_delete_project_id = None
+        self.pending_delete_plot_id = None
         
-        # Dados temporários da parcela em criação
+        # Dados temporários da parcela em criação, registrados no diário do rascunho
         self.temp_plot_data = {}
+        self.draft_journal = drafts.DraftJournal(DRAFT_FILE)
+        
+        # Tarefas em segundo plano; os retornos são entregues no Clock (thread da interface)
+        self.scheduler = jobs.JobScheduler(
+            dispatch=lambda callback: Clock.schedule_once(lambda dt: callback()),
+            use_processes=USE_PROCESSES
+        )
+        self.export_job = None
+        self.plots_list_job = None
+        
+        # Gravação em andamento e alterações aguardando a próxima gravação
+        self.save_job = None
+        self.save_batch = []
+        self.pending_saves = []
+        
+        # Índices de pontos revisitados e de busca, montados em segundo plano; as
+        # alterações feitas durante a montagem ficam na fila e são aplicadas ao final
+        self.revisit_index = None
+        self.search_index = None
+        self.index_jobs = {}
+        self.index_pending = {}
+        
+        # Busca enquanto se digita, feita no máximo uma vez por frame
+        self.search_query = ''
+        self.search_trigger = Clock.create_trigger(self.update_search_results)
+        
+        # Perfis verticais: miniaturas em cache em disco, carregadas quando o card aparece na tela
+        self.profile_cache = profiles.ThumbnailCache(THUMBNAILS_DIR)
+        self.profile_pending = {}
+        self.profile_trigger = Clock.create_trigger(self.load_visible_profiles)
+        
+        # Textos dos cards de parcelas já diagramados, reaproveitados ao remontar a lista
+        self.text_layout_cache = textcache.TextLayoutCache()
+        
+        # Pré-visualização da fórmula, atualizada no máximo uma vez por frame
+        self.formula_preview = kuchler_calculator.FormulaPreview()
+        self.formula_preview_trigger = Clock.create_trigger(self.update_formula_preview)
         
         # Carrega configurações salvas
         self.load_settings()
@@ -86,6 +288,404 @@ class KuchlerInventoryApp(MDApp):
         # Carrega interface
         return Builder.load_file('interface.kv')
     
+    def on_start(self):
+        """Oferece a recuperação de uma parcela que não chegou a ser salva."""
+        self.rebuild_indexes()
+        draft = drafts.load_draft(DRAFT_FILE)
+        
+        # Parcelas salvas cuja gravação não terminou antes do encerramento do app;
+        # uma por vez é oferecida (as demais ficam para a próxima abertura)
+        saved = {plot.get('id') for project in projects_data.get('projects', []) for plot in project.get('plots', [])}
+        for plot_id, path in drafts.pending_drafts(DRAFT_FILE):
+            if plot_id in saved:
+                drafts.remove_draft(path)
+            elif draft is None:
+                draft = drafts.load_draft(path)
+        
+        if draft is not None:
+            Clock.schedule_once(lambda dt: self.confirm_restore_draft(draft))
+    
+    def on_pause(self):
+        """Grava um snapshot dos dados quando o app vai para segundo plano."""
+        self.draft_journal.sync()
+        self.backup_in_background()
+        return True
+    
+    def on_stop(self):
+        """Conclui as gravações e grava um snapshot dos dados ao fechar o app."""
+        self.draft_journal.sync()
+        self.draft_journal.close()
+        self.flush_saves()
+        # Índices, miniaturas e relatórios pendentes são descartados, e as exportações
+        # em andamento interrompidas: o encerramento não espera por resultados que
+        # não serão usados
+        self.scheduler.shutdown(wait=False, cancel_pending=True)
+        if self.export_job is not None:
+            self.export_job.cancel()
+        # O snapshot é gravado na hora (aguardando, pela trava, um snapshot já em andamento)
+        self.run_backup_worker(backup.snapshot_view(projects_data))
+    
+    # ==================== PERSISTÊNCIA ====================
+    
+    def save_projects(self, *changed, retry=None, on_saved=None):
+        """
+        Agenda a gravação dos dados em segundo plano, mesclando por projeto as
+        gravações de outros processos.
+        
+        Os dados em memória continuam valendo para a interface durante a
+        gravação; alterações feitas nesse intervalo são reunidas na gravação
+        seguinte. Se outro processo alterou o mesmo projeto, os dados são
+        recarregados do disco e a alteração é refeita com retry antes de
+        gravar novamente.
+        
+        Args:
+            changed (str): Ids dos projetos alterados, ou 'settings'
+            retry (callable): Refaz a alteração sobre os dados recarregados;
+                              retorna False se não for mais possível
+            on_saved (callable): Chamada quando uma gravação com a alteração
+                                 termina (não é chamada se a gravação falhar)
+        """
+        self.pending_saves.append((changed, retry, on_saved))
+        if self.save_job is None:
+            self.start_save()
+    
+    def start_save(self, attempt=0):
+        """Inicia a gravação das alterações pendentes a partir de uma cópia rasa dos dados."""
+        batch, self.pending_saves = self.pending_saves, []
+        changed = {key for keys, _, _ in batch for key in keys}
+        
+        # Cópia rasa na thread da interface: a gravação não vê alterações posteriores
+        view = backup.snapshot_view(projects_data)
+        originals = list(zip(view['projects'], projects_data.get('projects', [])))
+        
+        self.save_batch = batch
+        job = self.scheduler.submit(
+            self.run_save_worker, view, changed,
+            priority=jobs.PRIORITY_HIGH,
+            key='store',
+            # Retornos de uma gravação já concluída em flush_saves são ignorados
+            on_done=lambda result: self.save_job is job and self.finish_save(view, originals),
+            on_error=lambda error: self.save_job is job and self.save_failed(error, attempt)
+        )
+        self.save_job = job
+    
+    def run_save_worker(self, view, changed):
+        """Grava a cópia dos dados no disco (fora da thread da interface)."""
+        store.mark_changed(*changed)
+        store.save(view)
+    
+    def finish_save(self, view, originals):
+        """
+        Aplica aos dados em memória o resultado de uma gravação concluída.
+        
+        Projetos que a mesclagem trouxe do disco (alterados por outro processo)
+        substituem os da memória; os demais recebem a versão gravada.
+        
+        Args:
+            view (dict): Cópia gravada, já mesclada com o disco
+            originals (list): Pares (cópia, projeto em memória) da cópia gravada
+        """
+        batch = self.save_batch
+        self.save_job = None
+        self.save_batch = []
+        pending = {key for keys, _, _ in self.pending_saves for key in keys}
+        
+        # As alterações do lote já estão em disco, mesmo que haja conflito com as pendentes
+        for _, _, on_saved in batch:
+            if on_saved is not None:
+                on_saved()
+        copies = {id(copy): project for copy, project in originals}
+        current = {id(project) for project in projects_data.get('projects', [])}
+        saved = {id(project) for project in view['projects']}
+        
+        projects = []
+        conflict = False
+        for project in view['projects']:
+            original = copies.get(id(project))
+            if original is None:
+                # Vindo do disco: conflito se também foi alterado aqui depois da cópia
+                conflict = conflict or project.get('id') in pending
+                projects.append(project)
+            elif id(original) in current:
+                original[data.VERSION_KEY] = project.get(data.VERSION_KEY, 0)
+                projects.append(original)
+        
+        # Excluídos por outro processo, mas alterados aqui depois da cópia
+        conflict = conflict or any(id(copy) not in saved and copy.get('id') in pending for copy, _ in originals)
+        if conflict:
+            batch, self.pending_saves = self.pending_saves, []
+            self.recover_from_conflict(batch, 0)
+            return
+        
+        # Projetos criados depois da cópia
+        copied = {id(project) for project in copies.values()}
+        projects.extend(project for project in projects_data.get('projects', []) if id(project) not in copied)
+        
+        for key, value in view.items():
+            if key != 'projects' and key not in pending:
+                projects_data[key] = value
+        projects_data['projects'] = projects
+        self.refresh_current_project()
+        if any(id(project) not in copies for project in view['projects']):
+            self.rebuild_indexes()
+        
+        if self.pending_saves:
+            self.start_save()
+    
+    def save_failed(self, error, attempt):
+        """Trata a falha de uma gravação em segundo plano."""
+        batch = self.save_batch + self.pending_saves
+        self.save_job = None
+        self.save_batch = []
+        self.pending_saves = []
+        
+        if isinstance(error, data.StaleDataError):
+            self.recover_from_conflict(batch, attempt)
+            return
+        
+        # Erro de disco: as alterações continuam em memória e entram na próxima gravação
+        print(f"Erro ao salvar dados: {error}")
+        self.pending_saves = batch
+        self.show_info_dialog('Erro ao Salvar', f'Não foi possível salvar os dados.\n{error}')
+    
+    def recover_from_conflict(self, batch, attempt):
+        """
+        Recarrega os dados do disco e refaz as alterações ainda não gravadas.
+        
+        Args:
+            batch (list): Tuplas (ids alterados, retry, on_saved) das alterações perdidas
+            attempt (int): Tentativas de gravação já feitas após conflitos
+        """
+        # Recarrega no lugar: projects_data é compartilhado pelo módulo
+        # (leitura síncrona, só após um conflito; nenhuma gravação está em andamento)
+        projects_data.clear()
+        projects_data.update(store.load())
+        self.refresh_current_project()
+        
+        redone = []
+        if attempt == 0:
+            redone = [entry for entry in batch if entry[1] is not None and entry[1]()]
+        if redone:
+            self.pending_saves = redone
+            self.start_save(attempt + 1)
+        self.rebuild_indexes()
+        
+        if len(redone) < len(batch):
+            self.show_info_dialog('Dados Alterados',
+                                  'Os dados foram alterados por outro programa e foram recarregados. '
+                                  'Confira e repita a última operação.')
+    
+    def flush_saves(self):
+        """Conclui na hora a gravação em andamento e as pendentes (ao fechar o app)."""
+        if self.save_job is None and self.pending_saves:
+            self.start_save()
+        
+        while self.save_job is not None:
+            job = self.save_job
+            job.wait()
+            if job.status != jobs.DONE:
+                print(f"Erro ao salvar dados: {job.error}")
+                break
+            # O Clock não roda mais: o retorno é aplicado aqui e inicia a gravação seguinte
+            job.on_done(job.result)
+    
+    # ==================== MONITORAMENTO ====================
+    
+    def rebuild_indexes(self):
+        """Monta em segundo plano os índices de pontos revisitados e de busca."""
+        view = backup.snapshot_view(projects_data)
+        self.rebuild_index('revisit', monitoring.RevisitIndex, view['projects'])
+        self.rebuild_index('search', search.SearchIndex, view['projects'])
+    
+    def rebuild_index(self, name, factory, projects):
+        """
+        Monta um índice em segundo plano, descartando a montagem anterior.
+        
+        Args:
+            name (str): 'revisit' ou 'search' (atributo <name>_index)
+            factory (callable): Classe do índice, chamada com os projetos
+            projects (list): Projetos (cópia rasa dos dados)
+        """
+        if self.index_jobs.get(name) is not None:
+            self.index_jobs[name].cancel()
+        self.index_pending[name] = []
+        job = self.scheduler.submit(
+            factory, projects,
+            priority=jobs.PRIORITY_LOW,
+            on_done=lambda index: self.index_jobs.get(name) is job and self.finish_index(name, index),
+            on_error=lambda error: self.index_jobs.get(name) is job and self.index_failed(name, error)
+        )
+        self.index_jobs[name] = job
+    
+    def index_failed(self, name, error):
+        """Segue sem o índice (monitoramento ou busca) se ele não puder ser montado."""
+        print(f"Erro no índice '{name}': {error}")
+        self.index_jobs[name] = None
+        self.index_pending[name] = []
+    
+    def finish_index(self, name, index):
+        """Aplica as alterações feitas durante a montagem e passa a usar o índice."""
+        self.index_jobs[name] = None
+        for operation, args in self.index_pending[name]:
+            getattr(index, operation)(*args)
+        self.index_pending[name] = []
+        setattr(self, f'{name}_index', index)
+        
+        if not self.root:
+            return
+        # Os cartões já exibidos não tinham as informações de monitoramento
+        if name == 'revisit' and self.root.current == 'view_project_screen' and self.current_project:
+            self.load_plots_list()
+        # A consulta digitada antes do fim da montagem ainda não tinha resultados
+        if name == 'search' and self.search_query:
+            self.search_trigger()
+    
+    def update_index(self, name, operation, *args):
+        """
+        Aplica uma alteração a um índice (ou a guarda, se ele estiver em montagem).
+        
+        Args:
+            name (str): 'revisit' ou 'search'
+            operation (str): Método do índice, ex: 'add' (id do projeto, parcela),
+                             'remove' (id da parcela) ou, na busca, 'add_project' (projeto)
+                             e 'remove_project' (id do projeto)
+        """
+        if self.index_jobs.get(name) is not None:
+            self.index_pending[name].append((operation, args))
+        else:
+            index = getattr(self, f'{name}_index')
+            if index is not None:
+                getattr(index, operation)(*args)
+    
+    def update_plot_indexes(self, operation, *args):
+        """Inclui ('add') ou retira ('remove') uma parcela dos dois índices."""
+        self.update_index('revisit', operation, *args)
+        self.update_index('search', operation, *args)
+    
+    def refresh_current_project(self):
+        """Atualiza a referência ao projeto aberto após uma mesclagem ou recarga."""
+        if self.current_project is None:
+            return
+        project = data.find_project(projects_data, self.current_project.get('id'))
+        if project is not self.current_project:
+            self.current_project = project
+            self.current_plot_index = data.PlotIndex(project) if project is not None else None
+    
+    def find_project_index(self, project_id):
+        """
+        Projeto e índice de parcelas pelo id, para refazer uma alteração após uma recarga.
+        
+        O projeto aberto usa o índice atual (que continua consistente com a lista);
+        os demais, um índice novo.
+        
+        Returns:
+            tuple: (projeto, PlotIndex), ou (None, None) se o projeto não existir mais
+        """
+        project = data.find_project(projects_data, project_id)
+        if project is None:
+            return None, None
+        if project is self.current_project:
+            return project, self.current_plot_index
+        return project, data.PlotIndex(project)
+    
+    # ==================== RASCUNHO ====================
+    
+    def record_draft_cell(self, key, value):
+        """Acrescenta a alteração de uma célula ao diário do rascunho (None = célula limpa)."""
+        try:
+            if not self.draft_journal.active or self.draft_journal.needs_compaction():
+                # Sem rascunho aberto (ex: após reiniciar) ou diário longo: reescreve o estado atual
+                self.draft_journal.start(self.current_project['id'], self.temp_plot_data)
+            elif value is None:
+                self.draft_journal.clear_cell(key)
+            else:
+                self.draft_journal.set_cell(key, value)
+        except OSError as e:
+            # Falha no rascunho não deve impedir a edição da parcela
+            print(f"Erro ao gravar rascunho: {e}")
+    
+    def confirm_restore_draft(self, draft):
+        """Pergunta se a parcela recuperada do rascunho deve ser reaberta."""
+        project = data.find_project(projects_data, draft['project_id'])
+        if project is None:
+            # Projeto excluído: não há onde salvar a parcela
+            self.discard_draft(draft)
+            return
+        
+        num_cells = len(draft['plot_data']['matriz_fisionomica'])
+        dialog = MDDialog(
+            title='Parcela Não Salva',
+            text=f'Foi encontrada uma parcela em edição no projeto "{project.get("name", "")}" '
+                 f'({num_cells} células preenchidas). Deseja continuar a edição?',
+            buttons=[
+                MDFlatButton(
+                    text='DESCARTAR',
+                    on_release=lambda x: (dialog.dismiss(), self.discard_draft(draft))
+                ),
+                MDRaisedButton(
+                    text='CONTINUAR',
+                    md_bg_color=self.theme_cls.primary_color,
+                    elevation=0,
+                    on_release=lambda x: self.restore_draft(project, draft['plot_data'], dialog, draft['file_path'])
+                ),
+            ],
+        )
+        dialog.open()
+    
+    def discard_draft(self, draft):
+        """Apaga um rascunho recuperado (do diário ou separado por uma gravação interrompida)."""
+        if draft['file_path'] == DRAFT_FILE:
+            self.draft_journal.discard()
+        else:
+            drafts.remove_draft(draft['file_path'])
+    
+    def restore_draft(self, project, plot_data, dialog=None, file_path=DRAFT_FILE):
+        """Reabre a parcela recuperada na tela da matriz."""
+        if dialog:
+            dialog.dismiss()
+        
+        self.current_project = project
+        self.current_plot_index = data.PlotIndex(project)
+        self.temp_plot_data = plot_data
+        self.draft_journal.start(project['id'], plot_data)
+        # Rascunho separado: o diário principal passa a guardar a parcela
+        if file_path != DRAFT_FILE:
+            drafts.remove_draft(file_path)
+        
+        # Sem coordenadas, a edição recomeça pela etapa 1 (a matriz é mantida)
+        if 'latitude' not in plot_data:
+            self.go_to_screen('new_plot_screen1')
+            return
+        
+        self.clear_matriz_interface()
+        for key in plot_data['matriz_fisionomica']:
+            if key[0] == 'F':
+                self.update_folha_cell_display(key[1:])
+            else:
+                self.update_matriz_cell_display(key[0], key[1:])
+        self.formula_preview.reset(plot_data['matriz_fisionomica'])
+        self.formula_preview_trigger()
+        self.go_to_screen('new_plot_screen2')
+    
+    # ==================== BACKUP ====================
+    
+    def backup_in_background(self):
+        """Inicia um snapshot dos dados atuais sem bloquear a interface."""
+        # Cópia rasa na thread da interface: alterações posteriores não afetam o snapshot
+        view = backup.snapshot_view(projects_data)
+        # Um snapshot por vez; ao fechar o app, on_stop grava o snapshot sem o agendador
+        self.scheduler.submit(self.run_backup_worker, view, priority=jobs.PRIORITY_LOW, key='backup')
+    
+    def run_backup_worker(self, view):
+        """Grava o snapshot e aplica a rotação dos backups."""
+        try:
+            store = backup.BackupStore(backup.store_dir(JSON_FILE, BACKUPS_DIR))
+            store.take_snapshot(view)
+            store.rotate()
+        except (OSError, ValueError) as e:
+            # Falha no backup não deve interromper o uso do app
+            print(f"Erro ao gravar backup: {e}")
+    
     # ==================== NAVEGAÇÃO ====================
     
     def confirm_exit_app(self):
@@ -114,7 +714,7 @@ class KuchlerInventoryApp(MDApp):
     def go_back(self):
         """Navega para a tela anterior baseado na tela atual."""
         current_screen = self.root.current
-
+        
         back_navigation = {
             'my_projects_screen': 'menu_screen',
             'new_project_screen': 'my_projects_screen',
@@ -128,7 +728,7 @@ class KuchlerInventoryApp(MDApp):
         }
         
         self.root.current = back_navigation.get(current_screen, 'menu_screen')
-
+    
     def go_to_screen(self, screen_name, dialog=None):
         """Navega para a tela especificada.
         
@@ -143,56 +743,142 @@ class KuchlerInventoryApp(MDApp):
     # ==================== PROJETOS ====================
     
     def load_projects_list(self):
-        """Carrega e exibe lista de projetos na tela principal."""
+        """Carrega e exibe lista de projetos na tela principal (ou os resultados da busca)."""
+        if self.search_query:
+            self.update_search_results()
+            return
+        
         projects_list_container = self.root.get_screen('my_projects_screen').ids.projects_list_container
         projects_list_container.clear_widgets()
-
-        for index, project in enumerate(projects_data.get('projects', [])):
-            project_card = MDCard(
+        
+        for project in projects_data.get('projects', []):
+            projects_list_container.add_widget(self.make_project_card(project))
+    
+    def make_project_card(self, project):
+        """Card de um projeto na tela Meus Projetos; o toque abre o projeto."""
+        project_card = MDCard(
+            size_hint_y=None,
+            height='80dp',
+            elevation=0,
+            ripple_behavior=True,
+            md_bg_color=self.theme_cls.primary_color,
+            radius=[15, 15, 15, 15],
+            padding=dp(10)
+        )
+        
+        project_card.bind(on_release=lambda x, project_id=project['id']: self.open_project(project_id))
+        
+        project_label = MDLabel(
+            text=project['name'],
+            halign='center',
+            valign='middle',
+            font_style='H6',
+            bold=True,
+            theme_text_color='Custom',
+            text_color=(1, 1, 1, 1),
+        )
+        
+        project_card.add_widget(project_label)
+        return project_card
+    
+    # ==================== BUSCA ====================
+    
+    def search_projects(self, text):
+        """Guarda a consulta digitada e agenda a busca para o próximo frame."""
+        self.search_query = text.strip()
+        self.search_trigger()
+    
+    def update_search_results(self, *args):
+        """Exibe os projetos e as parcelas que correspondem à consulta digitada."""
+        if not self.root:
+            return
+        if not self.search_query:
+            self.load_projects_list()
+            return
+        
+        container = self.root.get_screen('my_projects_screen').ids.projects_list_container
+        container.clear_widgets()
+        
+        if self.search_index is None:
+            # Índice ainda em montagem: finish_index refaz a busca ao concluir
+            container.add_widget(MDLabel(
+                text='Preparando a busca...',
+                halign='center',
+                font_style='Body1',
+                size_hint_y=None,
+                height=dp(40)
+            ))
+            return
+        
+        results = self.search_index.search(self.search_query)
+        if not results['projects'] and not results['plots']:
+            container.add_widget(MDLabel(
+                text='Nenhum resultado',
+                halign='center',
+                font_style='Body1',
+                size_hint_y=None,
+                height=dp(40)
+            ))
+            return
+        
+        for project in results['projects']:
+            container.add_widget(self.make_project_card(project))
+        
+        project_names = {project.get('id'): project.get('name', '') for project in projects_data.get('projects', [])}
+        from kivymd.uix.boxlayout import MDBoxLayout
+        for project_id, plot in results['plots']:
+            plot_card = MDCard(
                 size_hint_y=None,
-                height='80dp',
+                height='64dp',
                 elevation=0,
                 ripple_behavior=True,
-                md_bg_color=self.theme_cls.primary_color,
-                radius=[15, 15, 15, 15],
+                radius=[10, 10, 10, 10],
                 padding=dp(10)
             )
+            plot_card.bind(on_release=lambda x, project_id=project_id: self.open_project(project_id))
             
-            project_card.bind(on_release=lambda x, idx=index: self.open_project(idx))
-
-            project_label = MDLabel(
-                text=project['name'],
-                halign='center',
-                valign='middle',
-                font_style='H6',
+            card_layout = MDBoxLayout(orientation='vertical', spacing=dp(2))
+            card_layout.add_widget(MDLabel(
+                text=plot.get('formula_kuchler', ''),
+                halign='left',
+                font_style='Subtitle1',
                 bold=True,
-                theme_text_color='Custom',
-                text_color=(1, 1, 1, 1),
-            )
-
-            project_card.add_widget(project_label)
-            projects_list_container.add_widget(project_card)
-
+                size_hint_y=None,
+                height=dp(25)
+            ))
+            card_layout.add_widget(MDLabel(
+                text=f"{project_names.get(project_id, '')} · Parcela {plot.get('numero', '')}",
+                halign='left',
+                font_style='Caption',
+                size_hint_y=None,
+                height=dp(18)
+            ))
+            plot_card.add_widget(card_layout)
+            container.add_widget(plot_card)
+    
     def save_new_project(self):
         """Salva um novo projeto no arquivo JSON."""
         project_name = self.root.get_screen('new_project_screen').ids.project_name_input.text.strip()
-
+        
         if not project_name:
             # Mostra diálogo pedindo para inserir um nome
             self.show_info_dialog('Nome Obrigatório', 'Por favor, insira um nome para o projeto.')
             return
-
+        
         new_project = {
+            'id': data.new_id(),
             'name': project_name,
-            'plots': []
+            'plots': [],
+            'next_plot_number': 1
         }
-
+        
         projects_data.setdefault('projects', []).append(new_project)
-        data.save_data(projects_data, JSON_FILE)
-
+        self.update_index('search', 'add_project', new_project)
+        self.save_projects(new_project['id'])
+        
         # Limpa os campos de entrada
         self.root.get_screen('new_project_screen').ids.project_name_input.text = ''
-
+        
         # Mostra diálogo de confirmação
         self.show_success_dialog('Projeto Criado', f'O projeto "{project_name}" foi criado com sucesso!')
         
@@ -211,7 +897,7 @@ class KuchlerInventoryApp(MDApp):
         """Carrega a lista de projetos para exclusão."""
         projects_list_container = self.root.get_screen('delete_project_screen').ids.delete_projects_list_container
         projects_list_container.clear_widgets()
-
+        
         projects = projects_data.get('projects', [])
         
         if not projects:
@@ -224,7 +910,7 @@ class KuchlerInventoryApp(MDApp):
             )
             projects_list_container.add_widget(no_projects_label)
         else:
-            for index, project in enumerate(projects):
+            for project in projects:
                 project_card = MDCard(
                     size_hint_y=None,
                     height='70dp',
@@ -235,8 +921,8 @@ class KuchlerInventoryApp(MDApp):
                 )
                 
                 # Adiciona função de clique para confirmar exclusão
-                project_card.bind(on_release=lambda x, idx=index, proj=project: self.confirm_delete_project(idx, proj))
-
+                project_card.bind(on_release=lambda x, proj=project: self.confirm_delete_project(proj))
+                
                 # Layout interno do card
                 from kivymd.uix.boxlayout import MDBoxLayout
                 card_layout = MDBoxLayout(
@@ -268,10 +954,13 @@ class KuchlerInventoryApp(MDApp):
                 project_card.add_widget(card_layout)
                 projects_list_container.add_widget(project_card)
     
-    def confirm_delete_project(self, project_index, project):
+    def confirm_delete_project(self, project):
         """Mostra diálogo de confirmação para excluir projeto."""
         project_name = project.get('name', 'este projeto')
         
+        # O botão de excluir lê o projeto pendente, evitando callbacks antigos no diálogo reutilizado
+        self.pending_delete_project_id = project['id']
+        
         if not hasattr(self, 'delete_project_dialog') or not self.delete_project_dialog:
             self.delete_project_dialog = MDDialog(
                 title='Excluir Projeto',
@@ -287,27 +976,36 @@ class KuchlerInventoryApp(MDApp):
                         text='EXCLUIR',
                         md_bg_color=self.theme_cls.primary_color,
                         elevation=0,
-                        on_release=lambda x: self.delete_project(project_index, project_name)
+                        on_release=lambda x: self.delete_project(self.pending_delete_project_id)
                     ),
                 ],
             )
         else:
             self.delete_project_dialog.text = f'Deseja realmente excluir o projeto "{project_name}"?\nTodos os dados serão perdidos.'
-            # Atualiza o botão de excluir com o novo callback
-            self.delete_project_dialog.buttons[1].unbind(on_release=self.delete_project_dialog.buttons[1].on_release)
-            self.delete_project_dialog.buttons[1].bind(on_release=lambda x: self.delete_project(project_index, project_name))
         
         self.delete_project_dialog.open()
     
-    def delete_project(self, project_index, project_name):
+    def delete_project(self, project_id):
         """Executa a exclusão do projeto."""
         if self.delete_project_dialog:
             self.delete_project_dialog.dismiss()
         
         # Remove o projeto da lista
-        if 0 <= project_index < len(projects_data.get('projects', [])):
-            projects_data['projects'].pop(project_index)
-            data.save_data(projects_data, JSON_FILE)
+        project = data.find_project(projects_data, project_id)
+        if project is not None:
+            project_name = project.get('name', '')
+            
+            def remove_project():
+                # A exclusão fica registrada para não ser desfeita pela sincronização
+                project = data.delete_project(projects_data, project_id)
+                if project is not None:
+                    for plot in project.get('plots', []):
+                        self.update_index('revisit', 'remove', plot.get('id'))
+                    self.update_index('search', 'remove_project', project_id)
+                return True
+            
+            remove_project()
+            self.save_projects(project_id, data.PROJECT_TOMBSTONES_KEY, retry=remove_project)
             
             self.show_success_dialog('Projeto Excluído', f'O projeto "{project_name}" foi excluído com sucesso!')
             self.go_to_screen('my_projects_screen')
@@ -358,10 +1056,12 @@ class KuchlerInventoryApp(MDApp):
     
     # ==================== VISUALIZAÇÃO DE PROJETOS ====================
     
-    def open_project(self, project_index):
+    def open_project(self, project_id):
         """Abre projeto específico para visualização."""
-        self.current_project_index = project_index
-        self.current_project = projects_data.get('projects', [])[project_index]
+        self.current_project = data.find_project(projects_data, project_id)
+        if self.current_project is None:
+            return
+        self.current_plot_index = data.PlotIndex(self.current_project)
         self.go_to_screen('view_project_screen')
     
     def load_project_details(self):
@@ -382,8 +1082,14 @@ class KuchlerInventoryApp(MDApp):
         if not self.current_project:
             return
         
+        # Interrompe a montagem anterior da lista, se ainda estiver em andamento
+        if self.plots_list_job is not None:
+            self.plots_list_job.cancel()
+            self.plots_list_job = None
+        
         plots_list = self.root.get_screen('view_project_screen').ids.plots_list_container
         plots_list.clear_widgets()
+        self.profile_pending = {}
         
         plots = self.current_project.get('plots', [])
         
@@ -397,123 +1103,257 @@ class KuchlerInventoryApp(MDApp):
             )
             plots_list.add_widget(no_plots_label)
         else:
-            for index, plot in enumerate(plots):
-                # Layout interno do card
-                from kivymd.uix.boxlayout import MDBoxLayout
-                card_layout = MDBoxLayout(
-                    orientation='vertical',
-                    spacing=dp(4),
-                    size_hint_y=None,
-                    padding=0
-                )
-                card_layout.bind(minimum_height=card_layout.setter('height'))
-                
-                # Título da parcela
-                plot_title = MDLabel(
-                    text=f"Parcela {index + 1}",
-                    halign='left',
-                    font_style='Subtitle1',
-                    bold=True,
-                    size_hint_y=None
-                )
-                plot_title.bind(
-                    width=lambda instance, value: setattr(instance, 'text_size', (value, None))
-                )
-                plot_title.bind(
-                    texture_size=lambda instance, value: setattr(instance, 'height', value[1] + dp(4))
-                )
-                
-                # Coordenadas e fórmula
-                plot_coords = ''
-                if 'latitude' in plot and 'longitude' in plot:
-                    plot_coords = f"Lat: {plot['latitude']}, Long: {plot['longitude']}"
-                    # Adicionar fórmula se disponível
-                    if 'formula_kuchler' in plot and plot['formula_kuchler']:
-                        plot_coords += f" | Fórmula: {plot['formula_kuchler']}"
-                else:
-                    plot_coords = 'Sem coordenadas'
-                
-                plot_coords_label = MDLabel(
-                    text=plot_coords,
-                    halign='left',
+            # Cards criados em fatias por frame: projetos grandes não travam a interface
+            self.plots_list_job = self.scheduler.run_incremental(self.build_plot_cards(plots_list, list(plots)))
+    
+    def build_plot_cards(self, plots_list, plots):
+        """
+        Cria os cards das parcelas, um por passo.
+        
+        Args:
+            plots_list: Container da lista de parcelas
+            plots (list): Parcelas do projeto
+        
+        Yields:
+            None: Após adicionar cada card
+        """
+        from kivymd.uix.boxlayout import MDBoxLayout
+        
+        for index, plot in enumerate(plots):
+            # Layout interno do card
+            card_layout = MDBoxLayout(
+                orientation='vertical',
+                spacing=dp(4),
+                size_hint_y=None,
+                padding=0
+            )
+            card_layout.bind(minimum_height=card_layout.setter('height'))
+            
+            # Textos com quebra de linha; as texturas já diagramadas vêm do cache de layouts
+            text_color = self.theme_cls.text_color
+            
+            # Título da parcela
+            plot_title = CachedLabel(
+                self.text_layout_cache,
+                text=f"Parcela {plot.get('numero', index + 1)}",
+                font_style='Subtitle1',
+                bold=True,
+                color=text_color
+            )
+            
+            # Coordenadas e fórmula
+            plot_coords = ''
+            if 'latitude' in plot and 'longitude' in plot:
+                plot_coords = f"Lat: {plot['latitude']}, Long: {plot['longitude']}"
+                # Adicionar fórmula se disponível
+                if 'formula_kuchler' in plot and plot['formula_kuchler']:
+                    plot_coords += f" | Fórmula: {plot['formula_kuchler']}"
+            else:
+                plot_coords = 'Sem coordenadas'
+            
+            plot_coords_label = CachedLabel(
+                self.text_layout_cache,
+                text=plot_coords,
+                font_style='Caption',
+                color=text_color
+            )
+            
+            # Data e horário de registro
+            datetime_text = ''
+            if 'data_registro' in plot and 'horario_registro' in plot:
+                datetime_text = f"Registrado em: {plot['data_registro']} às {plot['horario_registro']}"
+            elif 'data_registro' in plot:
+                datetime_text = f"Registrado em: {plot['data_registro']}"
+            else:
+                datetime_text = 'Data de registro não disponível'
+            
+            plot_datetime_label = CachedLabel(
+                self.text_layout_cache,
+                text=datetime_text,
+                font_style='Caption',
+                color=text_color
+            )
+            
+            # Adicionar widgets ao layout
+            card_layout.add_widget(plot_title)
+            card_layout.add_widget(plot_coords_label)
+            card_layout.add_widget(plot_datetime_label)
+            
+            # Ponto revisitado: visita e mudanças desde a visita anterior
+            revisit_text = self.revisit_index.describe(plot.get('id')) if self.revisit_index else None
+            if revisit_text:
+                revisit_label = CachedLabel(
+                    self.text_layout_cache,
+                    text=revisit_text,
                     font_style='Caption',
-                    size_hint_y=None
-                )
-                # Permitir quebra de linha para coordenadas/fórmula
-                plot_coords_label.bind(
-                    width=lambda instance, value: setattr(instance, 'text_size', (value, None))
+                    color=self.theme_cls.secondary_text_color
                 )
-                plot_coords_label.bind(
-                    texture_size=lambda instance, value: setattr(instance, 'height', value[1] + dp(4))
-                )
-                
-                # Data e horário de registro
-                datetime_text = ''
-                if 'data_registro' in plot and 'horario_registro' in plot:
-                    datetime_text = f"Registrado em: {plot['data_registro']} às {plot['horario_registro']}"
-                elif 'data_registro' in plot:
-                    datetime_text = f"Registrado em: {plot['data_registro']}"
-                else:
-                    datetime_text = 'Data de registro não disponível'
-                
-                plot_datetime_label = MDLabel(
-                    text=datetime_text,
-                    halign='left',
+                card_layout.add_widget(revisit_label)
+            
+            # Descrição fisionômica (com altura adaptativa)
+            if 'descricao_fisionomia' in plot and plot['descricao_fisionomia']:
+                plot_description_label = CachedLabel(
+                    self.text_layout_cache,
+                    text=plot['descricao_fisionomia'],
                     font_style='Caption',
-                    size_hint_y=None
-                )
-                # Permitir quebra de linha para data/hora
-                plot_datetime_label.bind(
-                    width=lambda instance, value: setattr(instance, 'text_size', (value, None))
+                    markup=True,
+                    color=text_color
                 )
-                plot_datetime_label.bind(
-                    texture_size=lambda instance, value: setattr(instance, 'height', value[1] + dp(4))
-                )
-                
-                # Adicionar widgets ao layout
-                card_layout.add_widget(plot_title)
-                card_layout.add_widget(plot_coords_label)
-                card_layout.add_widget(plot_datetime_label)
-                
-                # Descrição fisionômica (com altura adaptativa)
-                if 'descricao_fisionomia' in plot and plot['descricao_fisionomia']:
-                    plot_description_label = MDLabel(
-                        text=plot['descricao_fisionomia'],
-                        halign='left',
-                        font_style='Caption',
-                        size_hint_y=None,
-                        markup=True
-                    )
-                    # Permitir quebra de linha e ajustar altura automaticamente
-                    plot_description_label.bind(
-                        width=lambda instance, value: setattr(instance, 'text_size', (value, None))
-                    )
-                    plot_description_label.bind(
-                        texture_size=lambda instance, value: setattr(instance, 'height', value[1] + dp(4))
-                    )
-                    card_layout.add_widget(plot_description_label)
-                
-                # Criar o card com altura adaptativa
-                plot_card = MDCard(
-                    size_hint_y=None,
+                card_layout.add_widget(plot_description_label)
+            
+            # Miniaturas: matriz (um widget, buffer em cache por parcela) e perfil vertical
+            thumbnails_row = MDBoxLayout(
+                orientation='horizontal',
+                spacing=dp(12),
+                size_hint_y=None,
+                height=dp(80)
+            )
+            thumbnail = MatrixHeatmap(
+                pixels=heatmap.plot_pixels(plot),
+                interactive=False,
+                size_hint=(None, None),
+                size=(dp(128), dp(64)),
+                pos_hint={'center_y': 0.5}
+            )
+            # O perfil é carregado só quando o card aparece na tela (load_visible_profiles)
+            profile = Image(
+                size_hint=(None, None),
+                size=(dp(120), dp(80)),
+                fit_mode='contain',
+                opacity=0
+            )
+            thumbnails_row.add_widget(thumbnail)
+            thumbnails_row.add_widget(profile)
+            card_layout.add_widget(thumbnails_row)
+            self.profile_pending[profile] = plot.get('matriz_fisionomica') or {}
+            self.profile_trigger()
+            
+            # Criar o card com altura adaptativa
+            plot_card = MDCard(
+                size_hint_y=None,
+                elevation=0,
+                ripple_behavior=True,
+                radius=[10, 10, 10, 10],
+                padding=dp(10),
+                line_color=(0.7, 0.7, 0.7, 1),
+                style="outlined"
+            )
+            plot_card.add_widget(card_layout)
+            
+            # Ajustar altura do card baseado no conteúdo (usando factory para evitar closure)
+            def make_update_func(card, layout):
+                def update_height(instance, value):
+                    card.height = layout.height + dp(20)
+                return update_height
+            
+            card_layout.bind(height=make_update_func(plot_card, card_layout))
+            
+            plots_list.add_widget(plot_card)
+            yield
+    
+    def load_visible_profiles(self, *args):
+        """Carrega os perfis verticais dos cards visíveis (e de uma tela abaixo e acima)."""
+        if not self.profile_pending or self.root.current != 'view_project_screen':
+            return
+        
+        scroll = self.root.get_screen('view_project_screen').ids.plots_scroll
+        _, bottom = scroll.to_window(scroll.x, scroll.y)
+        top = bottom + scroll.height
+        margin = scroll.height
+        
+        for widget, matrix in list(self.profile_pending.items()):
+            _, widget_bottom = widget.to_window(widget.x, widget.y)
+            if widget_bottom > top + margin or widget_bottom + widget.height < bottom - margin:
+                continue
+            del self.profile_pending[widget]
+            
+            key = profiles.profile_key(matrix)
+            path = self.profile_cache.get(key)
+            if path is not None:
+                self.show_profile(widget, path)
+                continue
+            # Desenho em segundo plano; o card pode ter saído da lista até lá
+            self.scheduler.submit(
+                profiles.cached_profile, self.profile_cache, matrix,
+                priority=jobs.PRIORITY_LOW,
+                on_done=lambda path, widget=widget: self.show_profile(widget, path),
+                on_error=lambda error: print(f"Erro ao desenhar perfil: {error}")
+            )
+    
+    def show_profile(self, widget, path):
+        """Exibe a miniatura do perfil em um card."""
+        widget.source = path
+        widget.opacity = 1
+    
+    def show_project_heatmap(self):
+        """Calcula em segundo plano e exibe o mapa de frequência das células do projeto."""
+        if not self.current_project:
+            return
+        
+        plots = list(self.current_project.get('plots', []))
+        if not plots:
+            self.show_info_dialog('Mapa de Frequência', 'O projeto ainda não tem parcelas.')
+            return
+        
+        project_name = self.current_project.get('name', '')
+        self.scheduler.submit(
+            heatmap.cell_frequencies, plots,
+            on_done=lambda result: self.open_heatmap_dialog(project_name, *result),
+            on_error=lambda error: self.show_info_dialog('Erro', f'Não foi possível montar o mapa.\n{error}')
+        )
+    
+    def open_heatmap_dialog(self, project_name, frequencies, total):
+        """
+        Exibe o mapa de frequência; tocar em uma célula mostra a sua frequência.
+        
+        Args:
+            project_name (str): Nome do projeto
+            frequencies (dict): Célula -> fração das parcelas
+            total (int): Número de parcelas
+        """
+        from kivymd.uix.boxlayout import MDBoxLayout
+        
+        content = MDBoxLayout(
+            orientation='vertical',
+            spacing=dp(8),
+            size_hint_y=None,
+            height=dp(200)
+        )
+        heatmap_widget = MatrixHeatmap(
+            pixels=heatmap.frequency_pixels(frequencies),
+            size_hint=(1, None),
+            height=dp(150)
+        )
+        cell_label = MDLabel(
+            text=f"{total} parcela(s). Toque em uma célula para ver a frequência.",
+            halign='center',
+            font_style='Caption',
+            size_hint_y=None,
+            height=dp(40)
+        )
+        
+        def show_cell(instance, form, height):
+            fraction = frequencies.get(f"{form}{height}", 0.0)
+            cell_label.text = f"{form}{height} ({self.get_altura_range(height)}): {fraction:.0%} das parcelas"
+        
+        heatmap_widget.bind(on_cell=show_cell)
+        content.add_widget(heatmap_widget)
+        content.add_widget(cell_label)
+        
+        dialog = MDDialog(
+            title=f"Frequência das células - {project_name}",
+            type="custom",
+            content_cls=content,
+            buttons=[
+                MDRaisedButton(
+                    text='FECHAR',
+                    md_bg_color=self.theme_cls.primary_color,
                     elevation=0,
-                    ripple_behavior=True,
-                    radius=[10, 10, 10, 10],
-                    padding=dp(10),
-                    line_color=(0.7, 0.7, 0.7, 1),
-                    style="outlined"
+                    on_release=lambda x: dialog.dismiss()
                 )
-                plot_card.add_widget(card_layout)
-                
-                # Ajustar altura do card baseado no conteúdo (usando factory para evitar closure)
-                def make_update_func(card, layout):
-                    def update_height(instance, value):
-                        card.height = layout.height + dp(20)
-                    return update_height
-                
-                card_layout.bind(height=make_update_func(plot_card, card_layout))
-                
-                plots_list.add_widget(plot_card)
+            ]
+        )
+        dialog.open()
     
     def go_to_new_plot(self):
         """Navega para a tela de adicionar nova parcela."""
@@ -565,6 +1405,9 @@ class KuchlerInventoryApp(MDApp):
         self.temp_plot_data['longitude'] = longitude
         self.temp_plot_data['altitude'] = altitude
         
+        # Inicia o rascunho com o estado atual (a matriz pode vir de uma edição anterior)
+        self.draft_journal.start(self.current_project['id'], self.temp_plot_data)
+        
         # Limpa os campos
         screen.ids.latitude_input.text = ''
         screen.ids.longitude_input.text = ''
@@ -573,6 +1416,10 @@ class KuchlerInventoryApp(MDApp):
         # Limpa a matriz antes de navegar
         self.clear_matriz_interface()
         
+        # Sincroniza a pré-visualização com a matriz em edição
+        self.formula_preview.reset(self.temp_plot_data['matriz_fisionomica'])
+        self.formula_preview_trigger()
+        
         # Navega para a próxima tela
         self.go_to_screen('new_plot_screen2')
     
@@ -701,16 +1548,22 @@ class KuchlerInventoryApp(MDApp):
         """Salva a combinação forma-altura-cobertura na célula."""
         key = f"{forma}{altura}"
         self.temp_plot_data['matriz_fisionomica'][key] = cobertura
+        self.record_draft_cell(key, cobertura)
+        self.formula_preview.set_cell(key, cobertura)
         self.cobertura_dialog.dismiss()
         self.update_matriz_cell_display(forma, altura)
+        self.formula_preview_trigger()
     
     def clear_matriz_cell(self, forma, altura):
         """Limpa uma célula da matriz."""
         key = f"{forma}{altura}"
         if key in self.temp_plot_data['matriz_fisionomica']:
             del self.temp_plot_data['matriz_fisionomica'][key]
+        self.record_draft_cell(key, None)
+        self.formula_preview.clear_cell(key)
         self.cobertura_dialog.dismiss()
         self.update_matriz_cell_display(forma, altura)
+        self.formula_preview_trigger()
     
     def update_matriz_cell_display(self, forma, altura):
         """Atualiza a exibição de uma célula específica da matriz."""
@@ -728,6 +1581,19 @@ class KuchlerInventoryApp(MDApp):
         except Exception as e:
             print(f"Erro ao atualizar célula {forma}{altura}: {e}")
     
+    def update_formula_preview(self, *args):
+        """Atualiza a pré-visualização da fórmula e da descrição na tela da matriz."""
+        try:
+            screen = self.root.get_screen('new_plot_screen2')
+            if not hasattr(screen, 'ids') or 'formula_preview_label' not in screen.ids:
+                return
+            
+            formula = self.formula_preview.formula()
+            screen.ids.formula_preview_label.text = formula if formula else '—'
+            screen.ids.description_preview_label.text = self.formula_preview.description()
+        except Exception as e:
+            print(f"Erro ao atualizar pré-visualização da fórmula: {e}")
+    
     def select_folha_cell(self, altura):
         """Mostra diálogo para selecionar características de folhas."""
         from kivymd.uix.boxlayout import MDBoxLayout
@@ -784,6 +1650,8 @@ class KuchlerInventoryApp(MDApp):
         """Salva a característica de folha."""
         key = f"F{altura}"
         self.temp_plot_data['matriz_fisionomica'][key] = folha
+        self.record_draft_cell(key, folha)
+        self.formula_preview.set_cell(key, folha)
         self.folha_dialog.dismiss()
         self.update_folha_cell_display(altura)
     
@@ -792,6 +1660,8 @@ class KuchlerInventoryApp(MDApp):
         key = f"F{altura}"
         if key in self.temp_plot_data['matriz_fisionomica']:
             del self.temp_plot_data['matriz_fisionomica'][key]
+        self.record_draft_cell(key, None)
+        self.formula_preview.clear_cell(key)
         self.folha_dialog.dismiss()
         self.update_folha_cell_display(altura)
     
@@ -822,10 +1692,8 @@ class KuchlerInventoryApp(MDApp):
             self.show_info_dialog('Matriz Vazia', 'Por favor, preencha pelo menos uma célula da matriz fisionômica.')
             return
         
-        # Obtém data e horário atual
-        now = datetime.now()
-        data_registro = now.strftime('%d/%m/%Y')
-        horario_registro = now.strftime('%H:%M:%S')
+        # Obtém data e horário atual (campos de exibição e momento ISO-8601 com fuso)
+        registro = timeindex.registration_fields()
         
         # Gera a fórmula de Küchler e a descrição
         matriz_data = self.temp_plot_data.get('matriz_fisionomica', {})
@@ -838,23 +1706,44 @@ class KuchlerInventoryApp(MDApp):
             'longitude': self.temp_plot_data.get('longitude', 0),
             'altitude': self.temp_plot_data.get('altitude', 0),
             'matriz_fisionomica': self.temp_plot_data.get('matriz_fisionomica', {}),
-            'data_registro': data_registro,
-            'horario_registro': horario_registro,
+            'data_registro': registro['data_registro'],
+            'horario_registro': registro['horario_registro'],
+            'registrado_em': registro['registrado_em'],
             'formula_kuchler': formula_kuchler,
             'descricao_fisionomia': descricao_fisionomia
         }
         
-        # Adiciona a parcela ao projeto atual
-        if 'plots' not in self.current_project:
-            self.current_project['plots'] = []
+        # Adiciona a parcela ao projeto atual (atribui id e número estáveis)
+        project_id = self.current_project['id']
+        self.current_plot_index.add(new_plot)
+        self.update_plot_indexes('add', project_id, new_plot)
         
-        self.current_project['plots'].append(new_plot)
+        def add_plot_again():
+            # Projeto recarregado do disco: a parcela recebe o próximo número dele
+            # (pelo id: o usuário pode ter aberto outro projeto nesse meio tempo)
+            project, plot_index = self.find_project_index(project_id)
+            if project is None:
+                return False
+            new_plot.pop('numero', None)
+            plot_index.add(new_plot)
+            self.update_plot_indexes('add', project_id, new_plot)
+            return True
         
-        # Salva os dados atualizados
-        data.save_data(projects_data, JSON_FILE)
+        # O rascunho é separado e só é apagado quando a parcela estiver gravada em disco;
+        # se a gravação falhar e o app for encerrado, a parcela ainda pode ser recuperada
+        draft_path = None
+        try:
+            draft_path = self.draft_journal.detach(new_plot['id'])
+        except OSError as e:
+            print(f"Erro ao separar rascunho: {e}")
         
-        # Limpa os dados temporários
+        # Salva os dados atualizados em segundo plano
+        self.save_projects(project_id, retry=add_plot_again,
+                           on_saved=draft_path and (lambda: drafts.remove_draft(draft_path)))
+        
+        # Limpa os dados temporários (o diário fica livre para a próxima parcela)
         self.temp_plot_data = {'matriz_fisionomica': {}}
+        self.formula_preview.reset()
         
         # Mostra diálogo de confirmação com opções
         self.show_plot_saved_confirmation()
@@ -898,7 +1787,7 @@ class KuchlerInventoryApp(MDApp):
         
         plots_list_container = self.root.get_screen('delete_plot_screen').ids.delete_plots_list_container
         plots_list_container.clear_widgets()
-
+        
         plots = self.current_project.get('plots', [])
         
         if not plots:
@@ -922,8 +1811,8 @@ class KuchlerInventoryApp(MDApp):
                 )
                 
                 # Adiciona função de clique para confirmar exclusão
-                plot_card.bind(on_release=lambda x, idx=index, plt=plot: self.confirm_delete_single_plot(idx, plt))
-
+                plot_card.bind(on_release=lambda x, plt=plot: self.confirm_delete_single_plot(plt))
+                
                 # Layout interno do card
                 from kivymd.uix.boxlayout import MDBoxLayout
                 card_layout = MDBoxLayout(
@@ -932,7 +1821,7 @@ class KuchlerInventoryApp(MDApp):
                 )
                 
                 plot_name_label = MDLabel(
-                    text=f'Parcela {index + 1}',
+                    text=f"Parcela {plot.get('numero', index + 1)}",
                     halign='left',
                     font_style='Subtitle1',
                     bold=True,
@@ -950,7 +1839,7 @@ class KuchlerInventoryApp(MDApp):
                     plot_info_text = f"Localização: {plot['location']}"
                 else:
                     plot_info_text = 'Dados da parcela'
-                    
+                
                 plot_info_label = MDLabel(
                     text=plot_info_text,
                     halign='left',
@@ -982,12 +1871,17 @@ class KuchlerInventoryApp(MDApp):
                 plot_card.add_widget(card_layout)
                 plots_list_container.add_widget(plot_card)
     
-    def confirm_delete_single_plot(self, plot_index, plot):
+    def confirm_delete_single_plot(self, plot):
         """Mostra diálogo de confirmação para excluir parcela."""
+        plot_number = plot.get('numero', '')
+        
+        # O botão de excluir lê a parcela pendente, evitando callbacks antigos no diálogo reutilizado
+        self.pending_delete_plot_id = plot['id']
+        
         if not hasattr(self, 'delete_single_plot_dialog') or not self.delete_single_plot_dialog:
             self.delete_single_plot_dialog = MDDialog(
                 title='Excluir Parcela',
-                text=f'Deseja realmente excluir a Parcela {plot_index + 1}?\nTodos os dados serão perdidos.',
+                text=f'Deseja realmente excluir a Parcela {plot_number}?\nTodos os dados serão perdidos.',
                 buttons=[
                     MDRaisedButton(
                         text='CANCELAR',
@@ -999,89 +1893,234 @@ class KuchlerInventoryApp(MDApp):
                         text='EXCLUIR',
                         md_bg_color=self.theme_cls.primary_color,
                         elevation=0,
-                        on_release=lambda x: self.delete_single_plot(plot_index)
+                        on_release=lambda x: self.delete_single_plot(self.pending_delete_plot_id)
                     ),
                 ],
             )
         else:
-            self.delete_single_plot_dialog.text = f'Deseja realmente excluir a Parcela {plot_index + 1}?\nTodos os dados serão perdidos.'
-            # Atualiza o botão de excluir com o novo callback
-            self.delete_single_plot_dialog.buttons[1].unbind(on_release=self.delete_single_plot_dialog.buttons[1].on_release)
-            self.delete_single_plot_dialog.buttons[1].bind(on_release=lambda x: self.delete_single_plot(plot_index))
+            self.delete_single_plot_dialog.text = f'Deseja realmente excluir a Parcela {plot_number}?\nTodos os dados serão perdidos.'
         
         self.delete_single_plot_dialog.open()
     
-    def delete_single_plot(self, plot_index):
+    def delete_single_plot(self, plot_id):
         """Executa a exclusão da parcela."""
         if self.delete_single_plot_dialog:
             self.delete_single_plot_dialog.dismiss()
         
         # Remove a parcela da lista
-        if self.current_project and 0 <= plot_index < len(self.current_project.get('plots', [])):
-            self.current_project['plots'].pop(plot_index)
+        if self.current_project and plot_id in self.current_plot_index:
+            project_id = self.current_project['id']
+            
+            def remove_plot():
+                # Registra a exclusão para a exportação incremental
+                project, plot_index = self.find_project_index(project_id)
+                if project is None or plot_id not in plot_index:
+                    return None
+                position = plot_index.position(plot_id)
+                tombstone = exporter.make_tombstone(project['plots'], position)
+                project.setdefault('plot_tombstones', []).append(tombstone)
+                self.update_plot_indexes('remove', plot_id)
+                return plot_index.remove(plot_id)
             
-            # Atualiza os dados no arquivo
-            projects_data['projects'][self.current_project_index] = self.current_project
-            data.save_data(projects_data, JSON_FILE)
+            plot = remove_plot()
+            
+            # Atualiza os dados no arquivo em segundo plano
+            self.save_projects(project_id, retry=lambda: remove_plot() is not None)
             
             # Mostra diálogo de confirmação
-            self.show_success_dialog('Parcela Excluída', f'A Parcela {plot_index + 1} foi excluída com sucesso!')
+            self.show_success_dialog('Parcela Excluída', f"A Parcela {plot.get('numero', '')} foi excluída com sucesso!")
             
             # Volta para a tela de detalhes do projeto
             self.go_to_screen('view_project_screen')
     
     def export_project_to_csv(self):
-        """Exporta o projeto atual para um arquivo CSV."""
+        """Exporta o projeto atual para um arquivo CSV em segundo plano."""
         if not self.current_project:
             return
         
-        plots = self.current_project.get('plots', [])
+        # Cópia rasa da lista: novas parcelas não afetam a exportação em andamento
+        plots = list(self.current_project.get('plots', []))
         
         if not plots:
             # Mostra diálogo se não houver parcelas
             self.show_info_dialog('Sem Parcelas', 'Este projeto ainda não possui parcelas para exportar.')
             return
         
-        # Cria a pasta exports se não existir
-        exports_dir = 'exports'
-        if not os.path.exists(exports_dir):
-            os.makedirs(exports_dir)
-        
         # Nome do arquivo com timestamp
         project_name = self.current_project.get('name', 'projeto')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{project_name}_{timestamp}.csv"
-        filepath = os.path.join(exports_dir, filename)
-        
-        # Coleta todas as chaves possíveis das parcelas
-        all_keys = set()
-        for plot in plots:
-            all_keys.update(plot.keys())
-        
-        # Ordena as chaves para manter consistência
-        # Garante que descricao_fisionomia seja o último campo
-        fieldnames = sorted(list(all_keys))
-        if 'descricao_fisionomia' in fieldnames:
-            fieldnames.remove('descricao_fisionomia')
-            fieldnames.append('descricao_fisionomia')
-        
-        # Escreve o arquivo CSV
-        try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(plots)
-            
-            # Mostra confirmação
+        filename = exporter.build_export_filename(project_name)
+        filepath = os.path.join(EXPORTS_DIR, filename)
+        
+        self.show_export_progress(len(plots))
+        self.export_job = self.scheduler.submit(
+            self.run_export_worker, plots, filepath,
+            pass_job=True,
+            on_progress=self.update_export_progress,
+            on_done=lambda completed: self.finish_export(filename),
+            on_error=self.export_failed,
+            on_cancel=lambda: self.finish_export(None)
+        )
+    
+    def run_export_worker(self, job, plots, filepath):
+        """Escreve o CSV fora da thread da interface."""
+        exporter.stream_plots_to_csv(plots, filepath, progress=job.report_progress, cancelled=job.is_cancelled)
+    
+    def export_all_projects(self):
+        """Exporta todos os projetos para um único arquivo .zip em segundo plano."""
+        projects = [project for project in projects_data.get('projects', []) if project.get('plots')]
+        
+        if not projects:
+            self.show_info_dialog('Sem Parcelas', 'Nenhum projeto possui parcelas para exportar.')
+            return
+        
+        filename = f"projetos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        filepath = os.path.join(EXPORTS_DIR, filename)
+        
+        self.show_export_progress(len(projects), 'projetos')
+        self.export_job = self.scheduler.submit(
+            self.run_export_all_worker, projects, filepath,
+            pass_job=True,
+            on_progress=self.update_export_progress,
+            on_done=lambda manifest: self.finish_export(filename),
+            on_error=self.export_failed,
+            on_cancel=lambda: self.finish_export(None)
+        )
+    
+    def run_export_all_worker(self, job, projects, filepath):
+        """Gera o arquivo compactado fora da thread da interface."""
+        return exporter.export_all_to_archive(
+            projects, filepath,
+            use_processes=USE_PROCESSES,
+            progress=job.report_progress,
+            cancelled=job.is_cancelled
+        )
+    
+    def generate_project_report(self):
+        """Gera o relatório HTML do projeto atual em segundo plano."""
+        if not self.current_project:
+            return
+        
+        # Cópia rasa do projeto: novas parcelas não afetam o relatório em andamento
+        project = dict(self.current_project, plots=list(self.current_project.get('plots', [])))
+        if not project['plots']:
+            self.show_info_dialog('Sem Parcelas', 'Este projeto ainda não possui parcelas para o relatório.')
+            return
+        
+        self.show_export_progress(len(project['plots']), 'imagens')
+        self.export_job = self.scheduler.submit(
+            self.run_report_worker, project,
+            pass_job=True,
+            on_progress=self.update_export_progress,
+            on_done=lambda path: self.finish_export(os.path.basename(path) if path else None),
+            on_error=self.export_failed,
+            on_cancel=lambda: self.finish_export(None)
+        )
+    
+    def run_report_worker(self, job, project):
+        """Desenha as imagens que faltam e grava o relatório fora da thread da interface."""
+        return report.generate_report(project, REPORTS_DIR, progress=job.report_progress, cancelled=job.is_cancelled)
+    
+    def analyze_sampling(self):
+        """Calcula em segundo plano a curva de rarefação e a suficiência amostral do projeto."""
+        if not self.current_project:
+            return
+        
+        plots = list(self.current_project.get('plots', []))
+        if len(plots) < 2:
+            self.show_info_dialog('Suficiência Amostral', 'São necessárias pelo menos 2 parcelas para a análise.')
+            return
+        
+        replicates = 1000
+        self.show_export_progress(replicates, 'réplicas', 'Analisando')
+        self.export_job = self.scheduler.submit(
+            self.run_sampling_worker, plots, replicates,
+            pass_job=True,
+            on_progress=self.update_export_progress,
+            on_done=self.show_sampling_result,
+            on_error=self.export_failed,
+            on_cancel=lambda: self.finish_export(None)
+        )
+    
+    def run_sampling_worker(self, job, plots, replicates):
+        """Distribui as réplicas bootstrap fora da thread da interface."""
+        return rarefaction.rarefaction(
+            plots, replicates,
+            use_processes=USE_PROCESSES,
+            progress=job.report_progress,
+            cancelled=job.is_cancelled
+        )
+    
+    def show_sampling_result(self, analysis):
+        """Mostra a suficiência amostral e alguns pontos da curva de rarefação."""
+        self.finish_export(None)
+        if analysis is None:
+            return
+        
+        # Cinco pontos da curva, do início ao total de parcelas
+        positions = sorted({round(step * (len(analysis['sizes']) - 1) / 4) for step in range(5)})
+        curve = '\n'.join(
+            f"{analysis['sizes'][position]} parcelas: {analysis['expected'][position]:.1f} tipos "
+            f"({analysis['lower'][position]:.1f} a {analysis['upper'][position]:.1f})"
+            for position in positions
+        )
+        verdict = 'suficiente' if analysis['adequate'] else 'ainda insuficiente'
+        self.show_info_dialog(
+            'Suficiência Amostral',
+            f"{analysis['plots']} parcelas, {analysis['types']} tipos fisionômicos (fórmulas).\n"
+            f"Cobertura amostral: {analysis['coverage']:.0%} (amostragem {verdict}).\n"
+            f"Chance de a próxima parcela ser um tipo novo: {analysis['new_type_chance']:.0%}.\n"
+            f"Tipos estimados (Chao1): {analysis['chao1']:.0f}.\n\n"
+            f"Curva de rarefação (IC 95%):\n{curve}"
+        )
+    
+    def export_failed(self, error):
+        """Mostra o erro de uma exportação em segundo plano."""
+        print(f"Erro ao exportar: {error}")
+        self.finish_export(None, str(error))
+    
+    def cancel_export(self):
+        """Interrompe a exportação em andamento."""
+        if self.export_job is not None:
+            self.export_job.cancel()
+    
+    def show_export_progress(self, total, unit='parcelas', title='Exportando'):
+        """Mostra diálogo de progresso da exportação (ou de outra tarefa em segundo plano)."""
+        self.export_progress_unit = unit
+        self.export_progress_dialog = MDDialog(
+            title=title,
+            text=f'0 de {total} {unit}',
+            auto_dismiss=False,
+            buttons=[
+                MDFlatButton(
+                    text='CANCELAR',
+                    on_release=lambda x: self.cancel_export()
+                ),
+            ],
+        )
+        self.export_progress_dialog.open()
+    
+    def update_export_progress(self, done, total):
+        """Atualiza o texto do diálogo de progresso."""
+        if getattr(self, 'export_progress_dialog', None):
+            self.export_progress_dialog.text = f'{done} de {total} {self.export_progress_unit}'
+    
+    def finish_export(self, filename, error=None):
+        """Fecha o diálogo de progresso e mostra o resultado da exportação (filename None = cancelada)."""
+        self.export_job = None
+        if getattr(self, 'export_progress_dialog', None):
+            self.export_progress_dialog.dismiss()
+            self.export_progress_dialog = None
+        
+        if error:
+            self.show_info_dialog('Erro na Exportação', f'Não foi possível exportar o projeto.\n{error}')
+        elif filename:
             self.show_export_success(filename)
-        except Exception as e:
-            print(f"Erro ao exportar CSV: {e}")
     
     def show_export_success(self, filename):
         """Mostra diálogo de sucesso após exportar."""
         success_dialog = MDDialog(
             title='Exportação Concluída',
-            text=f'Projeto exportado com sucesso!\nArquivo: {filename}',
+            text=f'Exportação concluída com sucesso!\nArquivo: {filename}',
             buttons=[
                 MDRaisedButton(
                     text='OK',
@@ -1113,7 +2152,7 @@ class KuchlerInventoryApp(MDApp):
             'theme_style': self.theme_cls.theme_style,
             'primary_color': self.theme_cls.primary_palette
         }
-        data.save_data(projects_data, JSON_FILE)
+        self.save_projects('settings')
     
     def toggle_theme_and_save(self):
         """Alterna entre tema claro e escuro e salva."""
@@ -1128,7 +2167,7 @@ class KuchlerInventoryApp(MDApp):
         if color_name in self.colors:
             self.theme_cls.primary_palette = self.colors[color_name]
             self.save_settings()
-    
+
 
 
 class MenuScreen(Screen):
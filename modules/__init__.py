@@ -2,6 +2,25 @@
 Módulos do aplicativo de Inventário Fitofisionômico.
 
 Módulos disponíveis:
+- backup: Snapshots comprimidos e deduplicados dos dados, com rotação
+- cli: Linha de comando para processamento em lote (python -m modules)
+- columnar: Exportação colunar (cubo NumPy .npz e Parquet) para análise
 - data_manager: Gerenciamento de dados JSON
+- drafts: Diário do rascunho da parcela em edição (recuperação após encerramento)
+- exporter: Exportação de parcelas em CSV
+- heatmap: Buffers RGBA da matriz e do mapa de frequência para uma textura única
+- jobs: Tarefas em segundo plano com prioridades, progresso e cancelamento
 - kuchler_calculator: Geração de fórmulas e descrições fisionômicas
+- metrics: Métricas estruturais (estratos, dossel, coberturas) por parcela e por projeto
+- models: Modelos compactos de projetos e parcelas em memória
+- monitoring: Pontos revisitados, diferenças entre visitas e séries temporais por ponto
+- optional: Importação das dependências opcionais (NumPy, Pillow) com mensagem clara
+- profiles: Diagramas de perfil vertical e cache LRU de miniaturas em disco
+- rarefaction: Curvas de rarefação com faixas bootstrap e suficiência amostral
+- report: Relatórios HTML/PDF por projeto, com imagens das matrizes em cache
+- search: Índice de prefixos para a busca enquanto se digita em projetos e parcelas
+- sync: Sincronização entre dispositivos (árvores de Merkle, arquivo ou HTTP)
+- textcache: Cache LRU, limitado pela memória, dos layouts de texto dos cards
+- tiles: Agregação espacial das parcelas em células por zoom, com exportação GeoJSON
+- timeindex: Timestamps ISO-8601 e índice temporal para consultas por data
 """
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Permite executar a linha de comando em lote com `python -m modules`.
+"""
+
+import sys
+
+from modules.cli import main
+
+sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Módulo de cópias de segurança (snapshots) dos dados.
+Cada snapshot guarda o data.json completo dividido em blocos comprimidos e
+endereçados pelo conteúdo: blocos que não mudaram entre snapshots (projetos
+inteiros ou trechos de parcelas) são gravados uma única vez.
+
+Cada arquivo de dados tem o seu diretório (ver store_dir), com a estrutura:
+    objects/ab/abcdef...   Blocos JSON comprimidos com zlib, nomeados pelo SHA-1
+    snapshots/<id>.json    Manifest de cada snapshot (lista de blocos)
+    store.lock             Trava da gravação de snapshots e da rotação
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
+from modules import data_manager
+
+# Fronteira de bloco: parcela cujo hash do id começa com um byte < CHUNK_BOUNDARY (de 256)
+# Os blocos têm em média 256 / CHUNK_BOUNDARY = 64 parcelas, com ids em qualquer
+# formato, e incluir ou excluir uma parcela altera apenas o bloco em que ela está
+CHUNK_BOUNDARY = 4
+
+# Limite de parcelas por bloco, para parcelas sem id ou sequências sem fronteira
+MAX_CHUNK_PLOTS = 256
+
+# Política de retenção padrão
+KEEP_LAST = 20
+MAX_AGE_DAYS = 30
+
+COMPRESSION_LEVEL = 6
+
+
+def _encode(value):
+    """Serializa um valor em JSON canônico (chaves ordenadas, sem espaços)."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def store_dir(file_path, backup_root=None):
+    """
+    Diretório de backups de um arquivo de dados.
+    
+    Cada arquivo tem o seu diretório, com o nome do arquivo sem extensão: a
+    comparação com o último snapshot, a restauração e a rotação só consideram
+    os snapshots do próprio arquivo.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        backup_root (str): Diretório que reúne os backups (padrão: 'backups' ao lado do arquivo)
+    
+    Returns:
+        str: Diretório do BackupStore do arquivo
+    """
+    root = backup_root or os.path.join(os.path.dirname(os.path.abspath(file_path)), 'backups')
+    return os.path.join(root, os.path.splitext(os.path.basename(file_path))[0])
+
+
+def _split_plots(plots):
+    """
+    Divide as parcelas em blocos com fronteiras definidas pelos próprios ids.
+    
+    Args:
+        plots (list): Parcelas de um projeto
+    
+    Yields:
+        list: Parcelas de cada bloco, em ordem
+    """
+    chunk = []
+    for plot in plots:
+        chunk.append(plot)
+        plot_id = plot.get('id')
+        at_boundary = (isinstance(plot_id, str)
+                       and hashlib.sha1(plot_id.encode('utf-8')).digest()[0] < CHUNK_BOUNDARY)
+        if at_boundary or len(chunk) >= MAX_CHUNK_PLOTS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BackupStore:
+    """Diretório de snapshots com blocos deduplicados."""
+    
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, 'objects')
+        self.snapshots_dir = os.path.join(backup_dir, 'snapshots')
+    
+    def _lock(self):
+        """
+        Trava do diretório de backups, entre threads e processos.
+        
+        A gravação de um snapshot (blocos primeiro, manifest por último) e a
+        rotação (que apaga os blocos sem manifest) não podem se intercalar: o app,
+        a linha de comando e os processos do pool podem usar o mesmo diretório.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        return data_manager.file_lock(os.path.join(self.backup_dir, 'store'))
+    
+    # ==================== BLOCOS ====================
+    
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+    
+    def _put(self, value, stats):
+        """Grava um bloco se ainda não existir e retorna seu hash."""
+        raw = _encode(value)
+        digest = hashlib.sha1(raw).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as file:
+                file.write(compressed)
+            os.replace(temp_path, path)
+            stats['objects_written'] += 1
+            stats['bytes_written'] += len(compressed)
+        stats['objects'] += 1
+        return digest
+    
+    def _get(self, digest):
+        """Lê e descomprime um bloco."""
+        with open(self._object_path(digest), 'rb') as file:
+            raw = zlib.decompress(file.read())
+        if hashlib.sha1(raw).hexdigest() != digest:
+            raise ValueError(f"Bloco corrompido no backup: {digest}")
+        return json.loads(raw.decode('utf-8'))
+    
+    # ==================== SNAPSHOTS ====================
+    
+    def take_snapshot(self, data, now=None):
+        """
+        Grava um snapshot dos dados.
+        
+        Apenas blocos novos são comprimidos e gravados. Se o conteúdo for igual ao
+        do último snapshot, nenhum snapshot é criado.
+        
+        Args:
+            data (dict): Dados no formato de data.json (não são alterados)
+            now (datetime): Momento do snapshot (padrão: agora)
+        
+        Returns:
+            dict: Resumo com 'id' (None se nada mudou), 'objects', 'objects_written'
+                  e 'bytes_written'
+        """
+        now = now or datetime.now()
+        stats = {'id': None, 'objects': 0, 'objects_written': 0, 'bytes_written': 0}
+        
+        with self._lock():
+            projects = []
+            for project in data.get('projects', []):
+                header = {key: value for key, value in project.items() if key != 'plots'}
+                projects.append({
+                    'header': self._put(header, stats),
+                    'chunks': [self._put(chunk, stats) for chunk in _split_plots(project.get('plots', []))]
+                })
+            
+            manifest = {
+                'root': self._put({key: value for key, value in data.items() if key != 'projects'}, stats),
+                'projects': projects
+            }
+            
+            latest = self.list_snapshots()[-1:]
+            if latest and self._load_manifest(latest[0]['id'])['content'] == manifest:
+                return stats
+            
+            snapshot_id = now.strftime('%Y%m%d_%H%M%S_%f')
+            os.makedirs(self.snapshots_dir, exist_ok=True)
+            path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'id': snapshot_id, 'created_at': now.isoformat(timespec='seconds'),
+                           'plots': sum(len(project.get('plots', [])) for project in data.get('projects', [])),
+                           'content': manifest}, file, separators=(',', ':'))
+            # O manifest é gravado por último: um snapshot só existe com todos os seus blocos
+            os.replace(temp_path, path)
+            
+            stats['id'] = snapshot_id
+            return stats
+    
+    def _load_manifest(self, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"), encoding='utf-8') as file:
+            return json.load(file)
+    
+    def list_snapshots(self):
+        """
+        Lista os snapshots, do mais antigo ao mais recente.
+        
+        Returns:
+            list: Dicionários com 'id', 'created_at' e 'plots'
+        """
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        
+        snapshots = []
+        for filename in sorted(os.listdir(self.snapshots_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                manifest = self._load_manifest(filename[:-5])
+            except (OSError, ValueError):
+                # Manifest ilegível: ignorado (os blocos são removidos na rotação)
+                continue
+            snapshots.append({key: manifest.get(key) for key in ('id', 'created_at', 'plots')})
+        return snapshots
+    
+    def load_snapshot(self, snapshot_id=None):
+        """
+        Reconstrói os dados de um snapshot.
+        
+        Args:
+            snapshot_id (str): Identificador do snapshot (padrão: o mais recente)
+        
+        Returns:
+            dict: Dados no formato de data.json
+        """
+        if snapshot_id is None:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise ValueError('Nenhum snapshot disponível')
+            snapshot_id = snapshots[-1]['id']
+        
+        with self._lock():
+            content = self._load_manifest(snapshot_id)['content']
+            data = self._get(content['root'])
+            data['projects'] = []
+            for entry in content['projects']:
+                project = self._get(entry['header'])
+                project['plots'] = [plot for digest in entry['chunks'] for plot in self._get(digest)]
+                data['projects'].append(project)
+            return data
+    
+    def restore(self, file_path, snapshot_id=None):
+        """
+        Restaura um snapshot em um arquivo data.json.
+        
+        O arquivo atual, se existir, é antes guardado em um novo snapshot, para
+        que a restauração possa ser desfeita.
+        
+        Args:
+            file_path (str): Arquivo de destino
+            snapshot_id (str): Identificador do snapshot (padrão: o mais recente)
+        
+        Returns:
+            dict: Dados restaurados
+        """
+        data = self.load_snapshot(snapshot_id)
+        if os.path.exists(file_path):
+            self.take_snapshot(data_manager.load_data(file_path))
+        # Sobrescreve sem mesclar, mas com versão nova: outros processos detectam a mudança
+        data_manager.DataStore(file_path).replace(data)
+        return data
+    
+    # ==================== ROTAÇÃO ====================
+    
+    def rotate(self, keep_last=KEEP_LAST, max_age_days=MAX_AGE_DAYS, now=None):
+        """
+        Remove snapshots antigos e os blocos que deixaram de ser usados.
+        
+        São mantidos no máximo os keep_last snapshots mais recentes, e apenas os
+        criados nos últimos max_age_days dias. O mais recente nunca é removido.
+        
+        Args:
+            keep_last (int): Quantidade máxima de snapshots mantidos
+            max_age_days (int): Idade máxima, em dias, dos demais snapshots
+            now (datetime): Momento de referência (padrão: agora)
+        
+        Returns:
+            dict: Resumo com 'snapshots_removed' e 'objects_removed'
+        """
+        now = now or datetime.now()
+        limit = (now - timedelta(days=max_age_days)).isoformat(timespec='seconds')
+        with self._lock():
+            snapshots = self.list_snapshots()
+            
+            removed = 0
+            for index, snapshot in enumerate(snapshots[:-1]):
+                too_many = index < len(snapshots) - max(keep_last, 1)
+                if too_many or (snapshot['created_at'] or '') < limit:
+                    os.remove(os.path.join(self.snapshots_dir, f"{snapshot['id']}.json"))
+                    removed += 1
+            
+            # Marca os blocos usados pelos snapshots restantes e remove os demais
+            used = set()
+            for snapshot in self.list_snapshots():
+                content = self._load_manifest(snapshot['id'])['content']
+                used.add(content['root'])
+                for entry in content['projects']:
+                    used.add(entry['header'])
+                    used.update(entry['chunks'])
+            
+            objects_removed = 0
+            if os.path.isdir(self.objects_dir):
+                for prefix in os.listdir(self.objects_dir):
+                    prefix_dir = os.path.join(self.objects_dir, prefix)
+                    for filename in os.listdir(prefix_dir):
+                        if filename not in used:
+                            os.remove(os.path.join(prefix_dir, filename))
+                            objects_removed += 1
+            
+            return {'snapshots_removed': removed, 'objects_removed': objects_removed}
+
+
+def snapshot_view(data):
+    """
+    Cópia rasa dos dados para um snapshot em segundo plano.
+    
+    Copia apenas os dicionários de projetos e suas listas (as parcelas não são
+    alteradas depois de gravadas), então custa O(parcelas) em ponteiros e
+    pode ser feita na thread da interface antes de iniciar a thread do backup.
+    
+    Args:
+        data (dict): Dados no formato de data.json
+    
+    Returns:
+        dict: Cópia rasa independente das listas originais
+    """
+    view = {key: list(value) if isinstance(value, list) else value for key, value in data.items()}
+    view['projects'] = [{key: list(value) if isinstance(value, list) else value
+                         for key, value in project.items()}
+                        for project in data.get('projects', [])]
+    return view
@@ -0,0 +1,572 @@
+"""
+Interface de linha de comando para processamento em lote, sem Kivy.
+Recalcula fórmulas, exporta CSVs e valida vários arquivos data.json em paralelo.
+
+Uso:
+    python -m modules validate dados/*.json
+    python -m modules recompute --jobs 8 dados/*.json
+    python -m modules export --output-dir exports dados/*.json
+    python -m modules export --since 2026-01-01 --until 2026-01-31 dados/*.json
+    python -m modules tiles --cell hex --zoom 9 --zoom 12 dados/*.json
+    python -m modules metrics dados/*.json
+    python -m modules monitor --radius 30 dados/*.json
+    python -m modules report --output-dir relatorios dados/*.json
+    python -m modules rarefaction --replicates 2000 --seed 1 dados/*.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+from modules import data_manager
+from modules import kuchler_calculator
+
+
+def recompute_file(file_path, output_path=None):
+    """
+    Recalcula fórmula e descrição de todas as parcelas de um arquivo.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        output_path (str): Arquivo de saída (padrão: sobrescreve o original)
+    
+    Returns:
+        dict: Resumo com número de parcelas e de parcelas alteradas
+    """
+    store = data_manager.DataStore(file_path)
+    data = store.load()
+    plots = changed = 0
+    
+    for project in data.get('projects', []):
+        project_changed = False
+        for plot in project.get('plots', []):
+            plots += 1
+            matrix = plot.get('matriz_fisionomica', {})
+            formula = kuchler_calculator.generate_kuchler_formula(matrix)
+            description = kuchler_calculator.generate_formula_description(matrix)
+            if plot.get('formula_kuchler') != formula or plot.get('descricao_fisionomia') != description:
+                plot['formula_kuchler'] = formula
+                plot['descricao_fisionomia'] = description
+                changed += 1
+                project_changed = True
+        if project_changed and 'id' in project:
+            store.mark_changed(project['id'])
+    
+    if output_path:
+        data_manager.save_data(data, output_path)
+    elif changed:
+        # Mescla com gravações feitas pelo app ou por outros processos enquanto recalculava
+        store.save(data)
+    
+    return {'plots': plots, 'changed': changed}
+
+
+def _select_by_date(projects, since=None, until=None):
+    """
+    Restringe as parcelas de cada projeto ao intervalo de datas, pelo índice temporal.
+    
+    Args:
+        projects (list): Projetos no formato de data.json (com ids)
+        since (date): Primeiro dia incluído (None = sem limite)
+        until (date): Último dia incluído (None = sem limite)
+    
+    Returns:
+        list: Cópias rasas dos projetos com as parcelas do intervalo, em ordem cronológica
+    """
+    from modules.timeindex import TimeIndex
+    
+    index = TimeIndex(projects)
+    end = until + timedelta(days=1) if until else None
+    return [dict(project, plots=index.plots_between(since, end, project['id'])) for project in projects]
+
+
+def export_file(file_path, output_dir, layout='wide', file_format='csv', incremental=None, since=None, until=None):
+    """
+    Exporta cada projeto de um arquivo para CSV, ou todos para um arquivo colunar.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        output_dir (str): Diretório base; cada arquivo ganha uma subpasta com seu nome
+        layout (str): 'wide' (128 colunas forma x altura) ou 'long' (uma linha por célula)
+        file_format (str): 'csv', 'npz' ou 'parquet'
+        incremental (str): 'delta' ou 'append' para exportar só as mudanças (CSV)
+        since (date): Exporta só parcelas registradas a partir deste dia
+        until (date): Exporta só parcelas registradas até este dia (inclusive)
+    
+    Returns:
+        dict: Resumo com os arquivos gerados
+    """
+    from modules import exporter
+    
+    if incremental == 'delta' and layout == 'long':
+        raise ValueError("--incremental delta não pode ser combinado com --layout long")
+    
+    data = data_manager.load_data(file_path)
+    projects = data.get('projects', [])
+    if since or until:
+        if incremental:
+            raise ValueError('--incremental não pode ser combinado com filtro de datas')
+        # Ids só em memória, para o índice (o arquivo não é alterado)
+        data_manager.ensure_ids(data)
+        projects = _select_by_date(projects, since, until)
+    
+    target_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    
+    # Formatos colunares: todos os projetos do arquivo em um único cubo
+    if file_format in ('npz', 'parquet'):
+        from modules import columnar
+        
+        os.makedirs(target_dir, exist_ok=True)
+        filepath = os.path.join(target_dir, exporter.build_export_filename('projetos', extension=file_format))
+        if file_format == 'npz':
+            columnar.export_npz(projects, filepath)
+        else:
+            columnar.export_parquet(projects, filepath)
+        return {'exports': [filepath]}
+    
+    exports = []
+    for project in projects:
+        plots = project.get('plots', [])
+        if not plots:
+            continue
+        
+        if incremental:
+            summary = exporter.export_incremental(project, target_dir, mode=incremental, layout=layout)
+            if summary['file']:
+                exports.append(os.path.join(target_dir, summary['file']))
+            continue
+        
+        suffix = '_long' if layout == 'long' else ''
+        filepath = os.path.join(target_dir, exporter.build_export_filename(project.get('name', 'projeto'), suffix=suffix))
+        exporter.stream_plots_to_csv(plots, filepath, layout=layout)
+        exports.append(filepath)
+    
+    return {'exports': exports}
+
+
+def tiles_file(file_path, output_dir, kind='grid', zooms=None):
+    """
+    Agrega as parcelas de um arquivo em células e grava um GeoJSON por zoom.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        output_dir (str): Diretório base; cada arquivo ganha uma subpasta com seu nome
+        kind (str): 'grid' (quadrados z/x/y) ou 'hex' (hexágonos)
+        zooms (list): Níveis de zoom (padrão: tiles.ZOOM_LEVELS)
+    
+    Returns:
+        dict: Resumo com os arquivos gerados e o número de células de cada um
+    """
+    from modules import tiles
+    
+    data = data_manager.load_data(file_path)
+    # Ids só em memória, para o índice (o arquivo não é alterado)
+    data_manager.ensure_ids(data)
+    index = tiles.TileIndex(data.get('projects', []), kind, zooms or tiles.ZOOM_LEVELS)
+    
+    target_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    exports = []
+    for zoom in index.zooms:
+        filepath = os.path.join(target_dir, f"tiles_{kind}_z{zoom}.geojson")
+        exports.append({'file': filepath, 'zoom': zoom, 'cells': index.export_geojson(filepath, zoom)})
+    return {'plots': len(index), 'exports': exports}
+
+
+def report_file(file_path, output_dir, pdf=False):
+    """
+    Gera o relatório HTML (ou PDF) de cada projeto de um arquivo.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        output_dir (str): Diretório base; cada arquivo ganha uma subpasta com seu nome
+        pdf (bool): Gera também o PDF (requer o WeasyPrint)
+    
+    Returns:
+        dict: Resumo com os relatórios gerados
+    """
+    from modules import report
+    
+    data = data_manager.load_data(file_path)
+    target_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    reports = [report.generate_report(project, target_dir, pdf=pdf)
+               for project in data.get('projects', []) if project.get('plots')]
+    return {'reports': reports}
+
+
+def rarefaction_file(file_path, replicates=1000, seed=0, kind='formula', workers=None):
+    """
+    Calcula a curva de rarefação e a suficiência amostral de cada projeto de um arquivo.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        replicates (int): Réplicas bootstrap por projeto
+        seed (int): Semente das réplicas
+        kind (str): Tipo fisionômico: 'formula' ou 'forms'
+        workers (int): Número de processos das réplicas
+    
+    Returns:
+        dict: Resumo com a análise de cada projeto
+    """
+    from modules import rarefaction
+    
+    data = data_manager.load_data(file_path)
+    projects = []
+    for project in data.get('projects', []):
+        if project.get('plots'):
+            analysis = rarefaction.rarefaction(project['plots'], replicates, seed, kind=kind, workers=workers)
+            projects.append(dict(analysis, name=project.get('name', '')))
+    return {'projects': projects}
+
+
+def metrics_file(file_path):
+    """
+    Calcula as médias das métricas estruturais de cada projeto de um arquivo.
+    
+    Args:
+        file_path (str): Caminho do data.json
+    
+    Returns:
+        dict: Resumo com a lista de projetos e suas médias
+    """
+    from modules import metrics
+    
+    data = data_manager.load_data(file_path)
+    return {'projects': metrics.project_summary(data.get('projects', []))}
+
+
+def monitor_file(file_path, radius_m=None):
+    """
+    Identifica os pontos revisitados de um arquivo e monta as suas séries temporais.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        radius_m (float): Raio de tolerância em metros (padrão: monitoring.DEFAULT_RADIUS_M)
+    
+    Returns:
+        dict: Resumo com o número de parcelas, de pontos e as séries dos pontos revisitados
+    """
+    from modules import monitoring
+    
+    data = data_manager.load_data(file_path)
+    # Ids só em memória, para o índice (o arquivo não é alterado)
+    data_manager.ensure_ids(data)
+    index = monitoring.RevisitIndex(data.get('projects', []), radius_m or monitoring.DEFAULT_RADIUS_M)
+    return {'plots': len(index), 'sites': index.num_sites, 'series': index.time_series()}
+
+
+def validate_file(file_path):
+    """
+    Valida um arquivo data.json.
+    
+    Args:
+        file_path (str): Caminho do data.json
+    
+    Returns:
+        dict: Resumo com a lista de erros encontrados
+    """
+    if not os.path.exists(file_path):
+        return {'errors': ['arquivo não encontrado']}
+    
+    data = data_manager.load_data(file_path)
+    errors = data_manager.validate_data(data)
+    
+    # Fórmulas gravadas por versões anteriores podem estar desatualizadas
+    for project_index, project in enumerate(data.get('projects', [])):
+        name = project.get('name') or f"Projeto {project_index + 1}"
+        for plot_index, plot in enumerate(project.get('plots', [])):
+            matrix = plot.get('matriz_fisionomica') or {}
+            if 'formula_kuchler' in plot and plot['formula_kuchler'] != kuchler_calculator.generate_kuchler_formula(matrix):
+                errors.append(f"{name} / Parcela {plot_index + 1}: fórmula desatualizada (use recompute)")
+    
+    return {'errors': errors}
+
+
+def sync_file(file_path, peer_location):
+    """
+    Sincroniza um data.json com outro dispositivo.
+    
+    Args:
+        file_path (str): Caminho do data.json local
+        peer_location (str): URL do servidor de sincronização ou caminho de outro data.json
+    
+    Returns:
+        dict: Resumo da sincronização, com os bytes trocados por HTTP
+    """
+    from modules import sync
+    
+    remote = sync.open_peer(peer_location)
+    result = sync.sync(sync.FilePeer(file_path), remote)
+    result['bytes'] = getattr(remote, 'bytes_sent', 0) + getattr(remote, 'bytes_received', 0)
+    return result
+
+
+def serve_file(file_path, host, port):
+    """
+    Serve um data.json para sincronização por HTTP até ser interrompido.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        host (str): Endereço de escuta
+        port (int): Porta de escuta
+    """
+    from modules import sync
+    
+    server = sync.create_server(sync.FilePeer(file_path), host, port)
+    print(f"Servindo {file_path} em http://{host}:{server.server_address[1]} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _backup_dir(file_path, backup_dir=None):
+    """Diretório de backups de um arquivo: um subdiretório por arquivo em backup_dir (padrão: 'backups')."""
+    from modules import backup
+    
+    return backup.store_dir(file_path, backup_dir)
+
+
+def backup_file(file_path, backup_dir=None, keep_last=None, max_age_days=None):
+    """
+    Grava um snapshot de um data.json e aplica a rotação dos backups.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        backup_dir (str): Diretório de backups (padrão: 'backups' ao lado do arquivo)
+        keep_last (int): Quantidade máxima de snapshots mantidos
+        max_age_days (int): Idade máxima dos snapshots, em dias
+    
+    Returns:
+        dict: Resumo do snapshot e da rotação
+    """
+    from modules import backup
+    
+    store = backup.BackupStore(_backup_dir(file_path, backup_dir))
+    result = store.take_snapshot(data_manager.load_data(file_path))
+    result.update(store.rotate(keep_last if keep_last is not None else backup.KEEP_LAST,
+                               max_age_days if max_age_days is not None else backup.MAX_AGE_DAYS))
+    return result
+
+
+def restore_file(file_path, snapshot_id=None, backup_dir=None):
+    """
+    Restaura um data.json a partir de um snapshot.
+    
+    Args:
+        file_path (str): Caminho do data.json
+        snapshot_id (str): Snapshot a restaurar (padrão: o mais recente)
+        backup_dir (str): Diretório de backups (padrão: 'backups' ao lado do arquivo)
+    
+    Returns:
+        dict: Resumo com o snapshot restaurado e o número de parcelas
+    """
+    from modules import backup
+    
+    store = backup.BackupStore(_backup_dir(file_path, backup_dir))
+    if snapshot_id is None:
+        snapshots = store.list_snapshots()
+        if not snapshots:
+            raise ValueError('Nenhum snapshot disponível')
+        snapshot_id = snapshots[-1]['id']
+    
+    data = store.restore(file_path, snapshot_id)
+    return {'snapshot': snapshot_id,
+            'plots': sum(len(project.get('plots', [])) for project in data.get('projects', []))}
+
+
+def list_snapshots_file(file_path, backup_dir=None):
+    """Lista os snapshots disponíveis de um data.json."""
+    from modules import backup
+    
+    return {'snapshots': backup.BackupStore(_backup_dir(file_path, backup_dir)).list_snapshots()}
+
+
+def _run_task(task):
+    """
+    Executa uma tarefa em um processo do pool, capturando exceções.
+    
+    Args:
+        task (tuple): (comando, caminho do arquivo, opções)
+    
+    Returns:
+        dict: Resumo da tarefa com o campo 'file' e, em caso de falha, 'error'
+    """
+    command, file_path, options = task
+    try:
+        if command == 'recompute':
+            result = recompute_file(file_path)
+        elif command == 'export':
+            result = export_file(file_path, options['output_dir'], options['layout'], options['format'],
+                                 options['incremental'], options['since'], options['until'])
+        elif command == 'sync':
+            result = sync_file(file_path, options['peer'])
+        elif command == 'backup':
+            result = backup_file(file_path, options['backup_dir'], options['keep'], options['max_age_days'])
+        elif command == 'restore':
+            result = restore_file(file_path, options['snapshot'], options['backup_dir'])
+        elif command == 'snapshots':
+            result = list_snapshots_file(file_path, options['backup_dir'])
+        elif command == 'monitor':
+            result = monitor_file(file_path, options['radius'])
+        elif command == 'report':
+            result = report_file(file_path, options['output_dir'], options['pdf'])
+        elif command == 'rarefaction':
+            result = rarefaction_file(file_path, options['replicates'], options['seed'], options['type'],
+                                      options['jobs'])
+        elif command == 'metrics':
+            result = metrics_file(file_path)
+        elif command == 'tiles':
+            result = tiles_file(file_path, options['output_dir'], options['cell'], options['zoom'])
+        else:
+            result = validate_file(file_path)
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    result['file'] = file_path
+    return result
+
+
+def _format_result(command, result):
+    """Formata o resumo de um arquivo para exibição no terminal."""
+    if 'error' in result:
+        return f"{result['file']}: ERRO {result['error']}"
+    if command == 'recompute':
+        return f"{result['file']}: {result['changed']} de {result['plots']} parcelas atualizadas"
+    if command == 'export':
+        return f"{result['file']}: {len(result['exports'])} arquivo(s) exportado(s)"
+    if command == 'sync':
+        return (f"{result['file']}: {result['pulled']} parcela(s) recebida(s), {result['pushed']} enviada(s), "
+                f"{result['deleted_local'] + result['deleted_remote']} exclusão(ões), "
+                f"{result['projects_deleted_local'] + result['projects_deleted_remote']} projeto(s) excluído(s), "
+                f"{len(result['conflicts'])} conflito(s), {result['bytes']} bytes trocados")
+    if command == 'backup':
+        created = f"snapshot {result['id']}" if result['id'] else 'sem mudanças desde o último snapshot'
+        return (f"{result['file']}: {created}, {result['objects_written']} bloco(s) novo(s) "
+                f"({result['bytes_written']} bytes), {result['snapshots_removed']} snapshot(s) removido(s)")
+    if command == 'restore':
+        return f"{result['file']}: restaurado o snapshot {result['snapshot']} ({result['plots']} parcelas)"
+    if command == 'snapshots':
+        return '\n'.join([f"{result['file']}: {len(result['snapshots'])} snapshot(s)"] +
+                         [f"  {snapshot['id']}  {snapshot['created_at']}  {snapshot['plots']} parcelas"
+                          for snapshot in result['snapshots']])
+    if command == 'monitor':
+        return (f"{result['file']}: {result['plots']} parcelas em {result['sites']} pontos, "
+                f"{len(result['series'])} ponto(s) revisitado(s)")
+    if command == 'report':
+        return f"{result['file']}: {len(result['reports'])} relatório(s) gerado(s)"
+    if command == 'rarefaction':
+        return '\n'.join([f"{result['file']}: {len(result['projects'])} projeto(s)"] +
+                         [f"  {analysis['name']}: {analysis['plots']} parcelas, {analysis['types']} tipos, "
+                          f"cobertura amostral {analysis['coverage']:.0%}, Chao1 {analysis['chao1']}, "
+                          f"{'suficiente' if analysis['adequate'] else 'insuficiente'}"
+                          for analysis in result['projects']])
+    if command == 'metrics':
+        return '\n'.join([f"{result['file']}: {len(result['projects'])} projeto(s)"] +
+                         [f"  {summary['name']}: {summary['plots']} parcelas, "
+                          f"{summary['estratos']} estratos, dossel {summary['classe_dossel']}, "
+                          f"lenhosa {summary['cobertura_lenhosa']}%, herbácea {summary['cobertura_herbacea']}%, "
+                          f"especial {summary['cobertura_especial']}%"
+                          for summary in result['projects'] if summary['plots']])
+    if command == 'tiles':
+        return (f"{result['file']}: {result['plots']} parcelas em "
+                + ', '.join(f"{entry['cells']} células (zoom {entry['zoom']})" for entry in result['exports']))
+    if not result['errors']:
+        return f"{result['file']}: OK"
+    return '\n'.join([f"{result['file']}: {len(result['errors'])} erro(s)"] +
+                     [f"  {error}" for error in result['errors']])
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    
+    Returns:
+        int: Código de saída (0 se todos os arquivos foram processados sem erros)
+    """
+    parser = argparse.ArgumentParser(prog='kuchlerapp-batch',
+                                     description='Processamento em lote de arquivos data.json do KuchlerApp')
+    parser.add_argument('command', choices=['recompute', 'export', 'validate', 'sync', 'serve',
+                                            'backup', 'restore', 'snapshots', 'tiles', 'metrics', 'monitor', 'report', 'rarefaction'],
+                        help='recompute: recalcula fórmulas | export: gera CSVs | validate: valida os dados | '
+                             'sync: sincroniza com --peer | serve: serve o arquivo para sincronização | '
+                             'backup: grava um snapshot | restore: restaura um snapshot | snapshots: lista os snapshots | '
+                             'tiles: agrega as parcelas em células GeoJSON | metrics: médias das métricas estruturais | '
+                             'monitor: séries temporais dos pontos revisitados | report: relatórios HTML por projeto | '
+                             'rarefaction: curvas de rarefação e suficiência amostral')
+    parser.add_argument('files', nargs='+', help='Arquivos data.json')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Número de processos (padrão: número de CPUs)')
+    parser.add_argument('--output-dir', default='exports', help='Diretório dos CSVs (export), GeoJSONs (tiles) e relatórios (report)')
+    parser.add_argument('--layout', choices=['wide', 'long'], default='wide',
+                        help='Formato do CSV (export): wide = uma linha por parcela, long = uma linha por célula')
+    parser.add_argument('--format', choices=['csv', 'npz', 'parquet'], default='csv',
+                        help='Formato da exportação (export): npz e parquet geram um cubo com todos os projetos')
+    parser.add_argument('--incremental', choices=['delta', 'append'], default=None,
+                        help='Exporta só as mudanças desde a última exportação (export, CSV)')
+    parser.add_argument('--since', type=date.fromisoformat, default=None,
+                        help='Exporta só parcelas registradas a partir da data AAAA-MM-DD (export)')
+    parser.add_argument('--until', type=date.fromisoformat, default=None,
+                        help='Exporta só parcelas registradas até a data AAAA-MM-DD, inclusive (export)')
+    parser.add_argument('--peer', help='Outro dispositivo (sync): URL http:// ou caminho de um data.json')
+    parser.add_argument('--host', default='127.0.0.1', help='Endereço de escuta (serve)')
+    parser.add_argument('--port', type=int, default=8765, help='Porta de escuta (serve)')
+    parser.add_argument('--backup-dir', default=None,
+                        help="Diretório de backups, com um subdiretório por arquivo (padrão: 'backups' ao lado de cada arquivo)")
+    parser.add_argument('--snapshot', default=None, help='Snapshot a restaurar (restore, padrão: o mais recente)')
+    parser.add_argument('--keep', type=int, default=None, help='Máximo de snapshots mantidos (backup)')
+    parser.add_argument('--max-age-days', type=int, default=None, help='Idade máxima dos snapshots em dias (backup)')
+    parser.add_argument('--cell', choices=['grid', 'hex'], default='grid',
+                        help='Forma das células (tiles): grid = tiles z/x/y, hex = hexágonos')
+    parser.add_argument('--zoom', type=int, action='append', default=None,
+                        help='Nível de zoom das células (tiles, pode ser repetido; padrão: 6, 9, 12 e 15)')
+    parser.add_argument('--radius', type=float, default=None,
+                        help='Raio, em metros, para considerar duas parcelas o mesmo ponto (monitor, padrão: 25)')
+    parser.add_argument('--pdf', action='store_true', help='Gera também o PDF dos relatórios (report, requer o WeasyPrint)')
+    parser.add_argument('--replicates', type=int, default=1000,
+                        help='Réplicas bootstrap das faixas de confiança (rarefaction; 0 = sem faixas, ou pelo menos 2)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente das réplicas bootstrap (rarefaction)')
+    parser.add_argument('--type', choices=['formula', 'forms'], default='formula',
+                        help='Tipo fisionômico (rarefaction): fórmula de Küchler ou conjunto de formas de vida')
+    parser.add_argument('--json', action='store_true', help='Resultado em JSON')
+    args = parser.parse_args(argv)
+    
+    if args.command == 'serve':
+        if len(args.files) != 1:
+            parser.error('serve aceita um único arquivo')
+        serve_file(args.files[0], args.host, args.port)
+        return 0
+    if args.command == 'sync' and not args.peer:
+        parser.error('sync requer --peer')
+    if args.replicates < 0 or args.replicates == 1:
+        parser.error('--replicates deve ser 0 (sem faixas) ou pelo menos 2')
+    
+    options = {'output_dir': args.output_dir, 'layout': args.layout, 'format': args.format,
+               'incremental': args.incremental, 'since': args.since, 'until': args.until, 'peer': args.peer, 'backup_dir': args.backup_dir,
+               'snapshot': args.snapshot, 'keep': args.keep, 'max_age_days': args.max_age_days,
+               'cell': args.cell, 'zoom': args.zoom, 'radius': args.radius, 'pdf': args.pdf,
+               'replicates': args.replicates, 'seed': args.seed, 'type': args.type, 'jobs': args.jobs}
+    tasks = [(args.command, file_path, options) for file_path in args.files]
+    
+    # Um único arquivo é processado no próprio processo, evitando o custo do pool
+    if len(tasks) == 1 or args.jobs == 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // 64)))
+    
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+    else:
+        for result in results:
+            print(_format_result(args.command, result))
+    
+    failed = any('error' in result or result.get('errors') for result in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Módulo de exportação colunar para análise.
+Gera o cubo parcelas x formas de vida x alturas (códigos uint8) em .npz,
+carregável sem parsing e mapeado em memória, e opcionalmente em Parquet.
+
+Requer o NumPy (e o pyarrow para Parquet), instalados com:
+    pip install kuchlerapp[analysis]
+"""
+
+import struct
+import zipfile
+
+from modules.kuchler_calculator import FORMS_ORDER
+from modules.metrics import cube_metrics
+from modules.timeindex import plot_timestamp
+from modules.models import CELL_INDEX, CELL_KEYS, CELL_VALUES, HEIGHTS, encode_value
+from modules.optional import require_numpy
+
+
+def build_cube(projects):
+    """
+    Monta os arrays colunares de um ou mais projetos.
+    
+    O cubo 'coverage' tem forma (parcelas, 16, 8), com as formas de vida na
+    ordem de FORMS_ORDER e as alturas de '1' a '8'. Cada célula guarda o
+    código do valor em 'value_labels' (0 = célula vazia).
+    
+    Args:
+        projects (list): Projetos no formato de data.json
+    
+    Returns:
+        dict: Arrays NumPy por nome
+    """
+    np = require_numpy('A exportação colunar')
+    
+    num_plots = sum(len(project.get('plots', [])) for project in projects)
+    coverage = np.zeros((num_plots, len(CELL_KEYS)), dtype=np.uint8)
+    latitude = np.full(num_plots, np.nan)
+    longitude = np.full(num_plots, np.nan)
+    altitude = np.full(num_plots, np.nan)
+    registered_at = np.full(num_plots, np.nan)
+    project_index = np.zeros(num_plots, dtype=np.int32)
+    plot_number = np.zeros(num_plots, dtype=np.int32)
+    plot_ids = []
+    formulas = []
+    dates = []
+    times = []
+    
+    row = 0
+    for p_index, project in enumerate(projects):
+        for number, plot in enumerate(project.get('plots', []), 1):
+            cells = coverage[row]
+            for key, value in (plot.get('matriz_fisionomica') or {}).items():
+                cell_index = CELL_INDEX.get(key)
+                if cell_index is not None and value is not None:
+                    cells[cell_index] = encode_value(value)
+            
+            latitude[row] = plot.get('latitude', np.nan)
+            longitude[row] = plot.get('longitude', np.nan)
+            altitude[row] = plot.get('altitude', np.nan)
+            timestamp = plot_timestamp(plot)
+            if timestamp is not None:
+                registered_at[row] = timestamp
+            project_index[row] = p_index
+            plot_number[row] = plot.get('numero', number)
+            plot_ids.append(plot.get('id', ''))
+            formulas.append(plot.get('formula_kuchler', ''))
+            dates.append(plot.get('data_registro', ''))
+            times.append(plot.get('horario_registro', ''))
+            row += 1
+    
+    return {
+        'coverage': coverage.reshape(num_plots, len(FORMS_ORDER), len(HEIGHTS)),
+        'latitude': latitude,
+        'longitude': longitude,
+        'altitude': altitude,
+        'registered_at': registered_at,
+        'project_index': project_index,
+        'plot_number': plot_number,
+        'plot_id': np.array(plot_ids, dtype=str),
+        'formula_kuchler': np.array(formulas, dtype=str),
+        'data_registro': np.array(dates, dtype=str),
+        'horario_registro': np.array(times, dtype=str),
+        'project_names': np.array([project.get('name', '') for project in projects], dtype=str),
+        'form_labels': np.array(FORMS_ORDER),
+        'height_labels': np.array(HEIGHTS),
+        'value_labels': np.array([value or '' for value in CELL_VALUES])
+    }
+
+
+def export_npz(projects, filepath):
+    """
+    Exporta os arrays colunares para um .npz sem compressão.
+    
+    Sem compressão, cada array fica contíguo no arquivo e pode ser mapeado
+    em memória por load_npz.
+    
+    Args:
+        projects (list): Projetos no formato de data.json
+        filepath (str): Caminho do arquivo .npz
+    """
+    np = require_numpy('A exportação colunar')
+    arrays = build_cube(projects)
+    # Métricas estruturais: um array por coluna, uma posição por parcela
+    arrays.update(cube_metrics(arrays))
+    np.savez(filepath, **arrays)
+
+
+def load_npz(filepath, mmap=True):
+    """
+    Carrega um .npz gerado por export_npz.
+    
+    Args:
+        filepath (str): Caminho do arquivo .npz
+        mmap (bool): Mapeia os arrays em memória em vez de lê-los
+    
+    Returns:
+        dict: Arrays NumPy por nome (somente leitura se mmap=True)
+    """
+    np = require_numpy('A exportação colunar')
+    
+    if not mmap:
+        with np.load(filepath, allow_pickle=False) as npz:
+            return {name: npz[name] for name in npz.files}
+    
+    arrays = {}
+    with zipfile.ZipFile(filepath) as archive, open(filepath, 'rb') as raw:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} está comprimido e não pode ser mapeado em memória")
+            
+            # Início dos dados: cabeçalho local do zip (30 bytes + nome + extra)
+            raw.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', raw.read(4))
+            raw.seek(info.header_offset + 30 + name_length + extra_length)
+            
+            # Cabeçalho .npy com dtype e forma do array
+            version = np.lib.format.read_magic(raw)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+            
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(filepath, dtype=dtype, mode='r', offset=raw.tell(),
+                                         shape=shape, order='F' if fortran_order else 'C')
+    
+    return arrays
+
+
+def export_parquet(projects, filepath):
+    """
+    Exporta as parcelas para Parquet, com uma coluna uint8 por célula da matriz.
+    
+    Args:
+        projects (list): Projetos no formato de data.json
+        filepath (str): Caminho do arquivo .parquet
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('A exportação Parquet requer o pyarrow: pip install pyarrow') from None
+    
+    arrays = build_cube(projects)
+    flat = arrays['coverage'].reshape(len(arrays['coverage']), len(CELL_KEYS))
+    names = arrays['project_names']
+    
+    # Momento do registro como timestamp UTC (nulo para parcelas sem data)
+    missing = arrays['registered_at'] != arrays['registered_at']
+    registered_at = pyarrow.array((arrays['registered_at'] * 1000).round().astype('int64', casting='unsafe'),
+                                  mask=missing, type=pyarrow.timestamp('ms', tz='UTC'))
+    
+    columns = {
+        'projeto': names[arrays['project_index']] if len(names) else arrays['project_index'],
+        'parcela': arrays['plot_number'],
+        'id': arrays['plot_id'],
+        'latitude': arrays['latitude'],
+        'longitude': arrays['longitude'],
+        'altitude': arrays['altitude'],
+        'data_registro': arrays['data_registro'],
+        'horario_registro': arrays['horario_registro'],
+        'registrado_em': registered_at,
+        'formula_kuchler': arrays['formula_kuchler'],
+    }
+    for cell_index, key in enumerate(CELL_KEYS):
+        columns[key] = flat[:, cell_index]
+    columns.update(cube_metrics(arrays))
+    
+    table = pyarrow.table(columns)
+    # Tabela de códigos nos metadados, para decodificar as colunas das células
+    table = table.replace_schema_metadata({'value_labels': ','.join(arrays['value_labels'])})
+    pyarrow.parquet.write_table(table, filepath)
@@ -3,11 +3,35 @@ Módulo de gerenciamento de dados em JSON.
 Responsável por carregar e salvar dados de projetos e parcelas.
 """
 
+import contextlib
 import json
+import os
+import stat
+import tempfile
+import uuid
+from datetime import datetime
+
+from modules.kuchler_calculator import FORMS_ORDER
+from modules.models import HEIGHTS
+
+# Travas de arquivo: fcntl em POSIX (inclusive Android), msvcrt no Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 # Constante
 JSON_FILE = 'data.json'
 
+# Umask do processo, lida na importação: os.umask só a consulta alterando-a,
+# o que não é seguro durante gravações em outras threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 def load_data(file_path):
     """
@@ -34,6 +58,465 @@ def save_data(data, file_path):
         data (dict): Dados a serem salvos
         file_path (str): Caminho do arquivo JSON
     """
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
+    # Grava em arquivo temporário e substitui: leitores nunca veem um arquivo pela metade
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix='.tmp')
+    try:
+        # mkstemp cria o arquivo só para o dono: mantém as permissões do arquivo atual
+        # (ou as padrão, pela umask, como open() faria)
+        os.chmod(temp_path, _file_mode(file_path))
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+            # Conteúdo em disco antes da troca: uma queda de energia não deixa o arquivo vazio
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _file_mode(file_path):
+    """Permissões do arquivo existente, ou 0o666 menos a umask para um arquivo novo."""
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def new_id():
+    """
+    Gera um identificador único e estável para projetos e parcelas.
+    
+    Returns:
+        str: UUID4 em hexadecimal (32 caracteres)
+    """
+    return uuid.uuid4().hex
+
+
+def ensure_ids(data):
+    """
+    Atribui 'id' a projetos e parcelas que ainda não têm, e 'numero' às parcelas.
+    
+    O número da parcela é sequencial por projeto e não muda quando outras
+    parcelas são excluídas; o próximo número fica em 'next_plot_number'.
+    Dados de versões anteriores são numerados na ordem atual da lista.
+    
+    Args:
+        data (dict): Dados no formato de data.json (alterados no lugar)
+    
+    Returns:
+        bool: True se algum identificador foi atribuído
+    """
+    changed = False
+    
+    for project in data.get('projects', []):
+        if 'id' not in project:
+            project['id'] = new_id()
+            changed = True
+        
+        next_number = project.get('next_plot_number', 1)
+        for plot in project.get('plots', []):
+            if 'id' not in plot:
+                plot['id'] = new_id()
+                changed = True
+            if 'numero' not in plot:
+                plot['numero'] = next_number
+                changed = True
+            next_number = max(next_number, plot['numero'] + 1)
+        
+        if project.get('next_plot_number') != next_number:
+            project['next_plot_number'] = next_number
+            changed = True
+    
+    return changed
+
+
+def find_project(data, project_id):
+    """
+    Busca um projeto pelo identificador.
+    
+    Args:
+        data (dict): Dados no formato de data.json
+        project_id (str): Identificador do projeto
+    
+    Returns:
+        dict: Projeto encontrado ou None
+    """
+    for project in data.get('projects', []):
+        if project.get('id') == project_id:
+            return project
+    return None
+
+
+# Chave de primeiro nível com os projetos excluídos (propagados pela sincronização)
+PROJECT_TOMBSTONES_KEY = 'project_tombstones'
+
+
+def delete_project(data, project_id):
+    """
+    Exclui um projeto e registra a exclusão em 'project_tombstones'.
+    
+    O registro impede que a sincronização traga o projeto de volta a partir
+    de um dispositivo que ainda o tenha. Também pode ser chamada para um
+    projeto que não existe aqui (exclusão recebida de outro dispositivo).
+    
+    Args:
+        data (dict): Dados no formato de data.json (alterados no lugar)
+        project_id (str): Identificador do projeto
+    
+    Returns:
+        dict: Projeto excluído, ou None se ele não existia
+    """
+    project = find_project(data, project_id)
+    if project is not None:
+        data['projects'].remove(project)
+    tombstones = data.setdefault(PROJECT_TOMBSTONES_KEY, [])
+    if not any(tombstone.get('id') == project_id for tombstone in tombstones):
+        tombstones.append({'id': project_id,
+                           'name': project.get('name', '') if project is not None else '',
+                           'deleted_at': datetime.now().isoformat(timespec='seconds')})
+    return project
+
+
+def deleted_project_ids(data):
+    """Ids dos projetos excluídos (registrados em 'project_tombstones')."""
+    return {tombstone.get('id') for tombstone in data.get(PROJECT_TOMBSTONES_KEY, [])}
+
+
+class PlotIndex:
+    """
+    Índice id -> parcela de um projeto, mantido junto da ordem de exibição
+    (a lista 'plots' do projeto, que continua sendo o formato salvo).
+    """
+    
+    def __init__(self, project):
+        self.project = project
+        self._by_id = {plot['id']: plot for plot in project.get('plots', [])}
+        # Posições na lista, recalculadas sob demanda após exclusões
+        self._positions = None
+    
+    def __contains__(self, plot_id):
+        return plot_id in self._by_id
+    
+    def __len__(self):
+        return len(self._by_id)
+    
+    def get(self, plot_id):
+        """Retorna a parcela com o identificador ou None."""
+        return self._by_id.get(plot_id)
+    
+    def position(self, plot_id):
+        """Retorna a posição da parcela na lista do projeto ou None."""
+        if self._positions is None:
+            self._positions = {plot['id']: index for index, plot in enumerate(self.project.get('plots', []))}
+        return self._positions.get(plot_id)
+    
+    def add(self, plot):
+        """
+        Acrescenta uma parcela ao fim do projeto, atribuindo id e número se necessário.
+        
+        Args:
+            plot (dict): Nova parcela
+        """
+        plots = self.project.setdefault('plots', [])
+        if 'id' not in plot:
+            plot['id'] = new_id()
+        if 'numero' not in plot:
+            plot['numero'] = self.project.get('next_plot_number', len(plots) + 1)
+        self.project['next_plot_number'] = plot['numero'] + 1
+        
+        plots.append(plot)
+        self._by_id[plot['id']] = plot
+        if self._positions is not None:
+            self._positions[plot['id']] = len(plots) - 1
+    
+    def remove(self, plot_id):
+        """
+        Remove uma parcela pelo identificador.
+        
+        Args:
+            plot_id (str): Identificador da parcela
+        
+        Returns:
+            dict: Parcela removida ou None se não existir
+        """
+        position = self.position(plot_id)
+        if position is None:
+            return None
+        
+        plots = self.project['plots']
+        plot = plots.pop(position)
+        del self._by_id[plot_id]
+        
+        # Só as posições das parcelas seguintes mudam
+        if position == len(plots):
+            del self._positions[plot_id]
+        else:
+            self._positions = None
+        return plot
+
+
+# ==================== ACESSO CONCORRENTE ====================
 
+# Chave da versão do arquivo (e do projeto, gravada quando ele muda)
+VERSION_KEY = 'version'
+
+
+class StaleDataError(Exception):
+    """Gravação baseada em uma versão antiga que não pôde ser mesclada."""
+    
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+@contextlib.contextmanager
+def file_lock(file_path, exclusive=True):
+    """
+    Trava consultiva (advisory) associada a um arquivo de dados.
+    
+    A trava fica em '<arquivo>.lock', para não depender do arquivo de dados,
+    que é substituído a cada gravação. Leitores usam trava compartilhada e
+    escritores, exclusiva. No Windows toda trava é exclusiva.
+    
+    Args:
+        file_path (str): Arquivo de dados
+        exclusive (bool): Trava exclusiva (escrita) ou compartilhada (leitura)
+    """
+    with open(f"{file_path}.lock", 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_signature(file_path):
+    """Identifica uma versão do arquivo no disco (gravações atômicas trocam o inode)."""
+    try:
+        info = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+class DataStore:
+    """
+    Acesso a um data.json compartilhado por vários processos.
+    
+    Leituras usam trava compartilhada; gravações, trava exclusiva e substituição
+    atômica do arquivo, que carrega uma versão crescente. Cada processo marca
+    com mark_changed o que alterou desde a última leitura ou gravação. Se o
+    arquivo mudou nesse intervalo, a gravação é mesclada por projeto:
+        
+        - projetos alterados só por este processo: versão deste processo
+        - projetos alterados só por outro processo: versão do disco
+        - projetos alterados pelos dois: StaleDataError
+    
+    Demais chaves (ex: 'settings') são mescladas do mesmo modo, mas sem
+    detecção de conflito: prevalece a última gravação de quem as alterou.
+    """
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.version = 0
+        self._changed = set()
+        self._signature = None
+    
+    def load(self):
+        """
+        Lê os dados do disco e passa a usá-los como base das próximas gravações.
+        
+        Returns:
+            dict: Dados carregados (vazio se o arquivo não existir)
+        """
+        with file_lock(self.file_path, exclusive=False):
+            data = load_data(self.file_path)
+            self._signature = _file_signature(self.file_path)
+        self.version = data.get(VERSION_KEY, 0)
+        self._changed.clear()
+        return data
+    
+    def mark_changed(self, *keys):
+        """
+        Marca projetos (pelo id) ou chaves de primeiro nível alterados.
+        
+        Args:
+            keys (str): Ids de projetos criados, alterados ou excluídos, ou chaves
+                        como 'settings'
+        """
+        self._changed.update(keys)
+    
+    def save(self, data, merge=True):
+        """
+        Grava os dados, mesclando alterações feitas por outros processos.
+        
+        A mesclagem altera data no lugar: projetos vindos do disco substituem os
+        objetos em memória, então referências a eles devem ser obtidas de novo.
+        
+        Args:
+            data (dict): Dados em memória
+            merge (bool): Mescla com gravações de outros processos (se False, rejeita)
+        
+        Raises:
+            StaleDataError: O arquivo mudou e a gravação não pôde ser mesclada
+        """
+        with file_lock(self.file_path):
+            if _file_signature(self.file_path) != self._signature:
+                disk = load_data(self.file_path)
+                if not merge:
+                    raise StaleDataError('Os dados foram alterados por outro processo')
+                self._merge(data, disk)
+                base_version = max(disk.get(VERSION_KEY, 0), self.version)
+            else:
+                base_version = self.version
+            
+            self._write(data, base_version + 1)
+    
+    def replace(self, data):
+        """
+        Grava os dados sobrescrevendo o arquivo, sem mesclar (ex: restauração de backup).
+        
+        Args:
+            data (dict): Dados completos
+        """
+        with file_lock(self.file_path):
+            disk_version = load_data(self.file_path).get(VERSION_KEY, 0) if os.path.exists(self.file_path) else 0
+            self._changed.update(project.get('id') for project in data.get('projects', []))
+            self._write(data, max(disk_version, self.version) + 1)
+    
+    def _write(self, data, version):
+        """Grava a nova versão com a trava exclusiva já obtida."""
+        for project in data.get('projects', []):
+            if project.get('id') in self._changed:
+                project[VERSION_KEY] = version
+        data[VERSION_KEY] = version
+        save_data(data, self.file_path)
+        
+        self.version = version
+        self._signature = _file_signature(self.file_path)
+        self._changed.clear()
+    
+    def _merge(self, data, disk):
+        """Mescla no lugar os dados em memória com os do disco, por projeto."""
+        conflicts = []
+        mine = {project.get('id'): project for project in data.get('projects', [])}
+        merged = []
+        
+        # Arquivo gravado sem DataStore (versão não avançou): não há como saber
+        # quais projetos mudaram, então o disco prevalece nos que este processo não alterou
+        external = disk.get(VERSION_KEY, 0) <= self.version
+        
+        for theirs in disk.get('projects', []):
+            project_id = theirs.get('id')
+            theirs_changed = external or theirs.get(VERSION_KEY, 0) > self.version
+            if project_id in self._changed:
+                if theirs_changed and not external:
+                    conflicts.append(theirs.get('name', project_id))
+                elif project_id in mine:
+                    merged.append(mine[project_id])
+                # Excluído por este processo: fica fora da lista
+            elif theirs_changed or project_id not in mine:
+                merged.append(theirs)
+            else:
+                merged.append(mine[project_id])
+        
+        # Projetos criados por este processo
+        disk_ids = {project.get('id') for project in disk.get('projects', [])}
+        merged.extend(project for project_id, project in mine.items()
+                      if project_id in self._changed and project_id not in disk_ids)
+        
+        if conflicts:
+            raise StaleDataError(f"Projetos alterados por outro processo: {', '.join(conflicts)}", conflicts)
+        
+        for key, value in disk.items():
+            if key not in ('projects', VERSION_KEY) and key not in self._changed:
+                data[key] = value
+        # Exclusões de projetos feitas pelos dois processos são todas mantidas
+        if PROJECT_TOMBSTONES_KEY in self._changed:
+            known = deleted_project_ids(data)
+            data.setdefault(PROJECT_TOMBSTONES_KEY, []).extend(
+                tombstone for tombstone in disk.get(PROJECT_TOMBSTONES_KEY, []) if tombstone.get('id') not in known)
+        data['projects'] = merged
+
+
+# Valores aceitos na matriz fisionômica (formas e alturas em kuchler_calculator e models)
+COVERAGE_VALUES = ('c', 'i', 'p', 'r', 'b', 'a')
+LEAF_VALUES = ('h', 'w', 'k', 'l', 's')
+
+
+def validate_plot(plot):
+    """
+    Valida uma parcela com as mesmas regras da tela de nova parcela.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        list: Mensagens de erro (vazia se a parcela for válida)
+    """
+    errors = []
+    
+    # Coordenadas e altitude
+    limits = {'latitude': (-90, 90), 'longitude': (-180, 180), 'altitude': (0, None)}
+    for field, (minimum, maximum) in limits.items():
+        if field not in plot:
+            errors.append(f"campo '{field}' ausente")
+            continue
+        value = plot[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"'{field}' não numérico: {value!r}")
+        elif value < minimum or (maximum is not None and value > maximum):
+            errors.append(f"'{field}' fora do intervalo: {value}")
+    
+    # Matriz fisionômica
+    matrix = plot.get('matriz_fisionomica')
+    if not isinstance(matrix, dict) or not matrix:
+        errors.append("matriz fisionômica vazia ou ausente")
+        return errors
+    
+    for key, value in matrix.items():
+        if len(key) != 2 or key[0] not in FORMS_ORDER or key[1] not in HEIGHTS:
+            errors.append(f"célula inválida: {key!r}")
+        elif key[0] == 'F' and value not in LEAF_VALUES:
+            errors.append(f"característica foliar inválida em {key}: {value!r}")
+        elif key[0] != 'F' and value not in COVERAGE_VALUES:
+            errors.append(f"cobertura inválida em {key}: {value!r}")
+    
+    return errors
+
+
+def validate_data(data):
+    """
+    Valida a estrutura completa de dados (projetos e parcelas).
+    
+    Args:
+        data (dict): Dados no formato de data.json
+    
+    Returns:
+        list: Mensagens de erro no formato 'Projeto / Parcela N: erro'
+    """
+    errors = []
+    
+    projects = data.get('projects', [])
+    if not isinstance(projects, list):
+        return ["'projects' não é uma lista"]
+    
+    for project_index, project in enumerate(projects):
+        name = project.get('name') or f"Projeto {project_index + 1}"
+        if not project.get('name'):
+            errors.append(f"{name}: projeto sem nome")
+        
+        for plot_index, plot in enumerate(project.get('plots', [])):
+            for error in validate_plot(plot):
+                errors.append(f"{name} / Parcela {plot_index + 1}: {error}")
+    
+    return errors
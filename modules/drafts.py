@@ -0,0 +1,195 @@
+"""
+Módulo de rascunho da parcela em edição.
+Registra cada alteração da parcela em um diário (journal) só de acréscimos,
+com poucos bytes por toque, para recuperar a parcela se o app for encerrado
+antes de salvá-la.
+
+Formato: uma linha de texto por registro
+    p <id do projeto>                 início do rascunho
+    g <latitude> <longitude> <altitude>
+    s <célula> <valor>                célula preenchida (ex: 's D4 p')
+    x <célula>                        célula limpa
+Uma última linha incompleta (escrita interrompida) é ignorada.
+
+Ao salvar a parcela, o diário é separado (detach) com o id da parcela no
+nome e só é apagado quando a gravação que contém a parcela termina; se o app
+for encerrado antes disso, a parcela ainda pode ser recuperada.
+"""
+
+import os
+
+# Sufixo dos diários de parcelas salvas aguardando a gravação em disco
+PENDING_SUFFIX = '.saving-'
+
+# Registros a partir dos quais o diário é reescrito só com o estado atual
+COMPACT_THRESHOLD = 1024
+
+
+class DraftJournal:
+    """
+    Diário do rascunho da parcela em edição.
+    
+    Cada registro é acrescentado com uma única chamada os.write em um arquivo
+    aberto com O_APPEND: o dado vai para o cache do sistema operacional, que
+    sobrevive ao encerramento do processo. sync() força a gravação em disco
+    (usado ao pausar o app), sem custo a cada toque.
+    """
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._fd = None
+        self._records = 0
+    
+    def _append(self, line):
+        if self._fd is None:
+            self._fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self._fd, f"{line}\n".encode('utf-8'))
+        self._records += 1
+    
+    @property
+    def active(self):
+        """Indica se há um rascunho em andamento."""
+        return self._fd is not None
+    
+    def start(self, project_id, plot_data):
+        """
+        Inicia (ou reescreve) o rascunho com o estado atual da parcela.
+        
+        Args:
+            project_id (str): Projeto da parcela
+            plot_data (dict): Dados temporários da parcela (coordenadas e matriz)
+        """
+        lines = [f"p {project_id}"]
+        if 'latitude' in plot_data:
+            lines.append(f"g {plot_data['latitude']!r} {plot_data.get('longitude', 0)!r} "
+                         f"{plot_data.get('altitude', 0)!r}")
+        lines.extend(f"s {key} {value}" for key, value in plot_data.get('matriz_fisionomica', {}).items())
+        
+        # Reescrita atômica: o rascunho anterior continua válido até o replace
+        self.close()
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(''.join(f"{line}\n" for line in lines))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.file_path)
+        self._fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND)
+        self._records = len(lines)
+    
+    def set_cell(self, key, value):
+        """Registra uma célula preenchida."""
+        self._append(f"s {key} {value}")
+    
+    def clear_cell(self, key):
+        """Registra uma célula limpa."""
+        self._append(f"x {key}")
+    
+    def needs_compaction(self):
+        """Indica se o diário acumulou registros suficientes para ser reescrito."""
+        return self._records >= COMPACT_THRESHOLD
+    
+    def sync(self):
+        """Força a gravação do diário em disco."""
+        if self._fd is not None:
+            os.fsync(self._fd)
+    
+    def close(self):
+        """Fecha o arquivo do diário, mantendo o rascunho em disco."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def detach(self, name):
+        """
+        Separa o rascunho atual em um arquivo próprio, liberando o diário para a próxima parcela.
+        
+        Args:
+            name (str): Identificador do arquivo (id da parcela salva)
+        
+        Returns:
+            str: Caminho do rascunho separado (ver remove_draft e pending_drafts)
+        """
+        self.close()
+        self._records = 0
+        path = f"{self.file_path}{PENDING_SUFFIX}{name}"
+        os.replace(self.file_path, path)
+        return path
+    
+    def discard(self):
+        """Descarta o rascunho (parcela salva ou abandonada)."""
+        self.close()
+        self._records = 0
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+
+def pending_drafts(file_path):
+    """
+    Rascunhos separados por detach que ainda não foram removidos.
+    
+    Args:
+        file_path (str): Caminho do diário principal
+    
+    Returns:
+        list: Pares (nome, caminho), do mais antigo para o mais recente
+    """
+    directory, base = os.path.split(os.path.abspath(file_path))
+    prefix = f"{base}{PENDING_SUFFIX}"
+    found = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.is_file() and entry.name.startswith(prefix):
+                found.append((entry.stat().st_mtime, entry.name[len(prefix):],
+                              os.path.join(os.path.dirname(file_path), entry.name)))
+    return [(name, path) for _, name, path in sorted(found)]
+
+
+def remove_draft(path):
+    """Apaga um rascunho separado (parcela já gravada em disco ou descartada)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def load_draft(file_path):
+    """
+    Reconstrói o rascunho a partir do diário.
+    
+    Args:
+        file_path (str): Caminho do diário
+    
+    Returns:
+        dict: {'project_id', 'plot_data', 'file_path'} ou None se não houver rascunho
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            content = file.read().decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        return None
+    
+    project_id = None
+    plot_data = {'matriz_fisionomica': {}}
+    matrix = plot_data['matriz_fisionomica']
+    
+    # A última linha sem '\n' foi interrompida no meio da escrita
+    for line in content.split('\n')[:-1]:
+        parts = line.split(' ')
+        try:
+            if parts[0] == 'p' and len(parts) == 2:
+                project_id = parts[1]
+            elif parts[0] == 'g' and len(parts) == 4:
+                plot_data['latitude'], plot_data['longitude'], plot_data['altitude'] = map(float, parts[1:])
+            elif parts[0] == 's' and len(parts) == 3:
+                matrix[parts[1]] = parts[2]
+            elif parts[0] == 'x' and len(parts) == 2:
+                matrix.pop(parts[1], None)
+        except ValueError:
+            # Registro corrompido: ignorado
+            continue
+    
+    if project_id is None or ('latitude' not in plot_data and not matrix):
+        return None
+    return {'project_id': project_id, 'plot_data': plot_data, 'file_path': file_path}
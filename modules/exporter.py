@@ -0,0 +1,583 @@
+"""
+Módulo de exportação de dados de projetos.
+Responsável por gerar arquivos CSV a partir das parcelas de um projeto.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+from datetime import datetime
+
+from modules import data_manager
+from modules.metrics import METRIC_COLUMNS, plot_metrics
+from modules.models import CELL_INDEX, CELL_KEYS
+
+# Esquema fixo do CSV: campos da parcela, 128 colunas forma x altura, métricas
+# estruturais e descrição ao final
+# 'parcela' é o número estável da parcela ('numero'); 'id' é o identificador único
+PLOT_COLUMNS = ['parcela', 'id', 'latitude', 'longitude', 'altitude',
+                'data_registro', 'horario_registro', 'registrado_em', 'formula_kuchler']
+WIDE_COLUMNS = PLOT_COLUMNS + CELL_KEYS + METRIC_COLUMNS + ['descricao_fisionomia']
+
+# Formato longo (tidy): uma linha por célula preenchida
+LONG_COLUMNS = ['parcela', 'id', 'forma', 'altura', 'valor']
+
+# Intervalo, em parcelas, entre chamadas de progresso
+PROGRESS_INTERVAL = 500
+
+
+def get_fieldnames(plots):
+    """
+    Coleta as colunas do CSV a partir das chaves de todas as parcelas.
+    
+    Args:
+        plots (list): Lista de parcelas (dicionários)
+    
+    Returns:
+        list: Nomes das colunas, ordenados, com descricao_fisionomia por último
+    """
+    # Coleta todas as chaves possíveis das parcelas
+    all_keys = set()
+    for plot in plots:
+        all_keys.update(plot.keys())
+    
+    # Ordena as chaves para manter consistência
+    # Garante que descricao_fisionomia seja o último campo
+    fieldnames = sorted(list(all_keys))
+    if 'descricao_fisionomia' in fieldnames:
+        fieldnames.remove('descricao_fisionomia')
+        fieldnames.append('descricao_fisionomia')
+    
+    return fieldnames
+
+
+def build_export_filename(project_name, now=None, suffix='', extension='csv'):
+    """
+    Monta o nome do arquivo de exportação com timestamp.
+    
+    Args:
+        project_name (str): Nome do projeto
+        now (datetime): Momento da exportação (padrão: agora)
+        suffix (str): Sufixo opcional antes da extensão (ex: '_long')
+        extension (str): Extensão do arquivo
+    
+    Returns:
+        str: Nome do arquivo (ex: 'Projeto_20260104_143045.csv')
+    """
+    timestamp = (now or datetime.now()).strftime('%Y%m%d_%H%M%S')
+    return f"{project_name}_{timestamp}{suffix}.{extension}"
+
+
+def export_plots_to_csv(plots, filepath):
+    """
+    Escreve as parcelas de um projeto em um arquivo CSV.
+    
+    Args:
+        plots (list): Lista de parcelas (dicionários)
+        filepath (str): Caminho do arquivo CSV de destino
+    """
+    # Cria a pasta de destino se não existir
+    directory = os.path.dirname(filepath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    
+    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=get_fieldnames(plots))
+        writer.writeheader()
+        writer.writerows(plots)
+
+
+def iter_wide_rows(plots, first_number=1):
+    """
+    Gera as linhas do CSV no formato largo, uma por parcela.
+    
+    Args:
+        plots (iterable): Parcelas (dicionários)
+        first_number (int): Número da primeira parcela, para parcelas sem 'numero'
+    
+    Yields:
+        list: Valores na ordem de WIDE_COLUMNS
+    """
+    for number, plot in enumerate(plots, first_number):
+        matrix = plot.get('matriz_fisionomica') or {}
+        row = [plot.get('numero', number)]
+        row.extend(plot.get(field, '') for field in PLOT_COLUMNS[1:])
+        
+        # Preenche apenas as células ocupadas (poucas das 128 na maioria das parcelas)
+        cells = [''] * len(CELL_KEYS)
+        for key, value in matrix.items():
+            cell_index = CELL_INDEX.get(key)
+            if cell_index is not None:
+                cells[cell_index] = value
+        row.extend(cells)
+        
+        # Métricas estruturais (em cache por id da parcela)
+        row.extend(plot_metrics(plot))
+        
+        row.append(plot.get('descricao_fisionomia', ''))
+        yield row
+
+
+def iter_long_rows(plots, first_number=1):
+    """
+    Gera as linhas do CSV no formato longo, uma por célula preenchida.
+    
+    Args:
+        plots (iterable): Parcelas (dicionários)
+        first_number (int): Número da primeira parcela, para parcelas sem 'numero'
+    
+    Yields:
+        list: Valores na ordem de LONG_COLUMNS
+    """
+    for number, plot in enumerate(plots, first_number):
+        plot_number = plot.get('numero', number)
+        plot_id = plot.get('id', '')
+        for key, value in (plot.get('matriz_fisionomica') or {}).items():
+            yield [plot_number, plot_id, key[0], key[1:], value]
+
+
+def write_plots_csv(plots, csvfile, layout='wide', progress=None, cancelled=None):
+    """
+    Escreve as parcelas em um arquivo aberto, linha a linha, com esquema fixo.
+    
+    Args:
+        plots (list): Lista de parcelas (dicionários)
+        csvfile (file): Arquivo de texto aberto com newline=''
+        layout (str): 'wide' (128 colunas forma x altura) ou 'long' (uma linha por célula)
+        progress (callable): Chamada como progress(parcelas_escritas, total)
+        cancelled (callable): Retorna True para interromper a exportação
+    
+    Returns:
+        bool: True se todas as parcelas foram escritas, False se foi cancelada
+    """
+    if layout == 'wide':
+        columns, row_function = WIDE_COLUMNS, iter_wide_rows
+    elif layout == 'long':
+        columns, row_function = LONG_COLUMNS, iter_long_rows
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {layout!r}")
+    
+    writer = csv.writer(csvfile)
+    writer.writerow(columns)
+    
+    # Exporta em blocos para reportar progresso e permitir cancelamento
+    total = len(plots)
+    for start in range(0, total, PROGRESS_INTERVAL):
+        if cancelled and cancelled():
+            return False
+        writer.writerows(row_function(plots[start:start + PROGRESS_INTERVAL], start + 1))
+        if progress:
+            progress(min(start + PROGRESS_INTERVAL, total), total)
+    
+    return True
+
+
+def stream_plots_to_csv(plots, filepath, layout='wide', progress=None, cancelled=None):
+    """
+    Escreve as parcelas em CSV linha a linha, com esquema fixo.
+    
+    O arquivo é escrito em um temporário e renomeado ao final, para que uma
+    exportação interrompida não deixe um CSV incompleto.
+    
+    Args:
+        plots (list): Lista de parcelas (dicionários)
+        filepath (str): Caminho do arquivo CSV de destino
+        layout (str): 'wide' (128 colunas forma x altura) ou 'long' (uma linha por célula)
+        progress (callable): Chamada como progress(parcelas_escritas, total)
+        cancelled (callable): Retorna True para interromper a exportação
+    
+    Returns:
+        bool: True se a exportação foi concluída, False se foi cancelada
+    """
+    # Cria a pasta de destino se não existir
+    directory = os.path.dirname(filepath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    
+    temp_path = filepath + '.tmp'
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            completed = write_plots_csv(plots, csvfile, layout, progress, cancelled)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    if completed:
+        os.replace(temp_path, filepath)
+    else:
+        os.remove(temp_path)
+    return completed
+
+
+def render_project_csv(project, layout='wide'):
+    """
+    Gera o CSV de um projeto em memória (usado nos processos do pool).
+    
+    Args:
+        project (dict): Projeto no formato de data.json
+        layout (str): 'wide' ou 'long'
+    
+    Returns:
+        tuple: (nome do projeto, número de parcelas, conteúdo CSV em bytes UTF-8)
+    """
+    buffer = io.StringIO(newline='')
+    plots = project.get('plots', [])
+    write_plots_csv(plots, buffer, layout)
+    return project.get('name', 'projeto'), len(plots), buffer.getvalue().encode('utf-8')
+
+
+def _archive_member_name(project_name, used_names):
+    """Gera um nome de arquivo seguro e único para o projeto dentro do arquivo compactado."""
+    safe_name = ''.join(c if c.isalnum() or c in ' -_.' else '_' for c in project_name).strip() or 'projeto'
+    name = f"{safe_name}.csv"
+    counter = 2
+    while name in used_names:
+        name = f"{safe_name}_{counter}.csv"
+        counter += 1
+    used_names.add(name)
+    return name
+
+
+def export_all_to_archive(projects, archive_path, layout='wide', workers=None,
+                          use_processes=True, progress=None, cancelled=None):
+    """
+    Exporta todos os projetos para um único arquivo compactado (.zip ou .tar.gz).
+    
+    Os CSVs são gerados em paralelo em um pool e gravados no arquivo à medida
+    que ficam prontos, junto com um manifest.json (nome, arquivo, parcelas,
+    tamanho e SHA-256 de cada projeto).
+    
+    Args:
+        projects (list): Projetos no formato de data.json
+        archive_path (str): Caminho do arquivo de destino (.zip ou .tar.gz)
+        layout (str): 'wide' ou 'long'
+        workers (int): Número de processos ou threads (padrão: número de CPUs)
+        use_processes (bool): Usa processos (False usa threads, ex: em Android)
+        progress (callable): Chamada como progress(projetos_concluídos, total)
+        cancelled (callable): Retorna True para interromper a exportação
+    
+    Returns:
+        dict: Manifest gravado no arquivo, ou None se a exportação foi cancelada
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    
+    is_tar = archive_path.endswith(('.tar.gz', '.tgz'))
+    
+    # Cria a pasta de destino se não existir
+    directory = os.path.dirname(archive_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'layout': layout,
+        'projects': []
+    }
+    used_names = set()
+    total = len(projects)
+    
+    temp_path = archive_path + '.tmp'
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    try:
+        if is_tar:
+            archive = tarfile.open(temp_path, 'w:gz')
+        else:
+            archive = zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        
+        with archive, executor_class(max_workers=workers) as pool:
+            # Nomes definidos na ordem dos projetos, não na ordem de conclusão
+            futures = {
+                pool.submit(render_project_csv, project, layout):
+                    _archive_member_name(project.get('name', 'projeto'), used_names)
+                for project in projects
+            }
+            completed = True
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancelled and cancelled():
+                    # Projetos ainda não iniciados não chegam a ser gerados
+                    for pending in futures:
+                        pending.cancel()
+                    completed = False
+                    break
+                project_name, num_plots, content = future.result()
+                member_name = futures[future]
+                _add_archive_member(archive, member_name, content)
+                manifest['projects'].append({
+                    'name': project_name,
+                    'file': member_name,
+                    'plots': num_plots,
+                    'bytes': len(content),
+                    'sha256': hashlib.sha256(content).hexdigest()
+                })
+                if progress:
+                    progress(done, total)
+            
+            # Ordem estável no manifest, independente da ordem de conclusão
+            manifest['projects'].sort(key=lambda entry: entry['file'])
+            _add_archive_member(archive, 'manifest.json',
+                                json.dumps(manifest, ensure_ascii=False, indent=4).encode('utf-8'))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    if not completed:
+        os.remove(temp_path)
+        return None
+    
+    os.replace(temp_path, archive_path)
+    return manifest
+
+
+def _add_archive_member(archive, member_name, content):
+    """Grava um arquivo (bytes) em um ZipFile ou TarFile aberto."""
+    if isinstance(archive, zipfile.ZipFile):
+        archive.writestr(member_name, content)
+    else:
+        info = tarfile.TarInfo(member_name)
+        info.size = len(content)
+        info.mtime = time.time()
+        archive.addfile(info, io.BytesIO(content))
+
+
+# ==================== EXPORTAÇÃO INCREMENTAL ====================
+
+# Coluna extra do arquivo delta: 'incluir' ou 'excluir'
+DELTA_COLUMNS = ['operacao'] + WIDE_COLUMNS
+
+
+def plot_checksum(plot):
+    """
+    Calcula o checksum do conteúdo de uma parcela.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        str: SHA-1 hexadecimal do JSON canônico da parcela
+    """
+    canonical = json.dumps(plot, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def make_tombstone(plots, plot_index, now=None):
+    """
+    Cria o registro de exclusão de uma parcela, usado pela exportação incremental.
+    
+    Deve ser chamado antes de remover a parcela da lista.
+    
+    Args:
+        plots (list): Parcelas do projeto
+        plot_index (int): Posição da parcela que será excluída
+        now (datetime): Momento da exclusão (padrão: agora)
+    
+    Returns:
+        dict: Registro com posição, checksum, data da exclusão e, se houver,
+              id e número da parcela
+    """
+    plot = plots[plot_index]
+    tombstone = {
+        'position': plot_index,
+        'checksum': plot_checksum(plot),
+        'deleted_at': (now or datetime.now()).isoformat(timespec='seconds')
+    }
+    for field in ('id', 'numero'):
+        if field in plot:
+            tombstone[field] = plot[field]
+    return tombstone
+
+
+def get_manifest_path(exports_dir, project_name):
+    """Retorna o caminho do manifest de exportação de um projeto."""
+    safe_name = ''.join(c if c.isalnum() or c in ' -_.' else '_' for c in project_name).strip() or 'projeto'
+    return os.path.join(exports_dir, f"{safe_name}.export.json")
+
+
+def _resolve_deletions(tombstones, exported_count, exported_ids=None):
+    """
+    Converte as exclusões feitas desde a última exportação em números de parcela
+    da numeração dessa exportação.
+    
+    Registros com 'id' são localizados pelo id entre as parcelas exportadas;
+    os demais (dados anteriores aos ids), pela posição gravada na exclusão.
+    
+    Args:
+        tombstones (list): Registros de exclusão ainda não processados, em ordem
+        exported_count (int): Parcelas exportadas na última exportação
+        exported_ids (list): Ids das parcelas exportadas, na ordem da exportação
+    
+    Returns:
+        tuple: (pares (número na numeração anterior, registro) das parcelas exportadas
+                que foram excluídas, parcelas exportadas restantes)
+    """
+    numbers = {plot_id: number for number, plot_id in enumerate(exported_ids or [], 1) if plot_id}
+    removed = []
+    deleted = []
+    remaining = exported_count
+    for tombstone in tombstones:
+        plot_id = tombstone.get('id')
+        if plot_id and numbers:
+            number = numbers.pop(plot_id, None)
+            if number is None:
+                # Parcela que não fazia parte da última exportação
+                continue
+            removed.append(number - 1)
+            deleted.append((number, tombstone))
+            remaining -= 1
+            continue
+        
+        position = tombstone.get('position')
+        if position is None or position >= remaining:
+            # Parcela criada depois da última exportação, ou excluída em outro
+            # dispositivo antes de chegar a este (sincronização): nada a remover
+            continue
+        
+        # Posição atual -> posição original, desfazendo as exclusões anteriores
+        original = position
+        for earlier in sorted(removed):
+            if earlier <= original:
+                original += 1
+        removed.append(original)
+        deleted.append((original + 1, tombstone))
+        remaining -= 1
+    
+    return deleted, remaining
+
+
+def export_incremental(project, exports_dir, mode='delta', layout='wide'):
+    """
+    Exporta apenas as mudanças de um projeto desde a última exportação.
+    
+    O manifest do projeto (em exports_dir) guarda a marca d'água: quantas parcelas
+    já foram exportadas (e os seus ids), o checksum da última e quantas exclusões
+    já foram processadas. As parcelas novas são sempre as do fim da lista, então o custo
+    é proporcional às mudanças, não ao tamanho do projeto.
+    
+    Modos:
+        - 'delta': grava um CSV largo com a coluna 'operacao' ('excluir' identifica a
+          parcela pelo número e id gravados na exclusão; 'incluir' traz a linha completa)
+        - 'append': acrescenta as parcelas novas ao CSV da exportação anterior;
+          se houve exclusões, é feita uma exportação completa
+    
+    Sem manifest válido (primeira exportação, formato diferente ou dados que não
+    conferem com o checksum) é feita uma exportação completa.
+    
+    Args:
+        project (dict): Projeto no formato de data.json
+        exports_dir (str): Diretório das exportações e do manifest
+        mode (str): 'delta' ou 'append'
+        layout (str): 'wide' ou 'long' ('long' somente no modo 'append')
+    
+    Returns:
+        dict: Resumo com 'file' (None se não houve mudanças), 'mode' ('full', 'delta'
+              ou 'append'), 'added' e 'deleted'
+    
+    Raises:
+        ValueError: Modo desconhecido, ou modo 'delta' com layout 'long'
+    """
+    if mode not in ('delta', 'append'):
+        raise ValueError(f"Modo de exportação incremental desconhecido: {mode!r}")
+    if mode == 'delta' and layout == 'long':
+        raise ValueError("A exportação incremental 'delta' só tem o formato largo")
+    
+    project_name = project.get('name', 'projeto')
+    plots = project.get('plots', [])
+    tombstones = project.get('plot_tombstones', [])
+    manifest_path = get_manifest_path(exports_dir, project_name)
+    manifest = _load_manifest(manifest_path)
+    
+    summary = _incremental_changes(manifest, project_name, plots, tombstones, mode, layout, exports_dir)
+    if summary is None:
+        # Exportação completa, que passa a ser a nova base
+        filename = build_export_filename(project_name)
+        stream_plots_to_csv(plots, os.path.join(exports_dir, filename), layout=layout)
+        summary = {'file': filename, 'mode': 'full', 'added': len(plots), 'deleted': 0}
+        manifest = {'csv': filename, 'layout': layout,
+                    'columns': WIDE_COLUMNS if layout == 'wide' else LONG_COLUMNS}
+    elif summary['mode'] == 'append':
+        manifest['csv'] = summary['file']
+    
+    manifest.update({
+        'exported_count': len(plots),
+        'exported_ids': [plot.get('id') for plot in plots],
+        'last_checksum': plot_checksum(plots[-1]) if plots else None,
+        'tombstones_processed': len(tombstones),
+        'updated_at': datetime.now().isoformat(timespec='seconds')
+    })
+    data_manager.save_data(manifest, manifest_path)
+    
+    return summary
+
+
+def _load_manifest(manifest_path):
+    """Carrega o manifest de exportação ou retorna dicionário vazio."""
+    try:
+        return data_manager.load_data(manifest_path)
+    except ValueError:
+        # Manifest corrompido: tratado como ausente (exportação completa)
+        return {}
+
+
+def _incremental_changes(manifest, project_name, plots, tombstones, mode, layout, exports_dir):
+    """
+    Grava as mudanças desde a última exportação, se o manifest permitir.
+    
+    Returns:
+        dict: Resumo da exportação, ou None se for necessária uma exportação completa
+    """
+    required = ('csv', 'layout', 'columns', 'exported_count', 'tombstones_processed')
+    if any(key not in manifest for key in required) or manifest['layout'] != layout:
+        return None
+    # Exportação anterior com outro esquema de colunas
+    if manifest['columns'] != (WIDE_COLUMNS if layout == 'wide' else LONG_COLUMNS):
+        return None
+    
+    processed = manifest['tombstones_processed']
+    if processed > len(tombstones):
+        return None
+    
+    exported_ids = manifest.get('exported_ids')
+    if not isinstance(exported_ids, list) or len(exported_ids) != manifest['exported_count']:
+        # Manifest anterior aos ids: exclusões localizadas pela posição
+        exported_ids = None
+    deleted, remaining = _resolve_deletions(tombstones[processed:], manifest['exported_count'], exported_ids)
+    deleted_numbers = [number for number, _ in deleted]
+    if remaining > len(plots):
+        return None
+    
+    # A última parcela exportada, se ainda existir, deve conferir com o checksum
+    last_survived = manifest['exported_count'] not in deleted_numbers
+    if remaining and last_survived and plot_checksum(plots[remaining - 1]) != manifest.get('last_checksum'):
+        return None
+    
+    new_plots = plots[remaining:]
+    
+    if mode == 'append':
+        csv_path = os.path.join(exports_dir, manifest['csv'])
+        if deleted_numbers or not os.path.exists(csv_path):
+            return None
+        with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
+            row_function = iter_wide_rows if layout == 'wide' else iter_long_rows
+            csv.writer(csvfile).writerows(row_function(new_plots, remaining + 1))
+        return {'file': manifest['csv'], 'mode': 'append', 'added': len(new_plots), 'deleted': 0}
+    
+    if not deleted_numbers and not new_plots:
+        return {'file': None, 'mode': 'delta', 'added': 0, 'deleted': 0}
+    
+    filename = build_export_filename(project_name, suffix='_delta')
+    filepath = os.path.join(exports_dir, filename)
+    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(DELTA_COLUMNS)
+        for number, tombstone in deleted:
+            writer.writerow(['excluir', tombstone.get('numero', number), tombstone.get('id', '')]
+                            + [''] * (len(WIDE_COLUMNS) - 2))
+        writer.writerows(['incluir'] + row for row in iter_wide_rows(new_plots, remaining + 1))
+    
+    return {'file': filename, 'mode': 'delta', 'added': len(new_plots), 'deleted': len(deleted_numbers)}
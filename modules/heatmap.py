@@ -0,0 +1,223 @@
+"""
+Módulo de renderização da matriz fisionômica em mapa de calor.
+Gera o buffer de bytes RGBA de uma textura com as 16 formas de vida nas
+colunas e as 8 classes de altura nas linhas (altura 1 embaixo, como na
+origem das texturas do Kivy). A matriz de uma parcela usa uma cor por classe
+de cobertura; o resumo de um projeto usa a frequência de cada célula entre
+as parcelas. Assim a interface desenha a matriz inteira com um único widget
+e um único retângulo texturizado, em vez de um widget por célula.
+
+O módulo não depende do Kivy: a textura é criada pela interface a partir
+dos bytes (Texture.blit_buffer com colorfmt='rgba').
+"""
+
+from modules.kuchler_calculator import FORMS_ORDER
+from modules.models import HEIGHTS
+
+COLUMNS = len(FORMS_ORDER)
+ROWS = len(HEIGHTS)
+
+# Texels por célula; o último texel de cada lado fica transparente e separa as células
+CELL_PIXELS = 4
+
+# Cores RGBA (0-255)
+EMPTY_COLOR = (224, 224, 224, 255)
+GAP_COLOR = (0, 0, 0, 0)
+COVERAGE_COLORS = {
+    'c': (27, 94, 32, 255),
+    'i': (56, 142, 60, 255),
+    'p': (102, 187, 106, 255),
+    'r': (165, 214, 167, 255),
+    'b': (200, 230, 201, 255),
+    'a': (241, 248, 233, 255)
+}
+# Características foliares (coluna 'F')
+FOLIAR_COLOR = (255, 179, 0, 255)
+# Extremos da escala de frequência (de quase nenhuma a todas as parcelas)
+FREQUENCY_LOW = (232, 245, 233, 255)
+FREQUENCY_HIGH = (27, 94, 32, 255)
+
+# Limite de parcelas no cache; ao ser atingido, o cache é esvaziado
+MAX_CACHED = 20_000
+
+_FORM_COLUMN = {form: column for column, form in enumerate(FORMS_ORDER)}
+_HEIGHT_ROW = {height: row for row, height in enumerate(HEIGHTS)}
+_cache = {}
+
+
+def texture_size(cell_pixels=CELL_PIXELS):
+    """Tamanho (largura, altura) em texels da textura da matriz."""
+    return COLUMNS * cell_pixels, ROWS * cell_pixels
+
+
+def _cell_position(key):
+    """(linha, coluna) de uma célula 'D4', ou None se a chave for inválida."""
+    column = _FORM_COLUMN.get(key[:1])
+    row = _HEIGHT_ROW.get(key[1:])
+    if column is None or row is None:
+        return None
+    return row, column
+
+
+def render(colors, cell_pixels=CELL_PIXELS):
+    """
+    Monta o buffer RGBA de uma grade de cores.
+    
+    Args:
+        colors (list): ROWS listas de COLUMNS cores RGBA, da altura 1 para a 8
+        cell_pixels (int): Texels por célula (1 = sem separação entre células)
+    
+    Returns:
+        bytes: Buffer com texture_size(cell_pixels) texels, linha de baixo primeiro
+    """
+    if cell_pixels == 1:
+        return b''.join(bytes(color) for row in colors for color in row)
+    
+    gap = bytes(GAP_COLOR)
+    gap_row = gap * (COLUMNS * cell_pixels)
+    fill = cell_pixels - 1
+    rows = []
+    for row in colors:
+        # Uma linha de texels serve para todas as linhas de texels da célula
+        texel_row = b''.join(bytes(color) * fill + gap for color in row)
+        rows.append(texel_row * fill + gap_row)
+    return b''.join(rows)
+
+
+def matrix_colors(matrix):
+    """
+    Cores das células de uma matriz fisionômica.
+    
+    Args:
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+    
+    Returns:
+        list: ROWS listas de COLUMNS cores RGBA
+    """
+    colors = [[EMPTY_COLOR] * COLUMNS for _ in range(ROWS)]
+    for key, value in (matrix or {}).items():
+        position = _cell_position(key)
+        if position is None or not value:
+            continue
+        row, column = position
+        if key[0] == 'F':
+            colors[row][column] = FOLIAR_COLOR
+        else:
+            colors[row][column] = COVERAGE_COLORS.get(value, EMPTY_COLOR)
+    return colors
+
+
+def matrix_pixels(matrix, cell_pixels=CELL_PIXELS):
+    """
+    Buffer RGBA de uma matriz fisionômica.
+    
+    Args:
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+        cell_pixels (int): Texels por célula
+    
+    Returns:
+        bytes: Buffer para Texture.blit_buffer
+    """
+    return render(matrix_colors(matrix), cell_pixels)
+
+
+def plot_pixels(plot, cell_pixels=CELL_PIXELS):
+    """
+    Buffer RGBA da matriz de uma parcela, com cache pelo id.
+    
+    A matriz não muda depois de gravada, então o buffer de cada parcela é
+    gerado uma vez e reaproveitado a cada montagem da lista.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+        cell_pixels (int): Texels por célula
+    
+    Returns:
+        bytes: Buffer para Texture.blit_buffer
+    """
+    plot_id = plot.get('id')
+    key = (plot_id, cell_pixels)
+    pixels = _cache.get(key) if plot_id is not None else None
+    if pixels is None:
+        pixels = matrix_pixels(plot.get('matriz_fisionomica'), cell_pixels)
+        if plot_id is not None:
+            if len(_cache) >= MAX_CACHED:
+                _cache.clear()
+            _cache[key] = pixels
+    return pixels
+
+
+def clear_cache():
+    """Esvazia o cache de buffers das parcelas."""
+    _cache.clear()
+
+
+def cell_frequencies(plots):
+    """
+    Frequência de cada célula entre as parcelas.
+    
+    Uma célula conta como presente quando tem cobertura diferente de
+    'a' (ausente) ou, na coluna 'F', qualquer característica foliar.
+    
+    Args:
+        plots (iterable): Parcelas no formato de data.json
+    
+    Returns:
+        tuple: (dicionário célula -> fração das parcelas, número de parcelas)
+    """
+    counts = {}
+    total = 0
+    for plot in plots:
+        total += 1
+        for key, value in (plot.get('matriz_fisionomica') or {}).items():
+            if value and value != 'a':
+                counts[key] = counts.get(key, 0) + 1
+    if not total:
+        return {}, 0
+    return {key: count / total for key, count in counts.items() if _cell_position(key)}, total
+
+
+def frequency_color(fraction):
+    """Cor da escala de frequência (0 a 1); frequência zero usa EMPTY_COLOR."""
+    if fraction <= 0:
+        return EMPTY_COLOR
+    fraction = min(fraction, 1.0)
+    return tuple(round(low + (high - low) * fraction) for low, high in zip(FREQUENCY_LOW, FREQUENCY_HIGH))
+
+
+def frequency_pixels(frequencies, cell_pixels=CELL_PIXELS):
+    """
+    Buffer RGBA do mapa de frequência de um projeto.
+    
+    Args:
+        frequencies (dict): Célula -> fração das parcelas (de cell_frequencies)
+        cell_pixels (int): Texels por célula
+    
+    Returns:
+        bytes: Buffer para Texture.blit_buffer
+    """
+    colors = [[EMPTY_COLOR] * COLUMNS for _ in range(ROWS)]
+    for key, fraction in frequencies.items():
+        position = _cell_position(key)
+        if position is not None:
+            row, column = position
+            colors[row][column] = frequency_color(fraction)
+    return render(colors, cell_pixels)
+
+
+def cell_at(x, y, width, height):
+    """
+    Célula da matriz em um ponto do widget.
+    
+    Args:
+        x, y (float): Ponto relativo ao canto inferior esquerdo do widget
+        width, height (float): Tamanho do widget
+    
+    Returns:
+        tuple: (forma, altura), ou None fora da matriz
+    """
+    if width <= 0 or height <= 0 or not (0 <= x < width and 0 <= y < height):
+        return None
+    column = int(x * COLUMNS / width)
+    row = int(y * ROWS / height)
+    return FORMS_ORDER[column], HEIGHTS[row]
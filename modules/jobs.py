@@ -0,0 +1,402 @@
+"""
+Módulo de tarefas em segundo plano.
+Executa operações pesadas (exportação, gravação, backup, análises) fora da
+thread da interface: threads para E/S e processos para cálculo. Resultados,
+progresso e cancelamentos são entregues por uma função de despacho, que no
+app agenda a chamada no Clock do Kivy (thread principal), então os callbacks
+podem alterar widgets diretamente.
+
+Também executa trabalho que precisa da thread principal (ex: criar widgets)
+em fatias de poucos milissegundos por frame.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Prioridades: menor valor é executado primeiro
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Estados de uma tarefa
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Tempo máximo, em segundos, de cada fatia de trabalho na thread principal (~1/2 frame a 60 FPS)
+FRAME_BUDGET = 0.008
+
+
+class JobCancelled(Exception):
+    """Pode ser levantada por uma tarefa que percebeu o próprio cancelamento."""
+
+
+class Job:
+    """
+    Tarefa submetida ao JobScheduler.
+    
+    O cancelamento é cooperativo: uma tarefa pendente não chega a ser executada;
+    uma tarefa em execução deve consultar is_cancelled() (tarefas em thread) ou
+    tem o resultado descartado (tarefas em processo).
+    """
+    
+    def __init__(self, scheduler, func, args, kwargs, kind, priority, key, pass_job,
+                 on_done, on_error, on_progress, on_cancel):
+        self._scheduler = scheduler
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.kind = kind
+        self.priority = priority
+        self.key = key
+        self.pass_job = pass_job
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self._cancel_requested = threading.Event()
+        self._finished = threading.Event()
+        self._progress = None
+        self._progress_lock = threading.Lock()
+    
+    @property
+    def finished(self):
+        """Indica se a tarefa terminou (concluída, com erro ou cancelada)."""
+        return self._finished.is_set()
+    
+    def is_cancelled(self):
+        """Indica se o cancelamento foi pedido (pode ser passada como callback 'cancelled')."""
+        return self._cancel_requested.is_set()
+    
+    def cancel(self):
+        """
+        Pede o cancelamento da tarefa.
+        
+        Returns:
+            bool: True se a tarefa ainda não havia começado e não será executada
+        """
+        self._cancel_requested.set()
+        return self._scheduler._cancel_pending(self)
+    
+    def report_progress(self, done, total):
+        """
+        Informa o progresso (chamada pela própria tarefa, em qualquer thread).
+        
+        Várias chamadas entre dois frames geram uma única entrega, com o valor
+        mais recente.
+        """
+        if self.on_progress is None:
+            return
+        with self._progress_lock:
+            pending = self._progress is not None
+            self._progress = (done, total)
+        if not pending:
+            self._scheduler._dispatch(self._deliver_progress)
+    
+    def _deliver_progress(self):
+        with self._progress_lock:
+            progress, self._progress = self._progress, None
+        if progress is not None and not self.finished:
+            self.on_progress(*progress)
+    
+    def wait(self, timeout=None):
+        """
+        Aguarda o fim da tarefa (não usar na thread da interface).
+        
+        Returns:
+            bool: True se a tarefa terminou dentro do prazo
+        """
+        return self._finished.wait(timeout)
+
+
+class JobScheduler:
+    """
+    Fila de tarefas com prioridades, executadas em um pool de threads ou de processos.
+    
+    Tarefas com a mesma chave (key) nunca rodam ao mesmo tempo e começam na
+    ordem de prioridade e de submissão (ex: gravações do mesmo arquivo).
+    
+    As tarefas em execução não são interrompidas; para que tarefas longas
+    (índices, exportações) não atrasem as urgentes, parte das threads só
+    executa tarefas PRIORITY_HIGH (ex: gravação dos dados).
+    """
+    
+    def __init__(self, dispatch=None, threads=2, processes=None, use_processes=True, reserved_threads=1):
+        """
+        Args:
+            dispatch (callable): Recebe uma função sem argumentos e a executa na
+                                 thread principal (padrão: executa na hora, na
+                                 thread que terminou a tarefa)
+            threads (int): Número de threads de trabalho
+            processes (int): Número de processos do pool (padrão: número de CPUs)
+            use_processes (bool): Se False (ex: Android e iOS), tarefas 'process'
+                                  rodam nas threads
+            reserved_threads (int): Threads extras que só executam tarefas PRIORITY_HIGH
+        """
+        self._dispatch = dispatch or (lambda callback: callback())
+        self._num_threads = threads
+        self._num_reserved = reserved_threads
+        self._process_workers = processes or os.cpu_count() or 1
+        self._use_processes = use_processes
+        
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._queue = []
+        self._process_queue = []
+        self._busy_keys = set()
+        self._threads = []
+        self._process_pool = None
+        self._process_running = 0
+        self._shutdown = False
+    
+    def submit(self, func, *args, kind='thread', priority=PRIORITY_NORMAL, key=None, pass_job=False,
+               kwargs=None, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """
+        Agenda uma tarefa.
+        
+        Args:
+            func (callable): Função da tarefa (em 'process', deve ser de nível de módulo)
+            args: Argumentos posicionais de func
+            kind (str): 'thread' (E/S) ou 'process' (cálculo, sem progresso)
+            priority (int): Prioridade (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+            key (str): Tarefas com a mesma chave rodam uma de cada vez
+            pass_job (bool): Passa o Job como primeiro argumento de func (progresso e cancelamento)
+            kwargs (dict): Argumentos nomeados de func
+            on_done (callable): on_done(resultado), na thread principal
+            on_error (callable): on_error(exceção), na thread principal
+            on_progress (callable): on_progress(feito, total), na thread principal
+            on_cancel (callable): on_cancel(), na thread principal
+        
+        Returns:
+            Job: Tarefa agendada
+        """
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Tipo de tarefa inválido: {kind!r}")
+        if kind == 'process' and (pass_job or key is not None):
+            raise ValueError("Tarefas 'process' não recebem o Job nem usam chave")
+        
+        job = Job(self, func, args, kwargs or {}, kind, priority, key, pass_job,
+                  on_done, on_error, on_progress, on_cancel)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('O agendador de tarefas foi encerrado')
+            entry = (priority, next(self._counter), job)
+            if kind == 'process' and self._use_processes:
+                heapq.heappush(self._process_queue, entry)
+                self._feed_processes()
+            else:
+                heapq.heappush(self._queue, entry)
+                self._start_threads()
+                # Todas acordam: uma thread reservada não pode pegar uma tarefa comum
+                self._condition.notify_all()
+        return job
+    
+    # ==================== THREADS ====================
+    
+    def _start_threads(self):
+        """Cria as threads de trabalho na primeira tarefa (com a trava obtida)."""
+        while len(self._threads) < self._num_threads + self._num_reserved:
+            reserved = len(self._threads) >= self._num_threads
+            thread = threading.Thread(target=self._worker, args=(reserved,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+    
+    def _next_job(self, high_only=False):
+        """
+        Retira da fila a tarefa de maior prioridade cuja chave está livre (com a trava obtida).
+        
+        Args:
+            high_only (bool): Só retira tarefas PRIORITY_HIGH (threads reservadas)
+        """
+        blocked = []
+        job = None
+        while self._queue:
+            if high_only and self._queue[0][0] > PRIORITY_HIGH:
+                break
+            entry = heapq.heappop(self._queue)
+            if entry[2].key is not None and entry[2].key in self._busy_keys:
+                blocked.append(entry)
+                continue
+            job = entry[2]
+            break
+        for entry in blocked:
+            heapq.heappush(self._queue, entry)
+        return job
+    
+    def _worker(self, reserved):
+        while True:
+            with self._condition:
+                job = self._next_job(reserved)
+                while job is None:
+                    if self._shutdown and not self._queue:
+                        return
+                    self._condition.wait()
+                    job = self._next_job(reserved)
+                job.status = RUNNING
+                if job.key is not None:
+                    self._busy_keys.add(job.key)
+            
+            self._run(job)
+            
+            with self._condition:
+                self._busy_keys.discard(job.key)
+                self._condition.notify_all()
+    
+    def _run(self, job):
+        try:
+            args = (job,) + job.args if job.pass_job else job.args
+            result = job.func(*args, **job.kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, error=e)
+        else:
+            self._finish(job, CANCELLED if job.is_cancelled() else DONE, result)
+    
+    # ==================== PROCESSOS ====================
+    
+    def _feed_processes(self):
+        """Envia ao pool tarefas da fila, no máximo uma por processo (com a trava obtida)."""
+        if not self._process_queue:
+            return
+        if self._process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._process_pool = ProcessPoolExecutor(max_workers=self._process_workers)
+        
+        # O pool tem fila própria, sem prioridades: só recebe o que pode começar agora
+        while self._process_queue and self._process_running < self._process_workers:
+            job = heapq.heappop(self._process_queue)[2]
+            job.status = RUNNING
+            self._process_running += 1
+            future = self._process_pool.submit(job.func, *job.args, **job.kwargs)
+            future.add_done_callback(lambda future, job=job: self._process_finished(job, future))
+    
+    def _process_finished(self, job, future):
+        with self._condition:
+            self._process_running -= 1
+            self._feed_processes()
+            self._condition.notify_all()
+        
+        error = future.exception()
+        if job.is_cancelled():
+            self._finish(job, CANCELLED)
+        elif error is not None:
+            self._finish(job, FAILED, error=error)
+        else:
+            self._finish(job, DONE, future.result())
+    
+    # ==================== CONCLUSÃO E CANCELAMENTO ====================
+    
+    def _finish(self, job, status, result=None, error=None):
+        """Registra o fim da tarefa e entrega o callback correspondente na thread principal."""
+        job.status = status
+        job.result = result
+        job.error = error
+        job._finished.set()
+        
+        if status == DONE and job.on_done:
+            self._dispatch(lambda: job.on_done(result))
+        elif status == FAILED:
+            if job.on_error:
+                self._dispatch(lambda: job.on_error(error))
+            else:
+                print(f"Erro na tarefa {getattr(job.func, '__name__', job.func)}: {error!r}")
+        elif status == CANCELLED and job.on_cancel:
+            self._dispatch(job.on_cancel)
+    
+    def _cancel_pending(self, job):
+        """Remove uma tarefa ainda não iniciada da fila."""
+        with self._condition:
+            if job.status != PENDING:
+                return False
+            for queue in (self._queue, self._process_queue):
+                for index, entry in enumerate(queue):
+                    if entry[2] is job:
+                        queue[index] = queue[-1]
+                        queue.pop()
+                        heapq.heapify(queue)
+                        break
+        self._finish(job, CANCELLED)
+        return True
+    
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        Encerra o agendador: novas tarefas são recusadas.
+        
+        Args:
+            wait (bool): Aguarda o fim das tarefas em andamento (e das pendentes,
+                         se não forem canceladas)
+            cancel_pending (bool): Cancela as tarefas que ainda não começaram
+        """
+        with self._condition:
+            self._shutdown = True
+            pending = [entry[2] for entry in self._queue + self._process_queue] if cancel_pending else []
+        for job in pending:
+            job.cancel()
+        
+        with self._condition:
+            self._condition.notify_all()
+            if wait:
+                while self._process_queue or self._process_running:
+                    self._condition.wait()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+    
+    # ==================== THREAD PRINCIPAL ====================
+    
+    def run_incremental(self, steps, budget=FRAME_BUDGET, on_done=None, on_cancel=None):
+        """
+        Executa um iterável na thread principal, em fatias de até budget segundos.
+        
+        Cada item consumido é um passo (ex: criar o card de uma parcela); entre
+        as fatias, a função de despacho devolve o controle ao laço da interface.
+        Deve ser chamada na thread principal.
+        
+        Args:
+            steps (iterable): Passos do trabalho (normalmente um gerador)
+            budget (float): Duração máxima de cada fatia, em segundos
+            on_done (callable): on_done(), após o último passo
+            on_cancel (callable): on_cancel(), se cancelado antes do fim
+        
+        Returns:
+            Job: Tarefa (kind 'main'), que pode ser cancelada
+        """
+        job = Job(self, None, (), {}, 'main', PRIORITY_NORMAL, None, False, None, None, None, on_cancel)
+        job.status = RUNNING
+        iterator = iter(steps)
+        
+        def run_slice():
+            if job.finished:
+                return
+            if job.is_cancelled():
+                job.status = CANCELLED
+                job._finished.set()
+                if on_cancel:
+                    on_cancel()
+                return
+            deadline = time.perf_counter() + budget
+            while time.perf_counter() < deadline:
+                try:
+                    next(iterator)
+                except StopIteration:
+                    job.status = DONE
+                    job._finished.set()
+                    if on_done:
+                        on_done()
+                    return
+            self._dispatch(run_slice)
+        
+        run_slice()
+        return job
@@ -4,6 +4,122 @@ Gera fórmulas e descrições textuais a partir de dados de matriz fisionômica.
 """
 
 
+# Ordem das formas de crescimento e das alturas na fórmula
+FORMS_ORDER = ['B', 'D', 'E', 'N', 'O', 'S', 'M', 'G', 'H', 'L', 'C', 'K', 'T', 'V', 'X', 'F']
+HEIGHTS_ORDER = ['8', '7', '6', '5', '4', '3', '2', '1']  # Do mais alto para o mais baixo
+
+# Dicionários de descrição
+FORMS_DESC = {
+    'B': 'folhas sempreverdes',
+    'D': 'folhas decíduas',
+    'E': 'acículas sempreverdes',
+    'N': 'acículas decíduas',
+    'O': 'áfilas',
+    'S': 'semidecíduas',
+    'M': 'mistas',
+    'G': 'graminoides',
+    'H': 'ervas comuns',
+    'L': 'musgos e líquens',
+    'C': 'lianas',
+    'K': 'caule suculento',
+    'T': 'plantas tufadas',
+    'V': 'bambus',
+    'X': 'epífitas',
+    'F': 'folhas especiais'
+}
+
+HEIGHTS_DESC = {
+    '8': 'acima de 35m',
+    '7': 'entre 20-35m',
+    '6': 'entre 10-20m',
+    '5': 'entre 5-10m',
+    '4': 'entre 2-5m',
+    '3': 'entre 0,5-2m',
+    '2': 'entre 0,1-0,5m',
+    '1': 'abaixo de 0,1m'
+}
+
+COVERAGE_DESC = {
+    'c': 'contínua (>75%)',
+    'i': 'interrompida (51-75%)',
+    'p': 'porosa (26-50%)',
+    'r': 'rara (6-25%)',
+    'b': 'baixa (1-5%)',
+    'a': 'ausente (<1%)'
+}
+
+# Ponto médio (%) de cada classe de cobertura, para médias e somas de cobertura
+COVERAGE_MIDPOINTS = {
+    'c': 87.5,
+    'i': 63.0,
+    'p': 38.0,
+    'r': 15.5,
+    'b': 3.0,
+    'a': 0.5
+}
+
+
+def generate_form_segment(form, coverage_by_height):
+    """
+    Gera o trecho da fórmula correspondente a uma única forma de crescimento.
+    
+    Args:
+        form (str): Letra da forma de crescimento (ex: 'D')
+        coverage_by_height (dict): Dicionário altura -> cobertura (ex: {'4': 'p', '3': 'i'})
+    
+    Returns:
+        str: Trecho da fórmula para a forma (vazio se não houver alturas)
+    
+    Exemplo:
+        >>> generate_form_segment('D', {'4': 'p', '3': 'i', '2': 'i'})
+        'D4p32i'
+    """
+    if not coverage_by_height:
+        return ''
+    
+    # Agrupar alturas com mesma cobertura
+    coverage_groups = {}
+    for hgt, cov in coverage_by_height.items():
+        if cov not in coverage_groups:
+            coverage_groups[cov] = []
+        coverage_groups[cov].append(hgt)
+    
+    # Ordenar alturas dentro de cada grupo (da maior para a menor)
+    for cov in coverage_groups:
+        coverage_groups[cov].sort(key=lambda x: HEIGHTS_ORDER.index(x))
+    
+    # Primeiro, verificar se há apenas um tipo de cobertura
+    if len(coverage_groups) == 1:
+        single_coverage = list(coverage_groups.keys())[0]
+        heights_str = ''.join(coverage_groups[single_coverage])
+        
+        # Omitir 'c' se for a única cobertura e for 'c'
+        if single_coverage == 'c':
+            return f"{form}{heights_str}"
+        return f"{form}{heights_str}{single_coverage}"
+    
+    # Múltiplas coberturas: escrever cada grupo separadamente
+    # Ordenar grupos por altura mais alta primeiro
+    sorted_groups = sorted(coverage_groups.items(),
+                           key=lambda x: HEIGHTS_ORDER.index(x[1][0]))
+    
+    parts = []
+    for cov, hgts in sorted_groups:
+        heights_str = ''.join(hgts)
+        
+        if not parts:
+            # Primeira parte: incluir forma
+            if cov == 'c':
+                parts.append(f"{form}{heights_str}")
+            else:
+                parts.append(f"{form}{heights_str}{cov}")
+        else:
+            # Partes subsequentes: sem repetir a forma
+            parts.append(f"{heights_str}{cov}")
+    
+    return ''.join(parts)
+
+
 def generate_kuchler_formula(physiognomic_matrix):
     """
     Gera a fórmula fisionômica de Küchler a partir dos dados da matriz.
@@ -23,10 +139,6 @@ def generate_kuchler_formula(physiognomic_matrix):
     if not physiognomic_matrix:
         return ''
     
-    # Dicionários de mapeamento
-    forms_order = ['B', 'D', 'E', 'N', 'O', 'S', 'M', 'G', 'H', 'L', 'C', 'K', 'T', 'V', 'X', 'F']
-    heights = ['8', '7', '6', '5', '4', '3', '2', '1']
-    
     # Organizar dados por forma de crescimento
     data_by_form = {}
     
@@ -36,10 +148,8 @@ def generate_kuchler_formula(physiognomic_matrix):
         height = key[1]  # Número da altura
         
         # Características foliares (F) são tratadas separadamente
+        # Por enquanto, F não entra na fórmula principal
         if form == 'F':
-            leaf_characteristic = coverage
-            # F está associado a uma altura, precisamos associar à forma principal
-            # Por enquanto, vamos ignorar F na fórmula principal
             continue
         
         if form not in data_by_form:
@@ -47,59 +157,9 @@ def generate_kuchler_formula(physiognomic_matrix):
         
         data_by_form[form][height] = coverage
     
-    # Ordenar formas por importância (ordem definida)
-    present_forms = [f for f in forms_order if f in data_by_form]
-    
-    # Construir a fórmula
-    formula_parts = []
-    
-    for form in present_forms:
-        present_heights = data_by_form[form]
-        
-        # Agrupar alturas com mesma cobertura
-        coverage_groups = {}
-        for hgt, cov in present_heights.items():
-            if cov not in coverage_groups:
-                coverage_groups[cov] = []
-            coverage_groups[cov].append(hgt)
-        
-        # Ordenar alturas dentro de cada grupo (da maior para a menor)
-        for cov in coverage_groups:
-            coverage_groups[cov].sort(key=lambda x: heights.index(x))
-        
-        # Construir string para esta forma
-        # Primeiro, verificar se há apenas um tipo de cobertura
-        if len(coverage_groups) == 1:
-            single_coverage = list(coverage_groups.keys())[0]
-            heights_str = ''.join(coverage_groups[single_coverage])
-            
-            # Omitir 'c' se for a única cobertura e for 'c'
-            if single_coverage == 'c':
-                formula_parts.append(f"{form}{heights_str}")
-            else:
-                formula_parts.append(f"{form}{heights_str}{single_coverage}")
-        else:
-            # Múltiplas coberturas: escrever cada grupo separadamente
-            # Ordenar grupos por altura mais alta primeiro
-            sorted_groups = sorted(coverage_groups.items(), 
-                                  key=lambda x: heights.index(x[1][0]))
-            
-            first_part = True
-            for cov, hgts in sorted_groups:
-                heights_str = ''.join(hgts)
-                
-                if first_part:
-                    # Primeira parte: incluir forma
-                    if cov == 'c':
-                        formula_parts.append(f"{form}{heights_str}")
-                    else:
-                        formula_parts.append(f"{form}{heights_str}{cov}")
-                    first_part = False
-                else:
-                    # Partes subsequentes: sem repetir a forma
-                    formula_parts.append(f"{heights_str}{cov}")
-    
-    return ''.join(formula_parts)
+    # Construir a fórmula na ordem de importância definida
+    return ''.join(generate_form_segment(form, data_by_form[form])
+                   for form in FORMS_ORDER if form in data_by_form)
 
 
 def _join_with_and(items):
@@ -129,6 +189,61 @@ def _join_with_and(items):
     return ', '.join(items[:-1]) + f" e {items[-1]}"
 
 
+def describe_stratum(height, coverage_by_form):
+    """
+    Gera a frase descritiva de um único estrato (classe de altura).
+    
+    Args:
+        height (str): Classe de altura (ex: '4')
+        coverage_by_form (dict): Dicionário forma -> cobertura, na ordem de registro
+    
+    Returns:
+        str: Frase do estrato, sem ponto final
+    """
+    height_desc = HEIGHTS_DESC.get(height, height)
+    
+    # Agrupar por cobertura
+    by_coverage = {}
+    for form, cov in coverage_by_form.items():
+        if cov not in by_coverage:
+            by_coverage[cov] = []
+        by_coverage[cov].append(FORMS_DESC.get(form, form))
+    
+    # Criar descrições para cada cobertura
+    form_parts = []
+    for cov, forms in by_coverage.items():
+        # Usar função auxiliar para juntar formas com "e"
+        forms_text = _join_with_and(forms)
+        cov_text = COVERAGE_DESC.get(cov, cov)
+        # Remover a descrição entre parênteses (ex: "(>75%)")
+        cov_text_clean = cov_text.split(' (')[0]
+        form_parts.append(f"{forms_text} com cobertura {cov_text_clean}")
+    
+    # Articular as diferentes coberturas com vírgula e "e"
+    coverage_desc_text = _join_with_and(form_parts)
+    
+    return f"Na faixa de altura {height_desc}, predominam {coverage_desc_text}"
+
+
+def join_stratum_descriptions(stratum_descriptions):
+    """
+    Monta a descrição final a partir das frases de cada estrato.
+    
+    Args:
+        stratum_descriptions (list): Frases dos estratos, do mais alto para o mais baixo
+    
+    Returns:
+        str: Descrição textual da fisionomia
+    """
+    if not stratum_descriptions:
+        return 'Sem dados fisionômicos.'
+    
+    # Adicionar informação sobre estratos no início
+    num_estratos = len(stratum_descriptions)
+    estrato_text = 'estrato' if num_estratos == 1 else 'estratos'
+    return f"Vegetação em {num_estratos} {estrato_text}. " + '. '.join(stratum_descriptions) + '.'
+
+
 def generate_formula_description(physiognomic_matrix):
     """
     Gera a descrição textual por extenso da fórmula fisionômica.
@@ -142,48 +257,7 @@ def generate_formula_description(physiognomic_matrix):
     if not physiognomic_matrix:
         return 'Sem dados fisionômicos'
     
-    # Dicionários de descrição
-    forms_desc = {
-        'B': 'folhas sempreverdes',
-        'D': 'folhas decíduas',
-        'E': 'acículas sempreverdes',
-        'N': 'acículas decíduas',
-        'O': 'áfilas',
-        'S': 'semidecíduas',
-        'M': 'mistas',
-        'G': 'graminoides',
-        'H': 'ervas comuns',
-        'L': 'musgos e líquens',
-        'C': 'lianas',
-        'K': 'caule suculento',
-        'T': 'plantas tufadas',
-        'V': 'bambus',
-        'X': 'epífitas',
-        'F': 'folhas especiais'
-    }
-    
-    heights_desc = {
-        '8': 'acima de 35m',
-        '7': 'entre 20-35m',
-        '6': 'entre 10-20m',
-        '5': 'entre 5-10m',
-        '4': 'entre 2-5m',
-        '3': 'entre 0,5-2m',
-        '2': 'entre 0,1-0,5m',
-        '1': 'abaixo de 0,1m'
-    }
-    
-    coverage_desc = {
-        'c': 'contínua (>75%)',
-        'i': 'interrompida (51-75%)',
-        'p': 'porosa (26-50%)',
-        'r': 'rara (6-25%)',
-        'b': 'baixa (1-5%)',
-        'a': 'ausente (<1%)'
-    }
-    
     # Organizar dados por altura (estrato)
-    heights_order = ['8', '7', '6', '5', '4', '3', '2', '1']  # Do mais alto para o mais baixo
     data_by_height = {}
     
     for key, coverage in physiognomic_matrix.items():
@@ -195,58 +269,125 @@ def generate_formula_description(physiognomic_matrix):
                 continue
             
             if height not in data_by_height:
-                data_by_height[height] = []
+                data_by_height[height] = {}
             
-            data_by_height[height].append({
-                'form': form,
-                'coverage': coverage,
-                'form_desc': forms_desc.get(form, form),
-                'coverage_desc': coverage_desc.get(coverage, coverage)
-            })
-    
-    # Contar número de estratos
-    num_estratos = len(data_by_height)
-    estrato_text = 'estrato' if num_estratos == 1 else 'estratos'
+            data_by_height[height][form] = coverage
     
     # Construir descrição por estrato (do mais alto para o mais baixo)
-    stratum_descriptions = []
+    stratum_descriptions = [describe_stratum(height, data_by_height[height])
+                            for height in HEIGHTS_ORDER if height in data_by_height]
     
-    for height in heights_order:
-        if height in data_by_height:
-            height_desc = heights_desc.get(height, height)
-            records = data_by_height[height]
-            
-            # Agrupar por cobertura
-            by_coverage = {}
-            for rec in records:
-                cov = rec['coverage']
-                if cov not in by_coverage:
-                    by_coverage[cov] = []
-                by_coverage[cov].append(rec['form_desc'])
-            
-            # Criar descrições para cada cobertura
-            form_parts = []
-            for cov, forms in by_coverage.items():
-                # Usar função auxiliar para juntar formas com "e"
-                forms_text = _join_with_and(forms)
-                cov_text = coverage_desc.get(cov, cov)
-                # Remover a descrição entre parênteses (ex: "(>75%)")
-                cov_text_clean = cov_text.split(' (')[0]
-                form_parts.append(f"{forms_text} com cobertura {cov_text_clean}")
-            
-            # Articular as diferentes coberturas
-            if len(form_parts) == 1:
-                coverage_desc_text = form_parts[0]
+    return join_stratum_descriptions(stratum_descriptions)
+
+
+class FormulaPreview:
+    """
+    Mantém fórmula e descrição de uma matriz em edição, recalculando apenas
+    o trecho da forma de crescimento e o estrato afetados por cada célula.
+    """
+    
+    def __init__(self, physiognomic_matrix=None):
+        self.reset(physiognomic_matrix)
+    
+    def reset(self, physiognomic_matrix=None):
+        """
+        Reinicia o estado a partir de uma matriz completa.
+        
+        Args:
+            physiognomic_matrix (dict): Matriz inicial (opcional)
+        """
+        self._by_form = {}
+        self._by_height = {}
+        self._form_segments = {}
+        self._stratum_descriptions = {}
+        self._dirty_forms = set()
+        self._dirty_heights = set()
+        self._size = 0
+        
+        for key, value in (physiognomic_matrix or {}).items():
+            self.set_cell(key, value)
+    
+    def set_cell(self, key, value):
+        """
+        Registra o valor de uma célula (ex: 'D4', 'p').
+        
+        Args:
+            key (str): Chave no formato 'FormaN'
+            value (str): Classe de cobertura ou característica foliar
+        """
+        if len(key) < 2:
+            return
+        
+        form, height = key[0], key[1]
+        by_form = self._by_form.setdefault(form, {})
+        if height not in by_form:
+            self._size += 1
+        by_form[height] = value
+        
+        if form != 'F':
+            self._by_height.setdefault(height, {})[form] = value
+            self._dirty_forms.add(form)
+            self._dirty_heights.add(height)
+    
+    def clear_cell(self, key):
+        """
+        Remove uma célula, se presente.
+        
+        Args:
+            key (str): Chave no formato 'FormaN'
+        """
+        if len(key) < 2:
+            return
+        
+        form, height = key[0], key[1]
+        by_form = self._by_form.get(form, {})
+        if height not in by_form:
+            return
+        
+        del by_form[height]
+        self._size -= 1
+        
+        if form != 'F':
+            del self._by_height[height][form]
+            self._dirty_forms.add(form)
+            self._dirty_heights.add(height)
+    
+    def _refresh(self):
+        """Recalcula somente os trechos marcados como alterados."""
+        for form in self._dirty_forms:
+            segment = generate_form_segment(form, self._by_form.get(form))
+            if segment:
+                self._form_segments[form] = segment
             else:
-                # Quando há múltiplas coberturas diferentes, usar vírgula e "e"
-                coverage_desc_text = _join_with_and(form_parts)
-            
-            full_desc = f"Na faixa de altura {height_desc}, predominam {coverage_desc_text}"
-            stratum_descriptions.append(full_desc)
-    
-    if stratum_descriptions:
-        # Adicionar informação sobre estratos no início
-        final_description = f"Vegetação em {num_estratos} {estrato_text}. " + '. '.join(stratum_descriptions) + '.'
-        return final_description
-    else:
-        return 'Sem dados fisionômicos.'
+                self._form_segments.pop(form, None)
+        
+        for height in self._dirty_heights:
+            if self._by_height.get(height):
+                self._stratum_descriptions[height] = describe_stratum(height, self._by_height[height])
+            else:
+                self._stratum_descriptions.pop(height, None)
+        
+        self._dirty_forms.clear()
+        self._dirty_heights.clear()
+    
+    def formula(self):
+        """
+        Returns:
+            str: Fórmula de Küchler da matriz atual
+        """
+        self._refresh()
+        return ''.join(self._form_segments[form]
+                       for form in FORMS_ORDER if form in self._form_segments)
+    
+    def description(self):
+        """
+        Returns:
+            str: Descrição textual da matriz atual
+        """
+        if not self._size:
+            return 'Sem dados fisionômicos'
+        
+        self._refresh()
+        return join_stratum_descriptions([self._stratum_descriptions[height]
+                                          for height in HEIGHTS_ORDER
+                                          if height in self._stratum_descriptions])
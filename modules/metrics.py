@@ -0,0 +1,180 @@
+"""
+Módulo de métricas estruturais das parcelas.
+Calcula, a partir da matriz fisionômica:
+
+    - estratos: número de classes de altura ocupadas
+    - classe_dossel: classe de altura mais alta ocupada (0 = parcela vazia)
+    - cobertura_estrato_1..8: cobertura acumulada de cada classe de altura (%)
+    - cobertura_lenhosa, cobertura_herbacea, cobertura_especial: cobertura
+      de cada grupo de formas de vida (%)
+
+As coberturas usam o ponto médio de cada classe (COVERAGE_MIDPOINTS) e são
+combinadas como camadas independentes que se sobrepõem:
+100 * (1 - produto(1 - cobertura / 100)), o que nunca passa de 100%.
+
+Projetos inteiros são calculados de uma vez sobre o cubo parcelas x formas x
+alturas de columnar.build_cube (requer o NumPy); parcelas avulsas, como nas
+exportações CSV, usam o cálculo em Python puro. Os resultados ficam em cache
+por id da parcela, já que a matriz não muda depois de gravada.
+"""
+
+from modules.kuchler_calculator import COVERAGE_MIDPOINTS, FORMS_ORDER
+from modules.models import HEIGHTS
+from modules.optional import require_numpy
+
+# Grupos de formas de vida (README); 'F' guarda características foliares, sem cobertura
+FORM_GROUPS = {
+    'lenhosa': 'BDENOSM',
+    'herbacea': 'GHL',
+    'especial': 'CKTVX'
+}
+_GROUP_OF_FORM = {form: group for group, forms in FORM_GROUPS.items() for form in forms}
+_HEIGHT_POSITION = {height: position for position, height in enumerate(HEIGHTS)}
+
+# Colunas das métricas, na ordem das exportações
+METRIC_COLUMNS = (['estratos', 'classe_dossel']
+                  + [f"cobertura_estrato_{height}" for height in HEIGHTS]
+                  + [f"cobertura_{group}" for group in FORM_GROUPS])
+
+# Casas decimais das coberturas
+DECIMALS = 1
+
+# Limite de parcelas no cache; ao ser atingido, o cache é esvaziado
+MAX_CACHED = 200_000
+
+_cache = {}
+
+
+def _cover(free):
+    """Cobertura combinada (%) a partir do produto das frações descobertas."""
+    return round(100.0 * (1.0 - free), DECIMALS)
+
+
+def compute_plot_metrics(matrix):
+    """
+    Calcula as métricas de uma matriz fisionômica, sem cache.
+    
+    Args:
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+    
+    Returns:
+        tuple: Valores na ordem de METRIC_COLUMNS
+    """
+    strata_free = [1.0] * len(HEIGHTS)
+    group_free = dict.fromkeys(FORM_GROUPS, 1.0)
+    
+    for key, value in (matrix or {}).items():
+        midpoint = COVERAGE_MIDPOINTS.get(value)
+        group = _GROUP_OF_FORM.get(key[:1])
+        position = _HEIGHT_POSITION.get(key[1:])
+        if midpoint is None or group is None or position is None:
+            continue
+        free = 1.0 - midpoint / 100.0
+        strata_free[position] *= free
+        group_free[group] *= free
+    
+    occupied = [position for position, free in enumerate(strata_free) if free < 1.0]
+    canopy = int(HEIGHTS[occupied[-1]]) if occupied else 0
+    return ((len(occupied), canopy)
+            + tuple(_cover(free) for free in strata_free)
+            + tuple(_cover(group_free[group]) for group in FORM_GROUPS))
+
+
+def plot_metrics(plot):
+    """
+    Métricas de uma parcela, com cache pelo id.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        tuple: Valores na ordem de METRIC_COLUMNS
+    """
+    plot_id = plot.get('id')
+    values = _cache.get(plot_id) if plot_id is not None else None
+    if values is None:
+        values = compute_plot_metrics(plot.get('matriz_fisionomica'))
+        if plot_id is not None:
+            if len(_cache) >= MAX_CACHED:
+                _cache.clear()
+            _cache[plot_id] = values
+    return values
+
+
+def clear_cache():
+    """Esvazia o cache de métricas (ex: após recalcular matrizes fora do app)."""
+    _cache.clear()
+
+
+def cube_metrics(arrays, cache=True):
+    """
+    Calcula as métricas de todas as parcelas de um cubo de uma vez.
+    
+    Args:
+        arrays (dict): Arrays de columnar.build_cube (ou columnar.load_npz)
+        cache (bool): Guarda os resultados no cache por id da parcela
+    
+    Returns:
+        dict: Array NumPy por coluna de METRIC_COLUMNS, uma posição por parcela
+    """
+    np = require_numpy('O cálculo das métricas por cubo')
+    
+    coverage = np.asarray(arrays['coverage'])
+    # Fração coberta por código de valor; características foliares e células vazias valem 0
+    fractions = np.array([COVERAGE_MIDPOINTS.get(str(label), 0.0) / 100.0
+                          for label in arrays['value_labels']])
+    form_labels = [str(form) for form in arrays.get('form_labels', FORMS_ORDER)]
+    in_group = np.array([form in _GROUP_OF_FORM for form in form_labels])
+    
+    free = 1.0 - fractions[coverage]
+    free[:, ~in_group, :] = 1.0
+    strata_free = free.prod(axis=1)
+    
+    occupied = strata_free < 1.0
+    heights = np.array([int(height) for height in HEIGHTS])
+    columns = {
+        'estratos': occupied.sum(axis=1).astype(np.int8),
+        'classe_dossel': (occupied * heights).max(axis=1, initial=0).astype(np.int8)
+    }
+    strata_cover = np.round(100.0 * (1.0 - strata_free), DECIMALS)
+    for position, height in enumerate(HEIGHTS):
+        columns[f"cobertura_estrato_{height}"] = strata_cover[:, position]
+    for group, forms in FORM_GROUPS.items():
+        rows = [form_labels.index(form) for form in forms]
+        group_free = free[:, rows, :].prod(axis=(1, 2))
+        columns[f"cobertura_{group}"] = np.round(100.0 * (1.0 - group_free), DECIMALS)
+    
+    if cache and 'plot_id' in arrays:
+        if len(_cache) + len(coverage) > MAX_CACHED:
+            _cache.clear()
+        table = list(zip(*(columns[name].tolist() for name in METRIC_COLUMNS)))
+        for plot_id, values in zip(arrays['plot_id'].tolist(), table):
+            if plot_id:
+                _cache[plot_id] = values
+    return columns
+
+
+def project_summary(projects):
+    """
+    Médias das métricas por projeto, calculadas sobre o cubo de todos os projetos.
+    
+    Args:
+        projects (list): Projetos no formato de data.json
+    
+    Returns:
+        list: Um dicionário por projeto com 'name', 'plots' e a média de cada métrica
+    """
+    from modules import columnar
+    np = require_numpy('O resumo das métricas por projeto')
+    
+    arrays = columnar.build_cube(projects)
+    columns = cube_metrics(arrays)
+    summaries = []
+    for index, project in enumerate(projects):
+        rows = arrays['project_index'] == index
+        count = int(rows.sum())
+        summary = {'name': project.get('name', ''), 'plots': count}
+        for name in METRIC_COLUMNS:
+            summary[name] = round(float(np.mean(columns[name][rows])), 2) if count else None
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,358 @@
+"""
+Módulo de modelos em memória para projetos e parcelas.
+Representação compacta (com __slots__, strings internadas e matriz em array)
+equivalente ao formato de data.json, com conversão sem perdas nos dois sentidos.
+Permite que telas e rotinas de dados migrem gradualmente dos dicionários.
+"""
+
+import sys
+
+from modules.kuchler_calculator import FORMS_ORDER
+
+# Alturas da matriz fisionômica (mesma ordem de HEIGHT_CLASSES em main.py)
+HEIGHTS = ['1', '2', '3', '4', '5', '6', '7', '8']
+
+# Chaves das 128 células, na ordem forma x altura
+CELL_KEYS = [f"{form}{height}" for form in FORMS_ORDER for height in HEIGHTS]
+CELL_INDEX = {key: index for index, key in enumerate(CELL_KEYS)}
+
+# Valores das células codificados em um byte (0 = célula vazia)
+# Valores desconhecidos são acrescentados ao final da tabela na primeira ocorrência
+CELL_VALUES = [None, 'c', 'i', 'p', 'r', 'b', 'a', 'h', 'w', 'k', 'l', 's']
+_VALUE_CODES = {value: code for code, value in enumerate(CELL_VALUES) if value}
+
+# Marca campos ausentes na parcela original (diferente de um valor None)
+_MISSING = object()
+
+# Campos conhecidos da parcela, na ordem em que finalize_and_save_plot os grava
+PLOT_FIELDS = ('id', 'numero', 'latitude', 'longitude', 'altitude', 'matriz_fisionomica',
+               'data_registro', 'horario_registro', 'registrado_em', 'formula_kuchler', 'descricao_fisionomia')
+
+# Ordens de chaves diferentes da padrão, compartilhadas entre as parcelas que as usam
+_KEY_ORDERS = {}
+
+
+def _intern(value):
+    """Interna strings repetidas entre parcelas (códigos, datas e fórmulas)."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _in_order(result, order):
+    """Reordena um dicionário pela ordem original das chaves; chaves novas vão para o fim."""
+    ordered = {key: result[key] for key in order if key in result}
+    ordered.update((key, value) for key, value in result.items() if key not in ordered)
+    return ordered
+
+
+def encode_value(value):
+    """
+    Converte o valor de uma célula em seu código de um byte.
+    
+    Args:
+        value (str): Classe de cobertura ou característica foliar
+    
+    Returns:
+        int: Código do valor
+    """
+    code = _VALUE_CODES.get(value)
+    if code is None:
+        if len(CELL_VALUES) > 255:
+            raise ValueError(f"Valores de célula distintos demais: {value!r}")
+        code = len(CELL_VALUES)
+        CELL_VALUES.append(_intern(value))
+        _VALUE_CODES[value] = code
+    return code
+
+
+class PhysiognomicMatrix:
+    """
+    Matriz fisionômica 16x8 armazenada em um único bytearray de pares
+    (índice da célula, código do valor), na ordem de preenchimento.
+    
+    A ordem é mantida porque a descrição textual agrupa as formas de cada
+    estrato nessa ordem. Uma parcela típica ocupa poucas das 128 células,
+    então os pares ocupam bem menos memória que um dicionário ou um array denso.
+    """
+    
+    __slots__ = ('cells', 'extra', 'order')
+    
+    def __init__(self):
+        self.cells = bytearray()
+        # Chaves fora da grade 16x8, preservadas como estão (normalmente None)
+        self.extra = None
+        # Ordem de todas as chaves, guardada só quando há chaves fora da grade
+        self.order = None
+    
+    @classmethod
+    def from_dict(cls, matrix_dict):
+        """
+        Cria a matriz a partir do formato de data.json.
+        
+        Args:
+            matrix_dict (dict): Matriz no formato {'D4': 'p', ...}
+        
+        Returns:
+            PhysiognomicMatrix: Matriz compacta
+        """
+        matrix = cls()
+        for key, value in matrix_dict.items():
+            matrix[key] = value
+        return matrix
+    
+    def to_dict(self):
+        """
+        Returns:
+            dict: Matriz no formato de data.json, na ordem de preenchimento
+        """
+        if self.order is not None:
+            return {key: self[key] for key in self.order}
+        cells = self.cells
+        return {CELL_KEYS[cells[i]]: CELL_VALUES[cells[i + 1]] for i in range(0, len(cells), 2)}
+    
+    def iter_codes(self):
+        """
+        Itera sobre as células preenchidas da grade como códigos numéricos.
+        
+        Yields:
+            tuple: (índice da célula em CELL_KEYS, código do valor em CELL_VALUES)
+        """
+        cells = self.cells
+        for i in range(0, len(cells), 2):
+            yield cells[i], cells[i + 1]
+    
+    def _position(self, index):
+        """Retorna a posição do par da célula em cells, ou -1 se vazia."""
+        try:
+            return self.cells[0::2].index(index) * 2
+        except ValueError:
+            return -1
+    
+    def __setitem__(self, key, value):
+        index = CELL_INDEX.get(key)
+        if index is None or value is None:
+            if self.order is None:
+                # A partir da primeira chave fora da grade, a ordem das chaves é guardada
+                self.order = list(self.to_dict())
+            position = -1 if index is None else self._position(index)
+            if position >= 0:
+                # Célula da grade que passa a None: sai dos pares e mantém a posição em order
+                del self.cells[position:position + 2]
+            elif key not in self:
+                self.order.append(_intern(key))
+            if self.extra is None:
+                self.extra = {}
+            self.extra[_intern(key)] = value
+            return
+        code = encode_value(value)
+        position = self._position(index)
+        if position < 0:
+            if self.extra and key in self.extra:
+                # Célula da grade que estava com None: mantém a posição em order
+                del self.extra[key]
+            elif self.order is not None:
+                self.order.append(key)
+            self.cells += bytes((index, code))
+        else:
+            self.cells[position + 1] = code
+    
+    def __getitem__(self, key):
+        index = CELL_INDEX.get(key)
+        position = -1 if index is None else self._position(index)
+        if position < 0:
+            if self.extra and key in self.extra:
+                return self.extra[key]
+            raise KeyError(key)
+        return CELL_VALUES[self.cells[position + 1]]
+    
+    def __delitem__(self, key):
+        index = CELL_INDEX.get(key)
+        position = -1 if index is None else self._position(index)
+        if position < 0:
+            if not self.extra or key not in self.extra:
+                raise KeyError(key)
+            del self.extra[key]
+        else:
+            del self.cells[position:position + 2]
+        if self.order is not None:
+            self.order.remove(key)
+    
+    def __contains__(self, key):
+        index = CELL_INDEX.get(key)
+        if index is not None and self._position(index) >= 0:
+            return True
+        return bool(self.extra) and key in self.extra
+    
+    def __len__(self):
+        return len(self.cells) // 2 + (len(self.extra) if self.extra else 0)
+    
+    def get(self, key, default=None):
+        """Retorna o valor da célula ou default se estiver vazia."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def items(self):
+        """Retorna pares (chave, valor) na ordem de preenchimento."""
+        return self.to_dict().items()
+
+
+class Plot:
+    """Parcela de um projeto, com os mesmos campos de data.json."""
+    
+    __slots__ = PLOT_FIELDS + ('extra', 'order')
+    
+    def __init__(self, id=_MISSING, numero=_MISSING, latitude=_MISSING, longitude=_MISSING, altitude=_MISSING,
+                 matriz_fisionomica=_MISSING, data_registro=_MISSING, horario_registro=_MISSING,
+                 registrado_em=_MISSING, formula_kuchler=_MISSING, descricao_fisionomia=_MISSING):
+        self.id = id
+        self.numero = numero
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        if isinstance(matriz_fisionomica, dict):
+            matriz_fisionomica = PhysiognomicMatrix.from_dict(matriz_fisionomica)
+        self.matriz_fisionomica = matriz_fisionomica
+        self.data_registro = _intern(data_registro)
+        self.horario_registro = _intern(horario_registro)
+        self.registrado_em = registrado_em
+        self.formula_kuchler = _intern(formula_kuchler)
+        self.descricao_fisionomia = _intern(descricao_fisionomia)
+        # Campos não previstos (ex: 'location' de versões antigas)
+        self.extra = None
+        # Ordem original das chaves, se diferente de PLOT_FIELDS seguido dos extras
+        self.order = None
+    
+    @classmethod
+    def from_dict(cls, plot_dict):
+        """
+        Cria a parcela a partir do formato de data.json.
+        
+        Args:
+            plot_dict (dict): Parcela como dicionário
+        
+        Returns:
+            Plot: Parcela compacta
+        """
+        plot = cls(**{field: plot_dict[field] for field in PLOT_FIELDS if field in plot_dict})
+        for key, value in plot_dict.items():
+            if key not in PLOT_FIELDS:
+                if plot.extra is None:
+                    plot.extra = {}
+                plot.extra[_intern(key)] = value
+        
+        # Parcelas de versões anteriores recebem 'id' e 'numero' no fim, por exemplo
+        order = tuple(plot_dict)
+        if order != tuple(field for field in PLOT_FIELDS if field in plot_dict) + tuple(plot.extra or ()):
+            plot.order = _KEY_ORDERS.setdefault(order, order)
+        return plot
+    
+    def to_dict(self):
+        """
+        Returns:
+            dict: Parcela no formato de data.json
+        """
+        result = {}
+        for field in PLOT_FIELDS:
+            value = getattr(self, field)
+            if value is _MISSING:
+                continue
+            if field == 'matriz_fisionomica' and isinstance(value, PhysiognomicMatrix):
+                value = value.to_dict()
+            result[field] = value
+        if self.extra:
+            result.update(self.extra)
+        if self.order is not None:
+            result = _in_order(result, self.order)
+        return result
+    
+    def has(self, field):
+        """Indica se o campo estava presente na parcela."""
+        if field in PLOT_FIELDS:
+            return getattr(self, field) is not _MISSING
+        return bool(self.extra) and field in self.extra
+
+
+class Project:
+    """Projeto de inventário com sua lista de parcelas."""
+    
+    __slots__ = ('id', 'name', 'plots', 'extra', 'order')
+    
+    def __init__(self, name, plots=None, id=None):
+        self.id = id
+        self.name = name
+        self.plots = plots if plots is not None else []
+        # Campos não previstos no projeto
+        self.extra = None
+        # Chaves do projeto original, na ordem (None para projetos criados aqui)
+        self.order = None
+    
+    @classmethod
+    def from_dict(cls, project_dict):
+        """
+        Cria o projeto a partir do formato de data.json.
+        
+        Args:
+            project_dict (dict): Projeto como dicionário
+        
+        Returns:
+            Project: Projeto com parcelas compactas
+        """
+        project = cls(project_dict.get('name'),
+                      [Plot.from_dict(plot) for plot in project_dict.get('plots', [])],
+                      project_dict.get('id'))
+        for key, value in project_dict.items():
+            if key not in ('id', 'name', 'plots'):
+                if project.extra is None:
+                    project.extra = {}
+                project.extra[key] = value
+        project.order = tuple(project_dict)
+        return project
+    
+    def to_dict(self):
+        """
+        Returns:
+            dict: Projeto no formato de data.json
+        """
+        result = {}
+        # Campos ausentes no original continuam ausentes (e não None)
+        if self.order is None or self.name is not None or 'name' in self.order:
+            result['name'] = self.name
+        if self.order is None or self.plots or 'plots' in self.order:
+            result['plots'] = [plot.to_dict() for plot in self.plots]
+        if self.id is not None or (self.order is not None and 'id' in self.order):
+            result['id'] = self.id
+        if self.extra:
+            result.update(self.extra)
+        if self.order is not None:
+            result = _in_order(result, self.order)
+        return result
+
+
+def projects_from_data(data):
+    """
+    Converte os dados carregados de data.json em objetos Project.
+    
+    Args:
+        data (dict): Dados no formato de data.json
+    
+    Returns:
+        list: Lista de Project
+    """
+    return [Project.from_dict(project) for project in data.get('projects', [])]
+
+
+def projects_to_data(projects, data=None):
+    """
+    Converte objetos Project de volta para o formato de data.json.
+    
+    Args:
+        projects (list): Lista de Project
+        data (dict): Dados originais cujas demais chaves (ex: 'settings') são mantidas
+    
+    Returns:
+        dict: Dados no formato de data.json
+    """
+    result = dict(data) if data else {}
+    result['projects'] = [project.to_dict() for project in projects]
+    return result
@@ -0,0 +1,349 @@
+"""
+Módulo de monitoramento de pontos revisitados.
+Liga cada nova parcela às parcelas anteriores feitas no mesmo ponto (dentro
+de um raio de tolerância) e compara as matrizes entre as visitas: mudanças
+de cobertura por célula e diferença das fórmulas de Küchler.
+
+Os pontos (sites) ficam em um hash espacial de células com o tamanho do
+raio, então localizar o ponto de uma parcela consulta só as células vizinhas,
+sem comparar todos os pares de parcelas.
+"""
+
+import bisect
+import math
+import re
+
+from modules.kuchler_calculator import COVERAGE_MIDPOINTS
+from modules.timeindex import plot_timestamp
+
+# Raio padrão, em metros, para considerar duas parcelas o mesmo ponto
+DEFAULT_RADIUS_M = 25.0
+
+# Parcelas do mesmo ponto com menos deste intervalo são da mesma campanha
+# (parcelas vizinhas), não uma revisita
+MIN_INTERVAL_DAYS = 30
+
+EARTH_RADIUS_M = 6371008.8
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+_FORMULA_SEGMENT = re.compile(r'([A-Z])([^A-Z]*)')
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Distância em metros entre dois pontos (fórmula de haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def diff_matrices(before, after):
+    """
+    Compara duas matrizes fisionômicas célula a célula.
+    
+    Args:
+        before (dict): Matriz da visita anterior
+        after (dict): Matriz da visita atual
+    
+    Returns:
+        list: Dicionários com 'celula', 'antes', 'depois' (None = célula vazia)
+              e 'variacao' (diferença de cobertura em pontos percentuais, pelo
+              ponto médio das classes; None para características foliares)
+    """
+    before = before or {}
+    after = after or {}
+    changes = []
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key), after.get(key)
+        if old == new:
+            continue
+        variation = None
+        if key[:1] != 'F':
+            variation = round(COVERAGE_MIDPOINTS.get(new, 0.0) - COVERAGE_MIDPOINTS.get(old, 0.0), 1)
+        changes.append({'celula': key, 'antes': old, 'depois': new, 'variacao': variation})
+    return changes
+
+
+def split_formula(formula):
+    """
+    Divide uma fórmula de Küchler em trechos por forma de vida.
+    
+    Returns:
+        dict: Forma -> trecho sem a letra (ex: 'D4p32iK3p' -> {'D': '4p32i', 'K': '3p'})
+    """
+    return {form: segment for form, segment in _FORMULA_SEGMENT.findall(formula or '')}
+
+
+def diff_formulas(before, after):
+    """
+    Compara duas fórmulas de Küchler por forma de vida.
+    
+    Args:
+        before (str): Fórmula da visita anterior
+        after (str): Fórmula da visita atual
+    
+    Returns:
+        dict: 'incluidas' e 'excluidas' (trechos completos, ex: 'K3p') e
+              'alteradas' (pares de trechos, ex: ('D4p', 'D43p'))
+    """
+    old, new = split_formula(before), split_formula(after)
+    return {
+        'incluidas': [form + new[form] for form in new if form not in old],
+        'excluidas': [form + old[form] for form in old if form not in new],
+        'alteradas': [(form + old[form], form + new[form]) for form in new
+                      if form in old and old[form] != new[form]]
+    }
+
+
+def format_formula_diff(diff):
+    """Texto curto da diferença entre fórmulas (ex: 'D4p → D43p, +K3p, −G1a')."""
+    parts = [f"{old} → {new}" for old, new in diff['alteradas']]
+    parts.extend(f"+{segment}" for segment in diff['incluidas'])
+    parts.extend(f"−{segment}" for segment in diff['excluidas'])
+    return ', '.join(parts) or 'sem mudanças na fórmula'
+
+
+class Site:
+    """Ponto monitorado: local da primeira visita e visitas em ordem cronológica."""
+    
+    __slots__ = ('site_id', 'latitude', 'longitude', 'cell', 'timestamps', 'visits')
+    
+    def __init__(self, site_id, latitude, longitude, cell):
+        self.site_id = site_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.cell = cell
+        # Listas paralelas: timestamps (busca binária) e pares (projeto, parcela)
+        self.timestamps = []
+        self.visits = []
+
+
+class RevisitIndex:
+    """
+    Índice de pontos monitorados das parcelas de um ou mais projetos.
+    
+    Uma parcela pertence ao ponto mais próximo dentro do raio que não tenha
+    outra visita da mesma campanha (MIN_INTERVAL_DAYS); senão, inicia um novo
+    ponto. O local do ponto é o da sua primeira parcela, então o ponto não se
+    desloca com o acúmulo de visitas. Parcelas sem coordenadas ficam fora do índice.
+    """
+    
+    def __init__(self, projects=(), radius_m=DEFAULT_RADIUS_M):
+        """
+        Args:
+            projects (iterable): Projetos no formato de data.json
+            radius_m (float): Raio de tolerância, em metros
+        """
+        self.radius_m = radius_m
+        self._lat_step = radius_m / _METERS_PER_DEGREE
+        self._grid = {}
+        self._sites = {}
+        self._site_of = {}
+        
+        # Ordem cronológica: a primeira visita de cada ponto define o seu local
+        entries = []
+        for project in projects:
+            for plot in project.get('plots', []):
+                timestamp = plot_timestamp(plot)
+                entries.append((float('-inf') if timestamp is None else timestamp, project.get('id'), plot))
+        entries.sort(key=lambda entry: entry[0])
+        for timestamp, project_id, plot in entries:
+            self._add(project_id, plot, timestamp)
+    
+    def __len__(self):
+        return len(self._site_of)
+    
+    def __contains__(self, plot_id):
+        return plot_id in self._site_of
+    
+    @property
+    def num_sites(self):
+        """Número de pontos distintos."""
+        return len(self._sites)
+    
+    # ==================== HASH ESPACIAL ====================
+    
+    def _lon_step(self, row):
+        """Largura, em graus de longitude, das células de uma faixa de latitude."""
+        latitude = min(89.9, abs((row + 0.5) * self._lat_step))
+        return self._lat_step / math.cos(math.radians(latitude))
+    
+    def _cell(self, latitude, longitude):
+        row = math.floor(latitude / self._lat_step)
+        return row, math.floor(longitude / self._lon_step(row))
+    
+    def _nearby_sites(self, latitude, longitude):
+        """Pontos das células que podem estar a menos de um raio do local."""
+        row = math.floor(latitude / self._lat_step)
+        # Raio em graus de longitude, com folga para a latitude mais distante do equador
+        reach = self._lat_step / math.cos(math.radians(min(89.9, abs(latitude) + self._lat_step)))
+        for neighbor_row in (row - 1, row, row + 1):
+            # Cada faixa de latitude tem células de largura própria
+            lon_step = self._lon_step(neighbor_row)
+            first = math.floor((longitude - reach) / lon_step)
+            last = math.floor((longitude + reach) / lon_step)
+            for column in range(first, last + 1):
+                yield from self._grid.get((neighbor_row, column), ())
+    
+    # ==================== INCLUSÃO E EXCLUSÃO ====================
+    
+    def add(self, project_id, plot):
+        """
+        Inclui uma parcela, ligando-a ao seu ponto.
+        
+        Args:
+            project_id (str): Projeto da parcela
+            plot (dict): Parcela com 'id', 'latitude' e 'longitude'
+        
+        Returns:
+            str: Id do ponto, ou None se a parcela ficou fora do índice
+        """
+        timestamp = plot_timestamp(plot)
+        return self._add(project_id, plot, float('-inf') if timestamp is None else timestamp)
+    
+    def _add(self, project_id, plot, timestamp):
+        plot_id = plot.get('id')
+        latitude, longitude = plot.get('latitude'), plot.get('longitude')
+        if plot_id is None or plot_id in self._site_of or latitude is None or longitude is None:
+            return None
+        
+        min_interval = MIN_INTERVAL_DAYS * 86400
+        best, best_distance = None, self.radius_m
+        for site in self._nearby_sites(latitude, longitude):
+            distance = distance_m(latitude, longitude, site.latitude, site.longitude)
+            if distance > best_distance:
+                continue
+            # Outra parcela da mesma campanha no ponto: parcela vizinha, não revisita
+            position = bisect.bisect_left(site.timestamps, timestamp - min_interval)
+            if position < len(site.timestamps) and site.timestamps[position] < timestamp + min_interval:
+                continue
+            best, best_distance = site, distance
+        
+        if best is None:
+            cell = self._cell(latitude, longitude)
+            best = Site(plot_id, latitude, longitude, cell)
+            self._sites[plot_id] = best
+            self._grid.setdefault(cell, []).append(best)
+        
+        position = bisect.bisect_right(best.timestamps, timestamp)
+        best.timestamps.insert(position, timestamp)
+        best.visits.insert(position, (project_id, plot))
+        self._site_of[plot_id] = best
+        return best.site_id
+    
+    def remove(self, plot_id):
+        """Retira uma parcela do índice; o ponto é removido com a sua última visita."""
+        site = self._site_of.pop(plot_id, None)
+        if site is None:
+            return
+        position = next(index for index, (_, plot) in enumerate(site.visits) if plot.get('id') == plot_id)
+        del site.timestamps[position]
+        del site.visits[position]
+        if not site.visits:
+            del self._sites[site.site_id]
+            self._grid[site.cell].remove(site)
+            if not self._grid[site.cell]:
+                del self._grid[site.cell]
+    
+    # ==================== CONSULTAS ====================
+    
+    def visits(self, plot_id):
+        """
+        Visitas do ponto de uma parcela, em ordem cronológica.
+        
+        Returns:
+            list: Pares (id do projeto, parcela); vazia se a parcela não está no índice
+        """
+        site = self._site_of.get(plot_id)
+        return list(site.visits) if site is not None else []
+    
+    def visit_number(self, plot_id):
+        """
+        Posição da parcela entre as visitas do seu ponto.
+        
+        Returns:
+            tuple: (número da visita a partir de 1, total de visitas), ou None
+        """
+        site = self._site_of.get(plot_id)
+        if site is None:
+            return None
+        for number, (_, plot) in enumerate(site.visits, 1):
+            if plot.get('id') == plot_id:
+                return number, len(site.visits)
+    
+    def previous(self, plot_id):
+        """Parcela da visita anterior no mesmo ponto, ou None."""
+        position = self.visit_number(plot_id)
+        if position is None or position[0] == 1:
+            return None
+        return self._site_of[plot_id].visits[position[0] - 2][1]
+    
+    def compare(self, plot_id):
+        """
+        Compara uma parcela com a visita anterior do mesmo ponto.
+        
+        Returns:
+            dict: 'anterior' (parcela), 'celulas' (diff_matrices) e 'formula'
+                  (diff_formulas), ou None se não houver visita anterior
+        """
+        previous = self.previous(plot_id)
+        if previous is None:
+            return None
+        plot = next(plot for _, plot in self._site_of[plot_id].visits if plot.get('id') == plot_id)
+        return {
+            'anterior': previous,
+            'celulas': diff_matrices(previous.get('matriz_fisionomica'), plot.get('matriz_fisionomica')),
+            'formula': diff_formulas(previous.get('formula_kuchler'), plot.get('formula_kuchler'))
+        }
+    
+    def describe(self, plot_id):
+        """
+        Texto curto sobre as visitas do ponto de uma parcela (para o card da parcela).
+        
+        Returns:
+            str: Ex: 'Ponto monitorado: visita 2 de 3 | desde 01/03/2024: 4 células
+                 alteradas, D4p → D43p', ou None se o ponto tiver uma única visita
+        """
+        position = self.visit_number(plot_id)
+        if position is None or position[1] < 2:
+            return None
+        text = f"Ponto monitorado: visita {position[0]} de {position[1]}"
+        comparison = self.compare(plot_id)
+        if comparison is not None:
+            since = comparison['anterior'].get('data_registro') or 'a visita anterior'
+            text += (f" | desde {since}: {len(comparison['celulas'])} célula(s) alterada(s), "
+                     f"{format_formula_diff(comparison['formula'])}")
+        return text
+    
+    def time_series(self, min_visits=2):
+        """
+        Séries temporais dos pontos com revisitas.
+        
+        Args:
+            min_visits (int): Número mínimo de visitas do ponto
+        
+        Returns:
+            list: Um dicionário por ponto com 'site', 'latitude', 'longitude' e
+                  'visitas' (projeto, parcela, número, data, fórmula e métricas)
+        """
+        from modules.metrics import METRIC_COLUMNS, plot_metrics
+        
+        series = []
+        for site in self._sites.values():
+            if len(site.visits) < min_visits:
+                continue
+            visits = []
+            for project_id, plot in site.visits:
+                visit = {
+                    'projeto': project_id,
+                    'parcela': plot.get('id'),
+                    'numero': plot.get('numero'),
+                    'data_registro': plot.get('data_registro'),
+                    'formula_kuchler': plot.get('formula_kuchler', '')
+                }
+                visit.update(zip(METRIC_COLUMNS, plot_metrics(plot)))
+                visits.append(visit)
+            series.append({'site': site.site_id, 'latitude': site.latitude,
+                           'longitude': site.longitude, 'visitas': visits})
+        return series
@@ -0,0 +1,40 @@
+"""
+Módulo de dependências opcionais.
+Importa sob demanda as bibliotecas que não são necessárias para o app
+(NumPy para análise, Pillow para imagens), com mensagem clara de instalação
+se não estiverem disponíveis.
+"""
+
+
+def require_numpy(feature='Este recurso'):
+    """
+    Importa o NumPy, com mensagem clara se não estiver instalado.
+    
+    Args:
+        feature (str): Recurso que precisa do NumPy, citado na mensagem de erro
+    
+    Returns:
+        module: numpy
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(f'{feature} requer o NumPy: pip install numpy') from None
+    return numpy
+
+
+def require_pillow(feature='Este recurso'):
+    """
+    Importa o Pillow, com mensagem clara se não estiver instalado.
+    
+    Args:
+        feature (str): Recurso que precisa do Pillow, citado na mensagem de erro
+    
+    Returns:
+        tuple: (PIL.Image, PIL.ImageDraw)
+    """
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        raise ImportError(f'{feature} requer o Pillow: pip install pillow') from None
+    return Image, ImageDraw
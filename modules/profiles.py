@@ -0,0 +1,253 @@
+"""
+Módulo de diagramas de perfil vertical das parcelas.
+Desenha com o Pillow um esquema da estrutura vertical da vegetação: os 8
+estratos de altura (8 no topo) e, em cada um, uma barra por forma de vida
+presente, com comprimento proporcional à cobertura (ponto médio da classe) e
+cor pelo grupo da forma (lenhosa, herbácea ou especial).
+
+As miniaturas ficam em um cache em disco com tamanho máximo, nomeadas pelo
+hash da matriz (parcelas com a mesma matriz compartilham a imagem); ao
+passar do limite, as menos usadas recentemente são apagadas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from modules.kuchler_calculator import COVERAGE_MIDPOINTS, FORMS_ORDER
+from modules.metrics import FORM_GROUPS
+from modules.models import HEIGHTS
+from modules.optional import require_pillow
+from modules.report import matrix_hash
+
+# Tamanho das miniaturas e margem dos rótulos das alturas, em pixels
+PROFILE_WIDTH = 240
+PROFILE_HEIGHT = 160
+LABEL_MARGIN = 16
+
+# Tamanho máximo padrão do cache em disco
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+# Cores RGBA por grupo de formas de vida
+GROUP_COLORS = {
+    'lenhosa': (46, 125, 50, 255),
+    'herbacea': (175, 180, 43, 255),
+    'especial': (123, 31, 162, 255)
+}
+BACKGROUND_COLOR = (255, 255, 255, 255)
+GUIDE_COLOR = (224, 224, 224, 255)
+TEXT_COLOR = (66, 66, 66, 255)
+
+_GROUP_OF_FORM = {form: group for group, forms in FORM_GROUPS.items() for form in forms}
+_FORM_POSITION = {form: position for position, form in enumerate(FORMS_ORDER)}
+_frames = {}
+
+
+def _row_height(height):
+    return (height - 4) / len(HEIGHTS)
+
+
+def _frame(width, height):
+    """Fundo com os rótulos e as linhas de cada estrato, desenhado uma vez por tamanho."""
+    frame = _frames.get((width, height))
+    if frame is not None:
+        return frame
+    
+    Image, ImageDraw = require_pillow('O diagrama de perfil')
+    frame = Image.new('RGBA', (width, height), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(frame)
+    row_height = _row_height(height)
+    for row, height_class in enumerate(reversed(HEIGHTS)):
+        top = 2 + row * row_height
+        draw.line([(LABEL_MARGIN, top), (width - 1, top)], fill=GUIDE_COLOR)
+        left, text_top, right, bottom = draw.textbbox((0, 0), height_class)
+        draw.text(((LABEL_MARGIN - (right - left)) / 2, top + (row_height - (bottom - text_top)) / 2 - text_top),
+                  height_class, fill=TEXT_COLOR)
+    # Linha do solo
+    ground = 2 + len(HEIGHTS) * row_height
+    draw.line([(LABEL_MARGIN, ground), (width - 1, ground)], fill=TEXT_COLOR)
+    _frames[(width, height)] = frame
+    return frame
+
+
+def profile_image(matrix, width=PROFILE_WIDTH, height=PROFILE_HEIGHT):
+    """
+    Desenha o perfil vertical de uma matriz fisionômica.
+    
+    Args:
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+        width, height (int): Tamanho da imagem em pixels
+    
+    Returns:
+        PIL.Image.Image: Imagem RGBA
+    """
+    _, ImageDraw = require_pillow('O diagrama de perfil')
+    
+    # Formas de cada estrato, na ordem de FORMS_ORDER ('F' não tem cobertura)
+    strata = {height_class: [] for height_class in HEIGHTS}
+    for key, value in (matrix or {}).items():
+        midpoint = COVERAGE_MIDPOINTS.get(value)
+        form, height_class = key[:1], key[1:]
+        if midpoint is not None and form in _GROUP_OF_FORM and height_class in strata:
+            strata[height_class].append((_FORM_POSITION[form], form, midpoint))
+    
+    image = _frame(width, height).copy()
+    draw = ImageDraw.Draw(image)
+    row_height = _row_height(height)
+    bar_space = width - LABEL_MARGIN - 4
+    for row, height_class in enumerate(reversed(HEIGHTS)):
+        forms = sorted(strata[height_class])
+        if not forms:
+            continue
+        top = 2 + row * row_height + 1
+        slot = (row_height - 2) / len(forms)
+        for position, (_, form, midpoint) in enumerate(forms):
+            y0 = top + position * slot
+            y1 = max(y0 + 1, y0 + slot - 1)
+            x1 = LABEL_MARGIN + 2 + max(2, bar_space * midpoint / 100)
+            draw.rectangle([LABEL_MARGIN + 2, y0, x1, y1], fill=GROUP_COLORS[_GROUP_OF_FORM[form]])
+            # Letra da forma, quando a barra comporta
+            left, text_top, right, bottom = draw.textbbox((0, 0), form)
+            if y1 - y0 >= bottom - text_top and x1 - LABEL_MARGIN - 2 >= (right - left) + 4:
+                draw.text((LABEL_MARGIN + 4, y0 + (y1 - y0 - (bottom - text_top)) / 2 - text_top),
+                          form, fill=BACKGROUND_COLOR)
+    return image
+
+
+class ThumbnailCache:
+    """
+    Cache em disco de miniaturas PNG com tamanho máximo e descarte LRU.
+    
+    A ordem de uso fica em memória e na data de modificação dos arquivos
+    (atualizada a cada acesso), então sobrevive ao reinício do app. Pode ser
+    usado por várias threads.
+    """
+    
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory (str): Pasta das miniaturas
+            max_bytes (int): Tamanho máximo somado dos arquivos
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Nome -> tamanho, do menos para o mais recentemente usado
+        self._entries = OrderedDict()
+        self._bytes = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._bytes += size
+        self._evict()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def total_bytes(self):
+        return self._bytes
+    
+    def path(self, key):
+        """Caminho do arquivo de uma chave (exista ou não)."""
+        return os.path.join(self.directory, f"{key}.png")
+    
+    def get(self, key):
+        """
+        Caminho da miniatura, marcando-a como usada agora.
+        
+        Returns:
+            str: Caminho do arquivo, ou None se não estiver no cache
+        """
+        name = f"{key}.png"
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Apagado por fora do app
+            with self._lock:
+                self._bytes -= self._entries.pop(name, 0)
+            return None
+        return path
+    
+    def put(self, key, image):
+        """
+        Grava uma miniatura e descarta as menos usadas se passar do limite.
+        
+        Args:
+            key (str): Chave (hash da matriz)
+            image (PIL.Image.Image): Imagem a gravar
+        
+        Returns:
+            str: Caminho do arquivo
+        """
+        name = f"{key}.png"
+        path = self.path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(temp_path, format='PNG', compress_level=1)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict(keep=name)
+        return path
+    
+    def _evict(self, keep=None):
+        """Apaga as miniaturas menos usadas até caber no limite (chamada com o lock)."""
+        while self._bytes > self.max_bytes and self._entries:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            del self._entries[name]
+            self._bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+    
+    def clear(self):
+        """Apaga todas as miniaturas."""
+        with self._lock:
+            for name in self._entries:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+
+
+def profile_key(matrix, width=PROFILE_WIDTH, height=PROFILE_HEIGHT):
+    """Chave da miniatura: hash da matriz e tamanho da imagem."""
+    return f"perfil_{matrix_hash(matrix)}_{width}x{height}"
+
+
+def cached_profile(cache, matrix, width=PROFILE_WIDTH, height=PROFILE_HEIGHT):
+    """
+    Caminho da miniatura do perfil, desenhando-a se não estiver no cache.
+    
+    Args:
+        cache (ThumbnailCache): Cache em disco
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+        width, height (int): Tamanho da imagem em pixels
+    
+    Returns:
+        str: Caminho do arquivo PNG
+    """
+    key = profile_key(matrix, width, height)
+    path = cache.get(key)
+    if path is None:
+        path = cache.put(key, profile_image(matrix, width, height))
+    return path
@@ -0,0 +1,215 @@
+"""
+Módulo de suficiência amostral por rarefação.
+Calcula a curva de rarefação dos tipos fisionômicos de um projeto: o número
+esperado de tipos distintos em n parcelas sorteadas entre as N registradas
+(fórmula exata de Hurlbert). As faixas de confiança vêm do erro padrão de
+réplicas bootstrap (N parcelas sorteadas com reposição, com a curva exata de
+cada réplica), distribuídas em um pool de processos. As faixas ficam em
+torno da curva observada: a média das réplicas é enviesada para baixo, já
+que cada réplica perde os tipos raros que não foram sorteados.
+
+As réplicas são divididas em blocos de tamanho fixo, cada um com a sua
+semente derivada de uma única semente (numpy.random.SeedSequence), então o
+resultado é o mesmo para qualquer número de processos.
+
+Requer o NumPy, instalado com:
+    pip install kuchlerapp[analysis]
+"""
+
+from statistics import NormalDist
+
+from modules.kuchler_calculator import generate_kuchler_formula
+from modules.optional import require_numpy
+
+# Réplicas por bloco enviado ao pool (fixo: não depende do número de processos)
+CHUNK_REPLICATES = 100
+
+# Pontos da curva (tamanhos de amostra) quando não informados
+CURVE_POINTS = 50
+
+# Nível das faixas de confiança
+CONFIDENCE = 0.95
+
+# Cobertura amostral a partir da qual a amostragem é considerada suficiente
+ADEQUATE_COVERAGE = 0.9
+
+
+def plot_type(plot, kind='formula'):
+    """
+    Tipo fisionômico de uma parcela.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+        kind (str): 'formula' (fórmula de Küchler) ou 'forms' (conjunto de
+            formas de vida presentes, agrupamento mais grosseiro)
+    
+    Returns:
+        str: Identificador do tipo
+    """
+    matrix = plot.get('matriz_fisionomica') or {}
+    if kind == 'forms':
+        return ''.join(sorted({key[0] for key, value in matrix.items() if value and key[0] != 'F'}))
+    return plot.get('formula_kuchler') or generate_kuchler_formula(matrix)
+
+
+def type_codes(plots, kind='formula'):
+    """
+    Códigos inteiros dos tipos das parcelas.
+    
+    Returns:
+        tuple: (array com o código de cada parcela, lista dos tipos por código)
+    """
+    np = require_numpy('A curva de rarefação')
+    labels = {}
+    codes = [labels.setdefault(plot_type(plot, kind), len(labels)) for plot in plots]
+    return np.array(codes, dtype=np.int64), list(labels)
+
+
+def _log_factorials(n):
+    np = require_numpy('A curva de rarefação')
+    return np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, n + 1)))))
+
+
+def expected_types(counts, sizes, log_factorials=None):
+    """
+    Número esperado de tipos distintos em amostras sem reposição (Hurlbert).
+    
+    E[S_n] = soma sobre os tipos de 1 - C(N - N_i, n) / C(N, n)
+    
+    Args:
+        counts (array): Número de parcelas de cada tipo (N_i)
+        sizes (array): Tamanhos de amostra n (1 a N)
+        log_factorials (array): log(k!) para k de 0 a N, opcional (reaproveitado entre réplicas)
+    
+    Returns:
+        array: Valor esperado para cada tamanho de amostra
+    """
+    np = require_numpy('A curva de rarefação')
+    counts = np.asarray(counts)
+    counts = counts[counts > 0]
+    sizes = np.asarray(sizes)
+    total = int(counts.sum())
+    lf = _log_factorials(total) if log_factorials is None else log_factorials
+    
+    # C(a, n) / C(N, n) = a! (N - n)! / ((a - n)! N!), com a = N - N_i
+    others = (total - counts)[:, None]
+    valid = others >= sizes[None, :]
+    remaining = np.where(valid, others - sizes[None, :], 0)
+    log_ratio = lf[others] - lf[remaining] + lf[total - sizes][None, :] - lf[total]
+    absent = np.where(valid, np.exp(np.minimum(log_ratio, 0.0)), 0.0)
+    return (1.0 - absent).sum(axis=0)
+
+
+def _bootstrap_chunk(codes, num_types, sizes, seed, replicates):
+    """
+    Curvas de um bloco de réplicas bootstrap (executada em um processo do pool).
+    
+    Returns:
+        array: Uma linha por réplica, uma coluna por tamanho de amostra
+    """
+    np = require_numpy('A curva de rarefação')
+    rng = np.random.default_rng(seed)
+    total = len(codes)
+    lf = _log_factorials(total)
+    curves = np.empty((replicates, len(sizes)))
+    for replicate in range(replicates):
+        sample = codes[rng.integers(0, total, total)]
+        curves[replicate] = expected_types(np.bincount(sample, minlength=num_types), sizes, lf)
+    return curves
+
+
+def default_sizes(total, points=CURVE_POINTS):
+    """Tamanhos de amostra igualmente espaçados de 1 a total (inclusive)."""
+    np = require_numpy('A curva de rarefação')
+    return np.unique(np.linspace(1, total, min(points, total)).round().astype(np.int64))
+
+
+def rarefaction(plots, replicates=1000, seed=0, sizes=None, kind='formula', workers=None,
+                use_processes=True, progress=None, cancelled=None):
+    """
+    Curva de rarefação dos tipos fisionômicos com faixas de confiança bootstrap.
+    
+    Args:
+        plots (list): Parcelas do projeto
+        replicates (int): Número de réplicas bootstrap (0 = sem faixas; com faixas,
+                          pelo menos 2 para o erro padrão)
+        seed (int): Semente das réplicas (mesmo resultado a cada execução)
+        sizes (list): Tamanhos de amostra da curva (padrão: default_sizes)
+        kind (str): Tipo fisionômico: 'formula' ou 'forms' (ver plot_type)
+        workers (int): Número de processos ou threads (padrão: número de CPUs)
+        use_processes (bool): Usa processos (False usa threads, ex: em Android)
+        progress (callable): Chamada como progress(réplicas_concluídas, total)
+        cancelled (callable): Retorna True para interromper o cálculo
+    
+    Returns:
+        dict: Curva ('sizes', 'expected', 'lower', 'upper') e indicadores de
+              suficiência, ou None se o cálculo foi cancelado
+    
+    Raises:
+        ValueError: replicates negativo ou igual a 1
+    """
+    if replicates < 0 or replicates == 1:
+        raise ValueError(f"Réplicas bootstrap: use 0 (sem faixas) ou pelo menos 2, não {replicates}")
+    
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    np = require_numpy('A curva de rarefação')
+    
+    codes, labels = type_codes(plots, kind)
+    total = len(codes)
+    if not total:
+        return {'plots': 0, 'types': 0, 'sizes': [], 'expected': [], 'lower': [], 'upper': [],
+                'coverage': None, 'chao1': None, 'new_type_chance': None, 'adequate': False,
+                'replicates': 0, 'seed': seed, 'kind': kind}
+    
+    sizes = default_sizes(total) if sizes is None else np.asarray(sorted(set(sizes)), dtype=np.int64)
+    sizes = sizes[(sizes >= 1) & (sizes <= total)]
+    counts = np.bincount(codes, minlength=len(labels))
+    expected = expected_types(counts, sizes)
+    
+    lower = upper = None
+    if replicates > 0:
+        chunks = [min(CHUNK_REPLICATES, replicates - start) for start in range(0, replicates, CHUNK_REPLICATES)]
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        curves = [None] * len(chunks)
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=workers) as pool:
+            futures = {pool.submit(_bootstrap_chunk, codes, len(labels), sizes, chunk_seed, size): position
+                       for position, (chunk_seed, size) in enumerate(zip(seeds, chunks))}
+            done = 0
+            for future in as_completed(futures):
+                if cancelled and cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    return None
+                # Blocos guardados pela posição: a ordem de conclusão não altera o resultado
+                curves[futures[future]] = future.result()
+                done += len(curves[futures[future]])
+                if progress:
+                    progress(done, replicates)
+        # Faixa = curva observada ± z * erro padrão bootstrap
+        spread = NormalDist().inv_cdf(0.5 + CONFIDENCE / 2) * np.vstack(curves).std(axis=0, ddof=1)
+        lower = np.maximum(expected - spread, 0.0)
+        upper = expected + spread
+    
+    # Tipos com uma e duas parcelas: cobertura amostral (Good-Turing) e estimador Chao1
+    singletons = int((counts == 1).sum())
+    doubletons = int((counts == 2).sum())
+    coverage = 1.0 - singletons / total
+    chao1 = len(labels) + singletons * (singletons - 1) / (2 * (doubletons + 1))
+    
+    return {
+        'plots': total,
+        'types': len(labels),
+        'sizes': sizes.tolist(),
+        'expected': np.round(expected, 3).tolist(),
+        'lower': np.round(lower, 3).tolist() if lower is not None else None,
+        'upper': np.round(upper, 3).tolist() if upper is not None else None,
+        'coverage': round(coverage, 4),
+        'chao1': round(chao1, 2),
+        # Chance de a próxima parcela ser de um tipo ainda não registrado
+        'new_type_chance': round(singletons / total, 4),
+        'adequate': coverage >= ADEQUATE_COVERAGE,
+        'replicates': replicates,
+        'seed': seed,
+        'kind': kind
+    }
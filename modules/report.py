@@ -0,0 +1,432 @@
+"""
+Módulo de relatórios de projeto em HTML (e PDF opcional).
+O relatório traz a tabela das parcelas (fórmula, descrição, métricas e a
+imagem da matriz), a frequência das fórmulas e das células e o mapa de
+frequência do projeto.
+
+Os modelos são compilados uma vez e ficam em cache (recompilados só se o
+arquivo do modelo mudar). As imagens das matrizes são geradas com o Pillow em
+paralelo e gravadas em uma pasta de imagens compartilhada, com o nome dado
+pelo hash da matriz: ao gerar de novo o relatório, só as parcelas novas ou
+alteradas têm a imagem desenhada.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime
+
+from modules import heatmap
+from modules.kuchler_calculator import FORMS_DESC, FORMS_ORDER, HEIGHTS_DESC
+from modules.metrics import plot_metrics
+from modules.models import HEIGHTS
+from modules.optional import require_pillow
+
+# Pasta das imagens, dentro da pasta do relatório
+IMAGES_DIR = 'imagens'
+
+# Tamanho da célula nas imagens das matrizes e margem dos rótulos, em pixels
+CELL_SIZE = 14
+LABEL_MARGIN = 16
+
+# Células mais frequentes listadas no relatório
+TOP_CELLS = 20
+
+_PLACEHOLDER = re.compile(r'\$\{([a-z_]+)\}')
+
+TEMPLATES = {
+    'report': """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>${title}</title>
+<style>
+body { font-family: sans-serif; margin: 24px; color: #212121; }
+h1 { margin-bottom: 4px; }
+table { border-collapse: collapse; margin: 12px 0 24px; }
+th, td { border: 1px solid #bdbdbd; padding: 4px 8px; text-align: left; vertical-align: top; font-size: 13px; }
+th { background: #e8f5e9; }
+.meta { color: #616161; }
+img { image-rendering: pixelated; }
+</style>
+</head>
+<body>
+<h1>${title}</h1>
+<p class="meta">${plots} parcela(s) | Gerado em ${generated_at}</p>
+<h2>Resumo</h2>
+<table>
+<tr><th>Estratos (média)</th><td>${mean_strata}</td></tr>
+<tr><th>Classe do dossel (média)</th><td>${mean_canopy}</td></tr>
+<tr><th>Fórmulas distintas</th><td>${num_formulas}</td></tr>
+</table>
+<h2>Frequência das Células</h2>
+<p><img src="${frequency_image}" alt="Mapa de frequência das células"></p>
+<table>
+<tr><th>Célula</th><th>Forma de vida</th><th>Altura</th><th>Parcelas</th></tr>
+${cell_rows_html}
+</table>
+<h2>Frequência das Fórmulas</h2>
+<table>
+<tr><th>Fórmula</th><th>Parcelas</th><th>%</th></tr>
+${formula_rows_html}
+</table>
+<h2>Parcelas</h2>
+<table>
+<tr><th>Parcela</th><th>Data</th><th>Latitude</th><th>Longitude</th><th>Altitude</th><th>Fórmula</th><th>Estratos</th><th>Dossel</th><th>Descrição</th><th>Matriz</th></tr>
+${plot_rows_html}
+</table>
+</body>
+</html>
+""",
+    'cell_row': "<tr><td>${cell}</td><td>${form}</td><td>${height}</td><td>${percent}</td></tr>\n",
+    'formula_row': "<tr><td>${formula}</td><td>${count}</td><td>${percent}</td></tr>\n",
+    'plot_row': ("<tr><td>${number}</td><td>${date}</td><td>${latitude}</td><td>${longitude}</td>"
+                 "<td>${altitude}</td><td>${formula}</td><td>${strata}</td><td>${canopy}</td>"
+                 "<td>${description}</td><td><img src=\"${image}\" alt=\"Matriz da parcela ${number}\"></td></tr>\n")
+}
+
+_compiled = {}
+_frames = {}
+
+
+class CompiledTemplate:
+    """
+    Modelo com marcadores ${nome}, dividido uma vez em trechos fixos e nomes.
+    
+    Os valores são escapados para HTML, exceto os marcadores terminados em
+    '_html', que recebem fragmentos já montados.
+    """
+    
+    __slots__ = ('parts', 'names')
+    
+    def __init__(self, source):
+        pieces = _PLACEHOLDER.split(source)
+        # Posições pares: texto fixo; ímpares: nomes dos marcadores
+        self.parts = pieces[0::2]
+        self.names = pieces[1::2]
+    
+    def render(self, **values):
+        """
+        Preenche o modelo.
+        
+        Returns:
+            str: Texto com os marcadores substituídos
+        """
+        output = [self.parts[0]]
+        for name, part in zip(self.names, self.parts[1:]):
+            value = values[name]
+            output.append(value if name.endswith('_html') else html.escape(str(value)))
+            output.append(part)
+        return ''.join(output)
+
+
+def get_template(name, template_dir=None):
+    """
+    Modelo compilado, em cache.
+    
+    Args:
+        name (str): Nome do modelo (chave de TEMPLATES)
+        template_dir (str): Pasta com modelos personalizados ('<nome>.html'), opcional
+    
+    Returns:
+        CompiledTemplate: Modelo pronto para render
+    """
+    path = os.path.join(template_dir, f"{name}.html") if template_dir else None
+    if path and os.path.exists(path):
+        # A data de modificação na chave recompila o modelo quando o arquivo muda
+        key = (path, os.path.getmtime(path))
+    else:
+        path = None
+        key = (name, None)
+    
+    template = _compiled.get(key)
+    if template is None:
+        if path:
+            with open(path, 'r', encoding='utf-8') as file:
+                source = file.read()
+        else:
+            source = TEMPLATES[name]
+        template = _compiled[key] = CompiledTemplate(source)
+    return template
+
+
+def matrix_hash(matrix):
+    """
+    Hash do conteúdo de uma matriz fisionômica (independe da ordem das células).
+    
+    Args:
+        matrix (dict): Matriz no formato {'D4': 'p', ...}
+    
+    Returns:
+        str: 16 caracteres hexadecimais
+    """
+    content = json.dumps(sorted((matrix or {}).items()), separators=(',', ':'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+def _label_frame(cell_size):
+    """Fundo com os rótulos das formas e das alturas, desenhado uma vez por tamanho de célula."""
+    frame = _frames.get(cell_size)
+    if frame is not None:
+        return frame
+    
+    Image, ImageDraw = require_pillow('O relatório com imagens')
+    width, height = heatmap.texture_size(cell_size)
+    frame = Image.new('RGBA', (width + LABEL_MARGIN, height + LABEL_MARGIN), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(frame)
+    text_color = (66, 66, 66, 255)
+    
+    def draw_centered(center_x, center_y, text):
+        left, top, right, bottom = draw.textbbox((0, 0), text)
+        draw.text((center_x - (right - left) / 2, center_y - (bottom - top) / 2 - top), text, fill=text_color)
+    
+    for column, form in enumerate(FORMS_ORDER):
+        draw_centered(LABEL_MARGIN + (column + 0.5) * cell_size - 0.5, LABEL_MARGIN / 2, form)
+    for row, height_class in enumerate(HEIGHTS):
+        draw_centered(LABEL_MARGIN / 2, LABEL_MARGIN + height - (row + 0.5) * cell_size - 0.5, height_class)
+    _frames[cell_size] = frame
+    return frame
+
+
+def grid_image(colors, cell_size=CELL_SIZE):
+    """
+    Desenha uma grade de cores com os rótulos das formas e das alturas.
+    
+    Args:
+        colors (list): ROWS listas de COLUMNS cores RGBA, da altura 1 para a 8
+        cell_size (int): Lado da célula em pixels
+    
+    Returns:
+        PIL.Image.Image: Imagem RGBA, altura 8 no topo
+    """
+    Image, _ = require_pillow('O relatório com imagens')
+    
+    width, height = heatmap.texture_size(cell_size)
+    # Imagens começam pela linha de cima: as alturas vão da 8 para a 1
+    grid = Image.frombytes('RGBA', (width, height), heatmap.render(colors[::-1], cell_size))
+    image = _label_frame(cell_size).copy()
+    image.alpha_composite(grid, (LABEL_MARGIN, LABEL_MARGIN))
+    return image
+
+
+def matrix_image(matrix, cell_size=CELL_SIZE):
+    """Imagem da matriz fisionômica de uma parcela (cores de heatmap)."""
+    return grid_image(heatmap.matrix_colors(matrix), cell_size)
+
+
+def frequency_image(frequencies, cell_size=CELL_SIZE):
+    """Imagem do mapa de frequência das células de um projeto."""
+    colors = [[heatmap.EMPTY_COLOR] * heatmap.COLUMNS for _ in range(heatmap.ROWS)]
+    for key, fraction in frequencies.items():
+        if key[:1] in FORMS_ORDER and key[1:] in HEIGHTS:
+            colors[HEIGHTS.index(key[1:])][FORMS_ORDER.index(key[0])] = heatmap.frequency_color(fraction)
+    return grid_image(colors, cell_size)
+
+
+def _save_png(image, filepath):
+    """Grava a imagem de forma atômica (o arquivo nunca fica pela metade no cache)."""
+    temp_path = f"{filepath}.{os.getpid()}.tmp"
+    image.save(temp_path, format='PNG', compress_level=1)
+    os.replace(temp_path, filepath)
+
+
+def _render_matrix_file(matrix, filepath):
+    _save_png(matrix_image(matrix), filepath)
+    return filepath
+
+
+def build_matrix_images(plots, images_dir, workers=None, progress=None, cancelled=None):
+    """
+    Gera as imagens das matrizes que ainda não estão na pasta de imagens.
+    
+    As imagens são desenhadas em paralelo em um pool de threads (o Pillow
+    libera o GIL na compressão PNG) e nomeadas pelo hash da matriz; parcelas
+    com a mesma matriz compartilham a imagem.
+    
+    Args:
+        plots (list): Parcelas no formato de data.json
+        images_dir (str): Pasta das imagens
+        workers (int): Número de threads (padrão do ThreadPoolExecutor)
+        progress (callable): Chamada como progress(imagens_prontas, total)
+        cancelled (callable): Retorna True para interromper a geração
+    
+    Returns:
+        dict: Posição da parcela -> nome do arquivo da imagem, ou None se cancelado
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    
+    os.makedirs(images_dir, exist_ok=True)
+    names = {}
+    missing = {}
+    for position, plot in enumerate(plots):
+        matrix = plot.get('matriz_fisionomica') or {}
+        name = f"matriz_{matrix_hash(matrix)}.png"
+        names[position] = name
+        if name not in missing and not os.path.exists(os.path.join(images_dir, name)):
+            missing[name] = matrix
+    
+    total = len(missing)
+    if not total:
+        return names
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_matrix_file, matrix, os.path.join(images_dir, name))
+                   for name, matrix in missing.items()]
+        for done, future in enumerate(as_completed(futures), 1):
+            if cancelled and cancelled():
+                for pending in futures:
+                    pending.cancel()
+                return None
+            future.result()
+            if progress:
+                progress(done, total)
+    return names
+
+
+def _format_number(value, digits=1):
+    return '' if value is None else f"{value:.{digits}f}".replace('.', ',')
+
+
+def _plot_date(plot):
+    day = plot.get('data_registro', '')
+    clock = plot.get('horario_registro')
+    return f"{day} {clock}" if day and clock else day
+
+
+def render_report(project, image_names, frequency_image_name, template_dir=None, now=None):
+    """
+    Monta o HTML do relatório de um projeto.
+    
+    Args:
+        project (dict): Projeto no formato de data.json
+        image_names (dict): Posição da parcela -> arquivo da imagem (de build_matrix_images)
+        frequency_image_name (str): Arquivo da imagem do mapa de frequência
+        template_dir (str): Pasta com modelos personalizados, opcional
+        now (datetime): Momento da geração (padrão: agora)
+    
+    Returns:
+        str: Documento HTML
+    """
+    plots = project.get('plots', [])
+    total = len(plots)
+    
+    plot_row = get_template('plot_row', template_dir)
+    plot_rows = []
+    strata_sum = canopy_sum = 0
+    for position, plot in enumerate(plots):
+        values = plot_metrics(plot)
+        strata, canopy = values[0], values[1]
+        strata_sum += strata
+        canopy_sum += canopy
+        plot_rows.append(plot_row.render(
+            number=plot.get('numero', position + 1),
+            date=_plot_date(plot),
+            latitude=plot.get('latitude', ''),
+            longitude=plot.get('longitude', ''),
+            altitude=plot.get('altitude', ''),
+            formula=plot.get('formula_kuchler', ''),
+            strata=strata,
+            canopy=canopy,
+            description=plot.get('descricao_fisionomia', ''),
+            image=f"{IMAGES_DIR}/{image_names[position]}"
+        ))
+    
+    frequencies, _ = heatmap.cell_frequencies(plots)
+    cell_row = get_template('cell_row', template_dir)
+    top_cells = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:TOP_CELLS]
+    cell_rows = [cell_row.render(cell=key,
+                                 form=FORMS_DESC.get(key[0], key[0]),
+                                 height=HEIGHTS_DESC.get(key[1:], key[1:]),
+                                 percent=f"{fraction:.0%}")
+                 for key, fraction in top_cells]
+    
+    formulas = Counter(plot.get('formula_kuchler') or '(vazia)' for plot in plots)
+    formula_row = get_template('formula_row', template_dir)
+    formula_rows = [formula_row.render(formula=formula, count=count, percent=f"{count / total:.0%}")
+                    for formula, count in sorted(formulas.items(), key=lambda item: (-item[1], item[0]))]
+    
+    return get_template('report', template_dir).render(
+        title=project.get('name', 'Projeto'),
+        plots=total,
+        generated_at=(now or datetime.now()).strftime('%d/%m/%Y %H:%M'),
+        mean_strata=_format_number(strata_sum / total if total else None),
+        mean_canopy=_format_number(canopy_sum / total if total else None),
+        num_formulas=len(formulas) if total else 0,
+        frequency_image=f"{IMAGES_DIR}/{frequency_image_name}",
+        cell_rows_html=''.join(cell_rows),
+        formula_rows_html=''.join(formula_rows),
+        plot_rows_html=''.join(plot_rows)
+    )
+
+
+def write_pdf(html_path, pdf_path):
+    """
+    Converte o relatório HTML em PDF (requer o WeasyPrint).
+    
+    Args:
+        html_path (str): Relatório HTML (as imagens são lidas da pasta dele)
+        pdf_path (str): Arquivo PDF de destino
+    """
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ImportError('O relatório em PDF requer o WeasyPrint: pip install weasyprint') from None
+    HTML(filename=html_path).write_pdf(pdf_path)
+
+
+def generate_report(project, output_dir, pdf=False, workers=None, template_dir=None,
+                    progress=None, cancelled=None, now=None):
+    """
+    Gera o relatório HTML de um projeto (e o PDF, se pedido).
+    
+    Args:
+        project (dict): Projeto no formato de data.json
+        output_dir (str): Pasta do relatório; as imagens ficam em IMAGES_DIR dentro dela
+        pdf (bool): Gera também o PDF
+        workers (int): Threads para desenhar as imagens
+        template_dir (str): Pasta com modelos personalizados, opcional
+        progress (callable): Chamada como progress(imagens_prontas, total)
+        cancelled (callable): Retorna True para interromper a geração
+        now (datetime): Momento da geração (padrão: agora)
+    
+    Returns:
+        str: Caminho do relatório (PDF, se pedido, senão HTML), ou None se cancelado
+    """
+    from modules.exporter import build_export_filename
+    
+    now = now or datetime.now()
+    plots = project.get('plots', [])
+    images_dir = os.path.join(output_dir, IMAGES_DIR)
+    
+    image_names = build_matrix_images(plots, images_dir, workers, progress, cancelled)
+    if image_names is None:
+        return None
+    
+    frequencies, _ = heatmap.cell_frequencies(plots)
+    frequency_name = f"frequencia_{matrix_hash(frequencies)}.png"
+    frequency_path = os.path.join(images_dir, frequency_name)
+    if not os.path.exists(frequency_path):
+        _save_png(frequency_image(frequencies), frequency_path)
+    
+    document = render_report(project, image_names, frequency_name, template_dir, now)
+    
+    safe_name = ''.join(c if c.isalnum() or c in ' -_.' else '_' for c in project.get('name', '')).strip() or 'projeto'
+    html_path = os.path.join(output_dir, build_export_filename(safe_name, now, '_relatorio', 'html'))
+    # Projetos com o mesmo nome gerados no mesmo segundo não se sobrescrevem
+    counter = 2
+    while os.path.exists(html_path):
+        html_path = os.path.join(output_dir, build_export_filename(safe_name, now, f"_relatorio_{counter}", 'html'))
+        counter += 1
+    temp_path = f"{html_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(document)
+    os.replace(temp_path, html_path)
+    
+    if pdf:
+        pdf_path = f"{os.path.splitext(html_path)[0]}.pdf"
+        write_pdf(html_path, pdf_path)
+        return pdf_path
+    return html_path
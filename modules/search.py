@@ -0,0 +1,312 @@
+"""
+Módulo de busca incremental (enquanto se digita) em projetos e parcelas.
+Indexa os nomes dos projetos, as fórmulas de Küchler e as palavras das
+descrições fisionômicas. Cada palavra da consulta é tratada como prefixo, sem
+diferenciar maiúsculas nem acentos ('veg' encontra 'Vegetação').
+
+Os termos ficam em uma lista ordenada (busca binária pelo intervalo de um
+prefixo) e cada termo guarda as parcelas em que aparece como array de
+inteiros, que ocupa 4 bytes por ocorrência mesmo com 100 mil parcelas. A
+inclusão de uma parcela só acrescenta ao fim dos arrays; a exclusão marca a
+parcela como removida e os arrays são compactados quando as removidas passam
+das ativas.
+
+Palavras de uma letra cobrem dezenas de milhares de termos (as fórmulas são
+quase todas distintas), então cada letra inicial também tem o array já
+mesclado das parcelas. A consulta percorre as parcelas da palavra mais rara
+conferindo as demais nos termos da própria parcela; se poucas combinarem, passa
+a intersectar as parcelas de cada palavra.
+"""
+
+import bisect
+import itertools
+import re
+import unicodedata
+from array import array
+
+# Número máximo de resultados de cada tipo por consulta
+DEFAULT_LIMIT = 50
+
+# Parcelas conferidas uma a uma pelos termos em uma consulta com várias palavras;
+# acima disso a busca passa a intersectar as parcelas de cada palavra
+MAX_SCAN = 500
+
+# Custo de conferir uma parcela pelos termos, em ocorrências percorridas na interseção
+VERIFY_COST = 100
+
+# Palavras de ligação que não são indexadas
+STOPWORDS = frozenset({'a', 'o', 'e', 'as', 'os', 'de', 'da', 'do', 'das', 'dos',
+                       'em', 'na', 'no', 'nas', 'nos', 'com'})
+
+_WORD = re.compile(r"[0-9a-z][0-9a-z,.\-]*")
+
+
+def normalize(text):
+    """Texto em minúsculas e sem acentos (caracteres fora do ASCII são descartados)."""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return text.lower()
+
+
+def tokenize(text):
+    """
+    Palavras normalizadas de um texto, sem as palavras de ligação.
+    
+    Args:
+        text (str): Texto livre (nome, descrição ou consulta)
+    
+    Returns:
+        list: Palavras, na ordem do texto
+    """
+    words = (word.rstrip(',.-') for word in _WORD.findall(normalize(text)))
+    return [word for word in words if word and word not in STOPWORDS]
+
+
+def plot_terms(plot):
+    """
+    Termos indexados de uma parcela: a fórmula inteira e as palavras da descrição.
+    
+    Returns:
+        set: Termos normalizados
+    """
+    terms = set(tokenize(plot.get('descricao_fisionomia')))
+    formula = normalize(plot.get('formula_kuchler'))
+    if formula:
+        terms.add(formula)
+    return terms
+
+
+class SearchIndex:
+    """
+    Índice de prefixos dos projetos e das parcelas.
+    
+    Os projetos (poucos) são procurados por varredura dos nomes já
+    normalizados; as parcelas, pelo índice de termos.
+    """
+    
+    def __init__(self, projects=()):
+        """
+        Args:
+            projects (iterable): Projetos no formato de data.json
+        """
+        # Termos ordenados para a busca por prefixo; id do termo -> termo e ocorrências
+        self._terms = []
+        self._term_ids = {}
+        self._term_names = []
+        self._postings = []
+        # Letra inicial -> parcelas com algum termo iniciado por ela
+        self._initials = {}
+        # Parcelas por número interno (None = removida) e termos de cada uma
+        self._docs = []
+        self._doc_terms = []
+        self._doc_of = {}
+        self._removed = 0
+        # Projetos: id -> (palavras do nome, projeto)
+        self._projects = {}
+        
+        # Na montagem os termos são ordenados uma vez no final, não a cada inclusão
+        self._sorted = False
+        for project in projects:
+            self.add_project(project)
+            for plot in project.get('plots', []):
+                self.add(project.get('id'), plot)
+        self._terms.sort()
+        self._sorted = True
+    
+    def __len__(self):
+        return len(self._doc_of)
+    
+    def __contains__(self, plot_id):
+        return plot_id in self._doc_of
+    
+    def add_project(self, project):
+        """Inclui (ou atualiza) o nome de um projeto."""
+        self._projects[project.get('id')] = (tokenize(project.get('name')), project)
+    
+    def remove_project(self, project_id):
+        """Retira um projeto e todas as suas parcelas."""
+        self._projects.pop(project_id, None)
+        # Exclusão de projeto é rara: varre as parcelas em vez de manter um índice por projeto
+        plot_ids = [entry[1]['id'] for entry in self._docs if entry is not None and entry[0] == project_id]
+        for plot_id in plot_ids:
+            self.remove(plot_id)
+    
+    def add(self, project_id, plot):
+        """
+        Inclui uma parcela.
+        
+        Args:
+            project_id (str): Projeto da parcela
+            plot (dict): Parcela com 'id'
+        
+        Returns:
+            bool: True se a parcela foi incluída
+        """
+        plot_id = plot.get('id')
+        if plot_id is None or plot_id in self._doc_of:
+            return False
+        
+        doc = len(self._docs)
+        term_ids = []
+        terms = plot_terms(plot)
+        for term in terms:
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._postings)
+                self._term_names.append(term)
+                self._postings.append(array('I'))
+                if self._sorted:
+                    bisect.insort(self._terms, term)
+                else:
+                    self._terms.append(term)
+            # Números crescentes: os arrays continuam ordenados
+            self._postings[term_id].append(doc)
+            term_ids.append(term_id)
+        for initial in {term[0] for term in terms}:
+            postings = self._initials.get(initial)
+            if postings is None:
+                postings = self._initials[initial] = array('I')
+            postings.append(doc)
+        
+        self._docs.append((project_id, plot))
+        self._doc_terms.append(array('I', term_ids))
+        self._doc_of[plot_id] = doc
+        return True
+    
+    def remove(self, plot_id):
+        """
+        Retira uma parcela, se estiver no índice.
+        
+        Returns:
+            bool: True se a parcela foi retirada
+        """
+        doc = self._doc_of.pop(plot_id, None)
+        if doc is None:
+            return False
+        self._docs[doc] = None
+        self._doc_terms[doc] = None
+        self._removed += 1
+        if self._removed > len(self._doc_of):
+            self.compact()
+        return True
+    
+    def compact(self):
+        """Renumera as parcelas ativas e descarta as removidas dos arrays."""
+        renumber = {}
+        docs, doc_terms = [], []
+        for doc, entry in enumerate(self._docs):
+            if entry is not None:
+                renumber[doc] = len(docs)
+                docs.append(entry)
+                doc_terms.append(self._doc_terms[doc])
+        self._postings = [array('I', (renumber[doc] for doc in postings if doc in renumber))
+                          for postings in self._postings]
+        self._initials = {initial: array('I', (renumber[doc] for doc in postings if doc in renumber))
+                          for initial, postings in self._initials.items()}
+        self._docs = docs
+        self._doc_terms = doc_terms
+        self._doc_of = {entry[1]['id']: doc for doc, entry in enumerate(docs)}
+        self._removed = 0
+    
+    def _prefix_range(self, prefix):
+        low = bisect.bisect_left(self._terms, prefix)
+        high = bisect.bisect_left(self._terms, prefix + '\uffff', low)
+        return low, high
+    
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Projetos e parcelas que contêm todas as palavras da consulta (como prefixos).
+        
+        Args:
+            query (str): Texto digitado
+            limit (int): Máximo de resultados de cada tipo
+        
+        Returns:
+            dict: 'projects' (lista de projetos) e 'plots' (pares (id do projeto, parcela)),
+                  em ordem alfabética do termo encontrado (o termo digitado por inteiro primeiro)
+        """
+        words = tokenize(query)
+        if not words:
+            return {'projects': [], 'plots': []}
+        
+        projects = [project for name_words, project in self._projects.values()
+                    if all(any(name_word.startswith(word) for name_word in name_words) for word in words)]
+        return {'projects': projects[:limit], 'plots': self._search_plots(words, limit)}
+    
+    def _word_postings(self, word):
+        """
+        Arrays de parcelas dos termos que começam com a palavra.
+        
+        Returns:
+            tuple: (lista de arrays, total de ocorrências), lista vazia se não houver termos
+        """
+        if len(word) == 1:
+            postings = self._initials.get(word)
+            return ([postings], len(postings)) if postings else ([], 0)
+        
+        low, high = self._prefix_range(word)
+        arrays = [self._postings[self._term_ids[term]] for term in self._terms[low:high]]
+        return arrays, sum(map(len, arrays))
+    
+    def _matches_all(self, doc, words):
+        """Confere se os termos da parcela começam com todas as palavras (prefixadas com '\\0')."""
+        # '\0lian' em '\0cobertura\0lianas...': o teste de prefixo é feito em C
+        term_names = self._term_names
+        text = '\0' + '\0'.join([term_names[term_id] for term_id in self._doc_terms[doc]])
+        return all(word in text for word in words)
+    
+    def _search_plots(self, words, limit):
+        matches = []
+        for word in dict.fromkeys(words):
+            arrays, total = self._word_postings(word)
+            if not arrays:
+                return []
+            matches.append((total, word, arrays))
+        # Da palavra mais rara para a mais comum
+        matches.sort(key=lambda match: match[0])
+        
+        # Conjunção comum: percorre a palavra mais rara conferindo as demais nos termos
+        # da parcela, e para ao completar o limite
+        others = ['\0' + word for _, word, _ in matches[1:]]
+        results = []
+        seen = set()
+        scanned = 0
+        for postings in matches[0][2]:
+            for doc in postings:
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                if self._docs[doc] is None:
+                    continue
+                scanned += 1
+                if scanned > MAX_SCAN:
+                    break
+                if not others or self._matches_all(doc, others):
+                    results.append(self._docs[doc])
+                    if len(results) >= limit:
+                        return results
+            else:
+                continue
+            break
+        else:
+            # Todas as candidatas foram conferidas
+            return results
+        
+        # Conjunção rara: interseção das parcelas de cada palavra (feita em C), enquanto
+        # for mais barata que conferir as parcelas restantes pelos termos
+        docs = set().union(*matches[0][2])
+        remaining = others
+        for total, word, arrays in matches[1:]:
+            if len(docs) * VERIFY_COST <= total:
+                break
+            docs = docs.intersection(itertools.chain.from_iterable(arrays))
+            remaining = remaining[1:]
+        
+        results = []
+        for doc in sorted(docs):
+            if self._docs[doc] is not None and (not remaining or self._matches_all(doc, remaining)):
+                results.append(self._docs[doc])
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,482 @@
+"""
+Módulo de sincronização entre dispositivos.
+Cada parcela é identificada pelo seu 'id' e endereçada pelo hash do seu conteúdo;
+cada projeto é resumido por uma árvore de Merkle sobre os prefixos do hash dos ids.
+Dois dispositivos comparam as raízes e descem apenas pelos ramos que diferem,
+trocando somente as parcelas novas e as exclusões. Projetos excluídos ficam
+registrados em 'project_tombstones' e a exclusão é propagada como a das
+parcelas: um projeto excluído em um dispositivo não volta pela sincronização.
+
+Transportes disponíveis:
+- LocalPeer: dados já carregados em memória
+- FilePeer: um data.json acessível pelo sistema de arquivos (cartão, pasta compartilhada)
+- HttpPeer: um dispositivo servindo seus dados com create_server() (python -m modules serve)
+"""
+
+import hashlib
+import json
+import threading
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules import data_manager
+from modules import exporter
+
+# Níveis da árvore: cada nível consome um dígito hexadecimal do hash do id (16^3 = 4096 folhas)
+TREE_DEPTH = 3
+HEX_DIGITS = '0123456789abcdef'
+
+# Hash das parcelas excluídas: a exclusão prevalece sobre qualquer conteúdo
+DELETED = '-'
+
+# Campos locais a cada dispositivo, fora do hash do conteúdo
+# (o número é reatribuído ao receber a parcela, para não colidir com a numeração local)
+LOCAL_FIELDS = ('id', 'numero')
+
+# Operações aceitas pelos peers (e pelo servidor HTTP)
+OPERATIONS = ('summary', 'nodes', 'leaves', 'get_plots', 'apply', 'delete_project')
+
+
+def plot_hash(plot):
+    """
+    Calcula o hash do conteúdo de uma parcela, ignorando id e número.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        str: SHA-1 hexadecimal do JSON canônico da parcela
+    """
+    content = {key: value for key, value in plot.items() if key not in LOCAL_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _leaf_prefix(plot_id):
+    """
+    Folha de uma parcela na árvore: prefixo do SHA-1 do id.
+    
+    Usa o hash, e não o próprio id, para que ids em qualquer formato (importados
+    ou editados à mão, não hexadecimais) também fiquem na árvore.
+    """
+    return hashlib.sha1(str(plot_id).encode('utf-8')).hexdigest()[:TREE_DEPTH]
+
+
+def _combine(parts):
+    """Hash de um nó a partir dos hashes dos filhos ('' para nó vazio)."""
+    if not any(parts):
+        return ''
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ProjectTree:
+    """
+    Árvore de Merkle de um projeto.
+    
+    As folhas são os prefixos de TREE_DEPTH dígitos do hash dos ids
+    (_leaf_prefix) e guardam os pares id -> hash das parcelas (ou DELETED para
+    as excluídas). Os nós internos guardam o hash dos 16 filhos; nós sem
+    parcelas têm hash ''.
+    """
+    
+    def __init__(self, project):
+        self.leaves = {}
+        for plot in project.get('plots', []):
+            self._add(plot['id'], plot_hash(plot))
+        for tombstone in project.get('plot_tombstones', []):
+            if 'id' in tombstone:
+                self._add(tombstone['id'], DELETED)
+        
+        # Hashes calculados de baixo para cima, apenas para os ramos com parcelas
+        self.hashes = {}
+        for prefix, entries in self.leaves.items():
+            self.hashes[prefix] = _combine([f"{plot_id}:{entries[plot_id]}" for plot_id in sorted(entries)])
+        for length in range(TREE_DEPTH - 1, -1, -1):
+            parents = {prefix[:length] for prefix in self.hashes if len(prefix) == length + 1}
+            for parent in parents:
+                self.hashes[parent] = _combine(self.children(parent))
+    
+    def _add(self, plot_id, digest):
+        self.leaves.setdefault(_leaf_prefix(plot_id), {})[plot_id] = digest
+    
+    @property
+    def root(self):
+        """Hash da raiz ('' para projeto vazio)."""
+        return self.hashes.get('', '')
+    
+    def children(self, prefix):
+        """Retorna os hashes dos 16 filhos de um nó interno."""
+        return [self.hashes.get(prefix + digit, '') for digit in HEX_DIGITS]
+    
+    def leaf(self, prefix):
+        """Retorna os pares id -> hash de uma folha."""
+        return dict(self.leaves.get(prefix, {}))
+
+
+class LocalPeer:
+    """
+    Dispositivo com os dados em memória (formato de data.json).
+    
+    Todas as operações recebem e retornam apenas tipos JSON, para que
+    possam ser servidas por HTTP sem adaptação.
+    """
+    
+    def __init__(self, data, on_change=None):
+        """
+        Args:
+            data (dict): Dados no formato de data.json (alterados no lugar por apply)
+            on_change (callable): Chamado com os ids dos projetos alterados após
+                                  cada mudança nos dados
+        """
+        self.data = data
+        self.on_change = on_change
+        self._trees = {}
+        self._lock = threading.Lock()
+        if data_manager.ensure_ids(data) and on_change:
+            on_change(*(project['id'] for project in data.get('projects', [])))
+    
+    def _tree(self, project_id):
+        tree = self._trees.get(project_id)
+        if tree is None:
+            project = data_manager.find_project(self.data, project_id) or {}
+            tree = self._trees[project_id] = ProjectTree(project)
+        return tree
+    
+    def summary(self):
+        """
+        Returns:
+            dict: {'projects': {id: {'name': nome, 'root': hash da raiz}},
+                   'deleted_projects': ids dos projetos excluídos}
+        """
+        with self._lock:
+            return {'projects': {project['id']: {'name': project.get('name', ''),
+                                                 'root': self._tree(project['id']).root}
+                                 for project in self.data.get('projects', [])},
+                    'deleted_projects': sorted(data_manager.deleted_project_ids(self.data))}
+    
+    def nodes(self, project_id, prefixes):
+        """Retorna {prefixo: hashes dos 16 filhos} para cada nó interno pedido."""
+        with self._lock:
+            tree = self._tree(project_id)
+            return {prefix: tree.children(prefix) for prefix in prefixes}
+    
+    def leaves(self, project_id, prefixes):
+        """Retorna {prefixo: {id: hash}} para cada folha pedida."""
+        with self._lock:
+            tree = self._tree(project_id)
+            return {prefix: tree.leaf(prefix) for prefix in prefixes}
+    
+    def get_plots(self, project_id, plot_ids):
+        """Retorna as parcelas pedidas, na ordem do projeto."""
+        wanted = set(plot_ids)
+        with self._lock:
+            project = data_manager.find_project(self.data, project_id) or {}
+            return [plot for plot in project.get('plots', []) if plot['id'] in wanted]
+    
+    def apply(self, project_id, name, plots, deleted_ids):
+        """
+        Aplica parcelas recebidas e exclusões a um projeto, criando-o se necessário.
+        
+        Parcelas recebidas vão para o fim da lista com um número local novo;
+        exclusões são registradas em 'plot_tombstones', como no app. Um
+        projeto excluído neste dispositivo não é recriado.
+        
+        Args:
+            project_id (str): Identificador do projeto
+            name (str): Nome do projeto (usado se ele ainda não existir)
+            plots (list): Parcelas novas
+            deleted_ids (list): Ids de parcelas excluídas
+        
+        Returns:
+            dict: Resumo com 'added' e 'deleted'
+        """
+        with self._lock:
+            if project_id in data_manager.deleted_project_ids(self.data):
+                return {'added': 0, 'deleted': 0}
+            project = data_manager.find_project(self.data, project_id)
+            created = project is None
+            if created:
+                project = {'id': project_id, 'name': name, 'plots': [], 'next_plot_number': 1}
+                self.data.setdefault('projects', []).append(project)
+            
+            index = data_manager.PlotIndex(project)
+            tombstones = project.setdefault('plot_tombstones', [])
+            known_deleted = {tombstone.get('id') for tombstone in tombstones}
+            added = deleted = 0
+            
+            for plot_id in deleted_ids:
+                if plot_id in known_deleted:
+                    continue
+                position = index.position(plot_id)
+                if position is None:
+                    # Parcela que nunca chegou a este dispositivo: só registra a exclusão
+                    tombstones.append({'position': None, 'checksum': None, 'id': plot_id,
+                                       'deleted_at': datetime.now().isoformat(timespec='seconds')})
+                else:
+                    tombstones.append(exporter.make_tombstone(project['plots'], position))
+                    index.remove(plot_id)
+                known_deleted.add(plot_id)
+                deleted += 1
+            
+            for plot in plots:
+                if plot['id'] in index or plot['id'] in known_deleted:
+                    continue
+                index.add({key: value for key, value in plot.items() if key != 'numero'})
+                added += 1
+            
+            self._trees.pop(project_id, None)
+        
+        if (added or deleted or created) and self.on_change:
+            self.on_change(project_id)
+        return {'added': added, 'deleted': deleted}
+    
+    def delete_project(self, project_id):
+        """
+        Exclui um projeto (ou só registra a exclusão, se ele não existir aqui).
+        
+        Returns:
+            dict: {'deleted': True se a exclusão ainda não estava registrada}
+        """
+        with self._lock:
+            if project_id in data_manager.deleted_project_ids(self.data):
+                return {'deleted': False}
+            data_manager.delete_project(self.data, project_id)
+            self._trees.pop(project_id, None)
+        
+        if self.on_change:
+            self.on_change(project_id, data_manager.PROJECT_TOMBSTONES_KEY)
+        return {'deleted': True}
+
+
+class FilePeer(LocalPeer):
+    """Dispositivo representado por um data.json no sistema de arquivos."""
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.store = data_manager.DataStore(file_path)
+        super().__init__(self.store.load(), on_change=self.save)
+    
+    def save(self, *project_ids):
+        """Grava os projetos alterados, mesclando com gravações de outros processos."""
+        self.store.mark_changed(*project_ids)
+        self.store.save(self.data)
+        # A mesclagem pode ter trazido projetos do disco
+        self._trees.clear()
+
+
+class HttpPeer:
+    """
+    Dispositivo remoto servido por serve(), acessado por HTTP.
+    
+    Conta os bytes trocados em bytes_sent e bytes_received.
+    """
+    
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.bytes_sent = 0
+        self.bytes_received = 0
+    
+    def _call(self, operation, **payload):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        request = urllib.request.Request(f"{self.url}/{operation}", data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            content = response.read()
+        self.bytes_sent += len(body)
+        self.bytes_received += len(content)
+        return json.loads(content.decode('utf-8'))
+    
+    def summary(self):
+        return self._call('summary')
+    
+    def nodes(self, project_id, prefixes):
+        return self._call('nodes', project_id=project_id, prefixes=prefixes)
+    
+    def leaves(self, project_id, prefixes):
+        return self._call('leaves', project_id=project_id, prefixes=prefixes)
+    
+    def get_plots(self, project_id, plot_ids):
+        return self._call('get_plots', project_id=project_id, plot_ids=plot_ids)
+    
+    def apply(self, project_id, name, plots, deleted_ids):
+        return self._call('apply', project_id=project_id, name=name, plots=plots, deleted_ids=deleted_ids)
+    
+    def delete_project(self, project_id):
+        return self._call('delete_project', project_id=project_id)
+
+
+def open_peer(location):
+    """
+    Cria o peer adequado para um endereço.
+    
+    Args:
+        location (str): URL http(s):// de um servidor ou caminho de um data.json
+    
+    Returns:
+        LocalPeer | HttpPeer: Peer correspondente
+    """
+    if location.startswith(('http://', 'https://')):
+        return HttpPeer(location)
+    return FilePeer(location)
+
+
+def _diff_project(local, remote, project_id, local_root, remote_root):
+    """
+    Desce pelas árvores dos dois lados apenas pelos ramos com hashes diferentes.
+    
+    Returns:
+        tuple: (pares id -> hash locais, pares id -> hash remotos) das folhas que diferem
+    """
+    prefixes = ['']
+    for _ in range(TREE_DEPTH):
+        local_nodes = local.nodes(project_id, prefixes) if local_root else {}
+        remote_nodes = remote.nodes(project_id, prefixes) if remote_root else {}
+        empty = [''] * len(HEX_DIGITS)
+        prefixes = [prefix + digit
+                    for prefix in prefixes
+                    for digit, local_hash, remote_hash in zip(HEX_DIGITS,
+                                                              local_nodes.get(prefix, empty),
+                                                              remote_nodes.get(prefix, empty))
+                    if local_hash != remote_hash]
+        if not prefixes:
+            return {}, {}
+    
+    local_entries, remote_entries = {}, {}
+    for entries in (local.leaves(project_id, prefixes) if local_root else {}).values():
+        local_entries.update(entries)
+    for entries in (remote.leaves(project_id, prefixes) if remote_root else {}).values():
+        remote_entries.update(entries)
+    return local_entries, remote_entries
+
+
+def sync(local, remote):
+    """
+    Sincroniza dois dispositivos nos dois sentidos.
+    
+    Parcelas que existem só de um lado são copiadas para o outro; exclusões
+    (de parcelas e de projetos) são propagadas e prevalecem sobre o conteúdo.
+    Parcelas com o mesmo id e
+    conteúdos diferentes nos dois lados são mantidas como estão e listadas
+    em 'conflicts'.
+    
+    Args:
+        local: Peer local (LocalPeer ou FilePeer)
+        remote: Peer remoto (qualquer peer)
+    
+    Returns:
+        dict: Resumo com 'projects' (projetos que diferiam), 'pulled', 'pushed',
+              'deleted_local', 'deleted_remote' (parcelas), 'projects_deleted_local',
+              'projects_deleted_remote' e 'conflicts' (lista de ids)
+    """
+    local_summary = local.summary()
+    remote_summary = remote.summary()
+    local_projects = local_summary['projects']
+    remote_projects = remote_summary['projects']
+    result = {'projects': 0, 'pulled': 0, 'pushed': 0, 'deleted_local': 0, 'deleted_remote': 0,
+              'projects_deleted_local': 0, 'projects_deleted_remote': 0, 'conflicts': []}
+    
+    # Exclusões de projetos primeiro: prevalecem sobre qualquer parcela do projeto
+    local_deleted = set(local_summary.get('deleted_projects', []))
+    remote_deleted = set(remote_summary.get('deleted_projects', []))
+    for project_id in sorted(remote_deleted - local_deleted):
+        local.delete_project(project_id)
+        result['projects_deleted_local'] += project_id in local_projects
+    for project_id in sorted(local_deleted - remote_deleted):
+        remote.delete_project(project_id)
+        result['projects_deleted_remote'] += project_id in remote_projects
+    deleted = local_deleted | remote_deleted
+    local_projects = {pid: info for pid, info in local_projects.items() if pid not in deleted}
+    remote_projects = {pid: info for pid, info in remote_projects.items() if pid not in deleted}
+    
+    for project_id in list(local_projects) + [pid for pid in remote_projects if pid not in local_projects]:
+        local_info = local_projects.get(project_id, {'root': ''})
+        remote_info = remote_projects.get(project_id, {'root': ''})
+        both = project_id in local_projects and project_id in remote_projects
+        if both and local_info['root'] == remote_info['root']:
+            continue
+        result['projects'] += 1
+        name = local_info.get('name') or remote_info.get('name', '')
+        
+        local_entries, remote_entries = _diff_project(local, remote, project_id,
+                                                      local_info['root'], remote_info['root'])
+        
+        pull, push, delete_local, delete_remote = [], [], [], []
+        for plot_id in sorted(set(local_entries) | set(remote_entries)):
+            local_hash = local_entries.get(plot_id)
+            remote_hash = remote_entries.get(plot_id)
+            if local_hash == remote_hash:
+                continue
+            if remote_hash == DELETED:
+                delete_local.append(plot_id)
+            elif local_hash == DELETED:
+                delete_remote.append(plot_id)
+            elif local_hash is None:
+                pull.append(plot_id)
+            elif remote_hash is None:
+                push.append(plot_id)
+            else:
+                result['conflicts'].append(plot_id)
+        
+        pulled = remote.get_plots(project_id, pull) if pull else []
+        pushed = local.get_plots(project_id, push) if push else []
+        if pulled or delete_local or project_id not in local_projects:
+            result['pulled'] += local.apply(project_id, name, pulled, delete_local)['added']
+        if pushed or delete_remote or project_id not in remote_projects:
+            result['pushed'] += remote.apply(project_id, name, pushed, delete_remote)['added']
+        result['deleted_local'] += len(delete_local)
+        result['deleted_remote'] += len(delete_remote)
+    
+    return result
+
+
+class _SyncRequestHandler(BaseHTTPRequestHandler):
+    """Atende POST /<operação> com argumentos e resposta em JSON."""
+    
+    peer = None
+    
+    def do_POST(self):
+        operation = self.path.strip('/')
+        if operation not in OPERATIONS:
+            self.send_error(404, 'Operação desconhecida')
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+            result = getattr(self.peer, operation)(**payload)
+        except (TypeError, ValueError, KeyError) as e:
+            self.send_error(400, f"{type(e).__name__}: {e}")
+            return
+        
+        body = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Silencia o log de cada requisição
+        pass
+
+
+def create_server(peer, host='127.0.0.1', port=8765):
+    """
+    Cria o servidor HTTP de sincronização para um peer (sem iniciá-lo).
+    
+    Use server.serve_forever() para atender (ou em uma thread) e
+    server.shutdown() para encerrar. Com port=0 a porta é escolhida pelo sistema
+    e fica em server.server_address.
+    
+    Args:
+        peer (LocalPeer): Dados servidos
+        host (str): Endereço de escuta
+        port (int): Porta de escuta
+    
+    Returns:
+        ThreadingHTTPServer: Servidor pronto para atender
+    """
+    handler = type('SyncRequestHandler', (_SyncRequestHandler,), {'peer': peer})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,132 @@
+"""
+Módulo de cache de layouts de texto.
+Guarda o resultado da diagramação de um texto (quebra de linhas e
+renderização em textura) pela chave (texto, largura, fonte), para que a lista
+de parcelas reaproveite as descrições já exibidas ao ser remontada ou ao se
+voltar a um projeto, em vez de diagramar cada parágrafo de novo.
+
+O cache tem um limite de memória: cada entrada conta o tamanho estimado da
+sua textura e, ao passar do limite, as menos usadas recentemente são
+descartadas. O módulo não depende do Kivy: a interface guarda aqui o rótulo
+renderizado e informa o seu tamanho.
+"""
+
+from collections import OrderedDict
+
+# Limite padrão (bytes de textura RGBA somados)
+DEFAULT_MAX_BYTES = 48 * 1024 * 1024
+
+# Bytes por texel das texturas de texto (RGBA)
+BYTES_PER_TEXEL = 4
+
+
+def layout_key(text, width, font_name, font_size, bold=False, markup=False):
+    """
+    Chave de um layout de texto.
+    
+    Args:
+        text (str): Texto do rótulo
+        width (float): Largura disponível em pixels (arredondada para inteiro)
+        font_name (str): Nome da fonte
+        font_size (float): Tamanho da fonte em pixels
+        bold (bool): Negrito
+        markup (bool): Texto com marcação do Kivy
+    
+    Returns:
+        tuple: Chave do cache
+    """
+    return (text, int(round(width)), font_name, round(font_size, 2), bool(bold), bool(markup))
+
+
+def texture_bytes(width, height):
+    """Memória estimada de uma textura RGBA de width x height pixels."""
+    return max(int(width), 1) * max(int(height), 1) * BYTES_PER_TEXEL
+
+
+class TextLayoutCache:
+    """
+    Cache LRU de layouts de texto limitado pela memória das texturas.
+    
+    Usado apenas pela thread da interface (as texturas só existem nela).
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes (int): Memória máxima somada das entradas
+        """
+        self.max_bytes = max_bytes
+        # Chave -> (layout, bytes), do menos para o mais recentemente usado
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    @property
+    def total_bytes(self):
+        return self._bytes
+    
+    def get(self, key):
+        """
+        Layout guardado, marcando-o como usado agora.
+        
+        Returns:
+            object: Layout guardado com put, ou None se não estiver no cache
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def put(self, key, layout, nbytes):
+        """
+        Guarda um layout e descarta os menos usados se passar do limite.
+        
+        Um layout maior que o limite inteiro não é guardado.
+        
+        Args:
+            key (tuple): Chave de layout_key
+            layout (object): Rótulo renderizado (textura e tamanho)
+            nbytes (int): Memória ocupada pelo layout (ver texture_bytes)
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (layout, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+    
+    def get_or_create(self, key, create):
+        """
+        Layout da chave, criado com create() se não estiver no cache.
+        
+        Args:
+            key (tuple): Chave de layout_key
+            create (callable): Retorna (layout, bytes)
+        
+        Returns:
+            object: Layout
+        """
+        layout = self.get(key)
+        if layout is None:
+            layout, nbytes = create()
+            self.put(key, layout, nbytes)
+        return layout
+    
+    def clear(self):
+        """Descarta todos os layouts."""
+        self._entries.clear()
+        self._bytes = 0
@@ -0,0 +1,320 @@
+"""
+Módulo de agregação espacial das parcelas em células (tiles).
+Agrupa as parcelas por coordenada em quadrados (esquema de tiles z/x/y da
+projeção Web Mercator) ou hexágonos, em vários níveis de zoom, e mantém por
+célula o número de parcelas, a fórmula de Küchler dominante e a cobertura
+média de cada forma de vida. Os resumos são atualizados a cada parcela
+incluída ou excluída, sem reprocessar as demais, e exportados em GeoJSON.
+"""
+
+import json
+import math
+import os
+from collections import Counter
+
+from modules.kuchler_calculator import COVERAGE_MIDPOINTS, FORMS_ORDER
+
+# Níveis de zoom padrão: lado da célula de ~600 km, ~80 km, ~10 km e ~1,2 km no equador
+ZOOM_LEVELS = (6, 9, 12, 15)
+
+# Formas de vida com cobertura ('F' guarda características foliares)
+COVER_FORMS = [form for form in FORMS_ORDER if form != 'F']
+_FORM_POSITION = {form: position for position, form in enumerate(COVER_FORMS)}
+
+# Latitude máxima da projeção Web Mercator
+MAX_LATITUDE = 85.05112878
+
+_SQRT3 = math.sqrt(3)
+
+
+def project_point(latitude, longitude):
+    """
+    Converte coordenadas geográficas em Web Mercator normalizado.
+    
+    Args:
+        latitude (float): Latitude em graus
+        longitude (float): Longitude em graus
+    
+    Returns:
+        tuple: (x, y) entre 0 e 1, com y crescendo para o sul
+    """
+    latitude = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude)))
+    x = (longitude + 180.0) / 360.0
+    y = (1.0 - math.log(math.tan(latitude) + 1.0 / math.cos(latitude)) / math.pi) / 2.0
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def unproject_point(x, y):
+    """Converte Web Mercator normalizado em [longitude, latitude] (ordem do GeoJSON)."""
+    longitude = x * 360.0 - 180.0
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y))))
+    return [round(longitude, 7), round(latitude, 7)]
+
+
+def _hex_size(zoom):
+    """Raio do hexágono: largura igual ao lado do tile quadrado do mesmo zoom."""
+    return 1.0 / (2 ** zoom * _SQRT3)
+
+
+def cell_key(x, y, zoom, kind='grid'):
+    """
+    Célula que contém um ponto projetado.
+    
+    Args:
+        x, y (float): Ponto em Web Mercator normalizado
+        zoom (int): Nível de zoom
+        kind (str): 'grid' (tiles z/x/y) ou 'hex' (hexágonos em coordenadas axiais)
+    
+    Returns:
+        tuple: (coluna, linha) do tile ou (q, r) do hexágono
+    """
+    if kind == 'grid':
+        scale = 2 ** zoom
+        return int(x * scale), int(y * scale)
+    
+    # Hexágonos com vértice para cima; arredondamento em coordenadas cúbicas
+    size = _hex_size(zoom)
+    q = (_SQRT3 / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = round(q), round(r), round(s)
+    dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+    if dq > dr and dq > ds:
+        rq = -rr - rs
+    elif dr > ds:
+        rr = -rq - rs
+    return rq, rr
+
+
+def cell_polygon(cell, zoom, kind='grid'):
+    """
+    Contorno de uma célula em coordenadas geográficas.
+    
+    Returns:
+        list: Anel fechado de pontos [longitude, latitude]
+    """
+    if kind == 'grid':
+        column, row = cell
+        scale = 2 ** zoom
+        # Sentido anti-horário (RFC 7946): y cresce para o sul
+        corners = [(column, row), (column, row + 1), (column + 1, row + 1), (column + 1, row)]
+        ring = [unproject_point(cx / scale, cy / scale) for cx, cy in corners]
+    else:
+        q, r = cell
+        size = _hex_size(zoom)
+        center_x = size * _SQRT3 * (q + r / 2)
+        center_y = size * 1.5 * r
+        ring = []
+        for corner in range(6):
+            angle = math.radians(-60 * corner - 30)
+            ring.append(unproject_point(center_x + size * math.cos(angle), center_y + size * math.sin(angle)))
+    ring.append(ring[0])
+    return ring
+
+
+def plot_form_cover(plot):
+    """
+    Cobertura de cada forma de vida em uma parcela.
+    
+    A cobertura da forma é a do seu estrato mais denso (ponto médio da
+    classe), já que estratos diferentes se sobrepõem na vertical.
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        dict: Forma -> cobertura em %, apenas formas presentes
+    """
+    cover = {}
+    for key, value in (plot.get('matriz_fisionomica') or {}).items():
+        midpoint = COVERAGE_MIDPOINTS.get(value)
+        if midpoint is not None and key[:1] in _FORM_POSITION and midpoint > cover.get(key[0], 0.0):
+            cover[key[0]] = midpoint
+    return cover
+
+
+class _CellSummary:
+    """Acumuladores de uma célula: somas e contagens que admitem inclusão e exclusão."""
+    
+    __slots__ = ('plots', 'formulas', 'cover_sums')
+    
+    def __init__(self):
+        self.plots = 0
+        self.formulas = Counter()
+        self.cover_sums = [0.0] * len(COVER_FORMS)
+    
+    def update(self, formula, cover, sign):
+        self.plots += sign
+        if formula:
+            self.formulas[formula] += sign
+            if self.formulas[formula] <= 0:
+                del self.formulas[formula]
+        for form, value in cover.items():
+            self.cover_sums[_FORM_POSITION[form]] += sign * value
+    
+    def dominant_formula(self):
+        """Fórmula mais frequente (empate: a primeira em ordem alfabética)."""
+        if not self.formulas:
+            return '', 0
+        return min(self.formulas.items(), key=lambda item: (-item[1], item[0]))
+
+
+class TileIndex:
+    """
+    Resumos por célula das parcelas de um ou mais projetos, em vários zooms.
+    
+    Parcelas sem coordenadas ficam fora do índice. Cada parcela guarda a sua
+    contribuição (células, fórmula e coberturas), então a exclusão não
+    precisa da parcela original.
+    """
+    
+    def __init__(self, projects=(), kind='grid', zooms=ZOOM_LEVELS):
+        """
+        Args:
+            projects (iterable): Projetos no formato de data.json
+            kind (str): 'grid' (quadrados z/x/y) ou 'hex' (hexágonos)
+            zooms (iterable): Níveis de zoom mantidos
+        """
+        if kind not in ('grid', 'hex'):
+            raise ValueError(f"Tipo de célula inválido: {kind!r}")
+        self.kind = kind
+        self.zooms = tuple(sorted(set(zooms)))
+        self._cells = {zoom: {} for zoom in self.zooms}
+        self._plots = {}
+        
+        for project in projects:
+            for plot in project.get('plots', []):
+                self.add(plot)
+    
+    def __len__(self):
+        return len(self._plots)
+    
+    def __contains__(self, plot_id):
+        return plot_id in self._plots
+    
+    def add(self, plot):
+        """
+        Inclui uma parcela nos resumos das suas células.
+        
+        Args:
+            plot (dict): Parcela com 'id', 'latitude' e 'longitude'
+        
+        Returns:
+            bool: True se a parcela foi incluída
+        """
+        plot_id = plot.get('id')
+        latitude, longitude = plot.get('latitude'), plot.get('longitude')
+        if plot_id is None or plot_id in self._plots or latitude is None or longitude is None:
+            return False
+        
+        x, y = project_point(latitude, longitude)
+        cells = tuple(cell_key(x, y, zoom, self.kind) for zoom in self.zooms)
+        contribution = (cells, plot.get('formula_kuchler') or '', plot_form_cover(plot))
+        self._plots[plot_id] = contribution
+        self._apply(contribution, 1)
+        return True
+    
+    def remove(self, plot_id):
+        """
+        Retira uma parcela dos resumos, se estiver no índice.
+        
+        Returns:
+            bool: True se a parcela foi retirada
+        """
+        contribution = self._plots.pop(plot_id, None)
+        if contribution is None:
+            return False
+        self._apply(contribution, -1)
+        return True
+    
+    def _apply(self, contribution, sign):
+        cells, formula, cover = contribution
+        for zoom, cell in zip(self.zooms, cells):
+            zoom_cells = self._cells[zoom]
+            summary = zoom_cells.get(cell)
+            if summary is None:
+                summary = zoom_cells[cell] = _CellSummary()
+            summary.update(formula, cover, sign)
+            if summary.plots <= 0:
+                del zoom_cells[cell]
+    
+    def _cell_id(self, zoom, cell):
+        prefix = '' if self.kind == 'grid' else 'h'
+        return f"{prefix}{zoom}/{cell[0]}/{cell[1]}"
+    
+    def _summary(self, zoom, cell, summary):
+        formula, formula_plots = summary.dominant_formula()
+        return {
+            'cell': self._cell_id(zoom, cell),
+            'zoom': zoom,
+            'plots': summary.plots,
+            'formula_kuchler': formula,
+            'formula_plots': formula_plots,
+            # Parcelas sem a forma entram na média com cobertura zero
+            'cobertura_media': {form: round(total / summary.plots, 1)
+                                for form, total in zip(COVER_FORMS, summary.cover_sums) if total > 1e-9}
+        }
+    
+    def tiles(self, zoom):
+        """
+        Resumos de todas as células ocupadas em um zoom.
+        
+        Args:
+            zoom (int): Um dos níveis de zoom do índice
+        
+        Returns:
+            list: Dicionários com 'cell', 'zoom', 'plots', 'formula_kuchler',
+                  'formula_plots' e 'cobertura_media' (forma -> %)
+        """
+        return [self._summary(zoom, cell, summary) for cell, summary in sorted(self._cells[zoom].items())]
+    
+    def tile_at(self, latitude, longitude, zoom):
+        """
+        Resumo da célula que contém um ponto.
+        
+        Returns:
+            dict: Resumo da célula, ou None se não houver parcelas nela
+        """
+        cell = cell_key(*project_point(latitude, longitude), zoom, self.kind)
+        summary = self._cells[zoom].get(cell)
+        return self._summary(zoom, cell, summary) if summary is not None else None
+    
+    def to_geojson(self, zoom):
+        """
+        Células de um zoom como FeatureCollection GeoJSON (polígonos).
+        
+        Args:
+            zoom (int): Um dos níveis de zoom do índice
+        
+        Returns:
+            dict: FeatureCollection com os resumos nas propriedades
+        """
+        features = []
+        for cell, summary in sorted(self._cells[zoom].items()):
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [cell_polygon(cell, zoom, self.kind)]},
+                'properties': self._summary(zoom, cell, summary)
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+    
+    def export_geojson(self, filepath, zoom):
+        """
+        Grava as células de um zoom em um arquivo GeoJSON.
+        
+        Args:
+            filepath (str): Caminho do arquivo .geojson
+            zoom (int): Um dos níveis de zoom do índice
+        
+        Returns:
+            int: Número de células gravadas
+        """
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        collection = self.to_geojson(zoom)
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(collection, file, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, filepath)
+        return len(collection['features'])
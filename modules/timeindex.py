@@ -0,0 +1,227 @@
+"""
+Módulo de índice temporal das parcelas.
+Novas parcelas gravam o momento do registro em ISO-8601 com fuso horário
+('registrado_em'); parcelas antigas continuam sendo lidas pelos campos
+'data_registro' (dd/mm/AAAA) e 'horario_registro' (HH:MM:SS), interpretados
+no fuso local. O índice mantém as parcelas ordenadas por timestamp, no total e
+por projeto, e responde consultas por intervalo com busca binária.
+"""
+
+import bisect
+from datetime import date, datetime, time, timedelta
+
+# Campo ISO-8601 do momento do registro
+REGISTERED_AT_FIELD = 'registrado_em'
+
+
+def registration_fields(now=None):
+    """
+    Campos de data e hora de uma nova parcela.
+    
+    Os campos antigos continuam sendo gravados para exibição e compatibilidade.
+    
+    Args:
+        now (datetime): Momento do registro (padrão: agora, no fuso local)
+    
+    Returns:
+        dict: 'data_registro', 'horario_registro' e 'registrado_em'
+    """
+    now = (now or datetime.now()).astimezone()
+    return {
+        'data_registro': now.strftime('%d/%m/%Y'),
+        'horario_registro': now.strftime('%H:%M:%S'),
+        REGISTERED_AT_FIELD: now.isoformat(timespec='seconds')
+    }
+
+
+def plot_timestamp(plot):
+    """
+    Momento do registro de uma parcela em segundos desde a época (Unix).
+    
+    Args:
+        plot (dict): Parcela no formato de data.json
+    
+    Returns:
+        float: Timestamp, ou None se a parcela não tiver data válida
+    """
+    value = plot.get(REGISTERED_AT_FIELD)
+    if value:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    
+    day = plot.get('data_registro')
+    if not day:
+        return None
+    try:
+        # Conversão direta: strptime é várias vezes mais lento em projetos grandes
+        day_part, month_part, year_part = day.split('/')
+        clock = plot.get('horario_registro') or '00:00:00'
+        registered = datetime.combine(date(int(year_part), int(month_part), int(day_part)),
+                                      time.fromisoformat(clock))
+    except (ValueError, TypeError):
+        return None
+    return registered.timestamp()
+
+
+def to_timestamp(value):
+    """
+    Converte um limite de consulta em timestamp.
+    
+    Args:
+        value: datetime, date (meia-noite local), número ou texto ISO-8601
+    
+    Returns:
+        float: Timestamp, ou None se value for None
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    return value.timestamp()
+
+
+class TimeIndex:
+    """
+    Índice das parcelas de um ou mais projetos ordenado pelo momento do registro.
+    
+    Além da ordem geral, cada projeto tem as suas listas ordenadas: consultas
+    restritas a um projeto fazem a busca binária só nas parcelas dele.
+    Parcelas sem data válida ficam fora do índice.
+    """
+    
+    def __init__(self, projects=()):
+        """
+        Args:
+            projects (iterable): Projetos no formato de data.json
+        """
+        entries = []
+        for project in projects:
+            project_id = project.get('id')
+            for plot in project.get('plots', []):
+                timestamp = plot_timestamp(plot)
+                if timestamp is not None:
+                    entries.append((timestamp, project_id, plot))
+        entries.sort(key=lambda entry: entry[0])
+        
+        # Listas paralelas: timestamps para a busca binária e (projeto, parcela)
+        self._timestamps = [entry[0] for entry in entries]
+        self._entries = [entry[1:] for entry in entries]
+        # Id do projeto -> (timestamps, parcelas), também em ordem cronológica
+        self._projects = {}
+        for timestamp, project_id, plot in entries:
+            timestamps, plots = self._projects.setdefault(project_id, ([], []))
+            timestamps.append(timestamp)
+            plots.append(plot)
+        # Id da parcela -> (timestamp, id do projeto)
+        self._by_plot = {plot['id']: (timestamp, project_id) for timestamp, project_id, plot in entries}
+    
+    def __len__(self):
+        return len(self._timestamps)
+    
+    def __contains__(self, plot_id):
+        return plot_id in self._by_plot
+    
+    def add(self, project_id, plot):
+        """
+        Inclui uma parcela no índice.
+        
+        Args:
+            project_id (str): Projeto da parcela
+            plot (dict): Parcela com 'id'
+        """
+        timestamp = plot_timestamp(plot)
+        if timestamp is None or plot['id'] in self._by_plot:
+            return
+        position = bisect.bisect_right(self._timestamps, timestamp)
+        self._timestamps.insert(position, timestamp)
+        self._entries.insert(position, (project_id, plot))
+        
+        timestamps, plots = self._projects.setdefault(project_id, ([], []))
+        position = bisect.bisect_right(timestamps, timestamp)
+        timestamps.insert(position, timestamp)
+        plots.insert(position, plot)
+        self._by_plot[plot['id']] = (timestamp, project_id)
+    
+    def remove(self, plot_id):
+        """Remove uma parcela do índice, se estiver nele."""
+        timestamp, project_id = self._by_plot.pop(plot_id, (None, None))
+        if timestamp is None:
+            return
+        position = bisect.bisect_left(self._timestamps, timestamp)
+        while self._entries[position][1]['id'] != plot_id:
+            position += 1
+        del self._timestamps[position]
+        del self._entries[position]
+        
+        timestamps, plots = self._projects[project_id]
+        position = bisect.bisect_left(timestamps, timestamp)
+        while plots[position]['id'] != plot_id:
+            position += 1
+        del timestamps[position]
+        del plots[position]
+    
+    @staticmethod
+    def _range(timestamps, start, end):
+        low = 0 if start is None else bisect.bisect_left(timestamps, to_timestamp(start))
+        high = len(timestamps) if end is None else bisect.bisect_left(timestamps, to_timestamp(end))
+        return low, max(low, high)
+    
+    def between(self, start=None, end=None, project_id=None):
+        """
+        Parcelas registradas no intervalo [start, end), em ordem cronológica.
+        
+        Args:
+            start: Início do intervalo, inclusivo (None = sem limite)
+            end: Fim do intervalo, exclusivo (None = sem limite)
+            project_id (str): Restringe a um projeto
+        
+        Returns:
+            list: Pares (id do projeto, id da parcela)
+        """
+        return [(entry_project, plot['id']) for entry_project, plot in self._slice(start, end, project_id)]
+    
+    def plots_between(self, start=None, end=None, project_id=None):
+        """
+        Como between, mas retorna as próprias parcelas (dicionários).
+        
+        Returns:
+            list: Parcelas em ordem cronológica
+        """
+        return [plot for _, plot in self._slice(start, end, project_id)]
+    
+    def _slice(self, start, end, project_id):
+        if project_id is None:
+            low, high = self._range(self._timestamps, start, end)
+            return self._entries[low:high]
+        timestamps, plots = self._projects.get(project_id, ((), ()))
+        low, high = self._range(timestamps, start, end)
+        return [(project_id, plot) for plot in plots[low:high]]
+    
+    def count_between(self, start=None, end=None, project_id=None):
+        """Número de parcelas registradas no intervalo [start, end), sem listá-las."""
+        timestamps = self._timestamps if project_id is None else self._projects.get(project_id, ((), ()))[0]
+        low, high = self._range(timestamps, start, end)
+        return high - low
+    
+    def on_date(self, day, project_id=None):
+        """
+        Parcelas registradas em um dia (fuso local).
+        
+        Args:
+            day (date): Dia da consulta
+            project_id (str): Restringe a um projeto
+        
+        Returns:
+            list: Pares (id do projeto, id da parcela)
+        """
+        return self.between(day, day + timedelta(days=1), project_id)
+    
+    def today(self, project_id=None):
+        """Parcelas registradas hoje (fuso local)."""
+        return self.on_date(date.today(), project_id)
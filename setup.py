@@ -13,7 +13,7 @@ setup(
     long_description=open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
     url="https://github.com/pablonvsx/inventario-vegetal-kuchler",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Science/Research",
@@ -28,8 +28,16 @@ setup(
     install_requires=[
         "kivymd>=1.1.1",
         "kivy>=2.2.0",
+        "pillow",
     ],
     extras_require={
+        "analysis": [
+            "numpy>=1.22",
+            "pyarrow>=10.0",
+        ],
+        "pdf": [
+            "weasyprint>=60",
+        ],
         "windows": [
             "kivy-deps.sdl2>=0.6.0",
             "kivy-deps.glew>=0.3.1",
@@ -39,6 +47,7 @@ setup(
     entry_points={
         "console_scripts": [
             "kuchlerapp=main:KuchlerInventoryApp",
+            "kuchlerapp-batch=modules.cli:main",
         ],
     },
 )